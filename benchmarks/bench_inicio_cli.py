@@ -0,0 +1,133 @@
+"""
+Benchmark del arranque en frío de la CLI (python -X importtime).
+
+Para cada comando de main.py mide, en un intérprete nuevo, el costo de importar
+main.py más los imports que el comando ejecuta (las sentencias import del cuerpo
+del comando, leídas con ast y repetidas tal cual). Informa el tiempo de imports y los
+módulos más pesados, y termina con código 1 si algún comando supera su
+presupuesto: sirve como control en scripts antes de publicar cambios.
+
+Uso:
+    python benchmarks/bench_inicio_cli.py
+    python benchmarks/bench_inicio_cli.py buscar features --repeticiones 5
+    python benchmarks/bench_inicio_cli.py --factor 1.5    # máquinas más lentas
+"""
+
+import argparse
+import ast
+import inspect
+import os
+import re
+import textwrap
+import subprocess
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+import main  # noqa: E402
+
+# Presupuesto de imports en frío por comando (ms); "--help" es la CLI sin comando
+PRESUPUESTO_DEFAULT_MS = 400
+PRESUPUESTOS_MS = {
+    "--help": 100,
+    "rmsd-pdb": 1000,
+    "rmsd-matriz": 800,
+    "mostrar-pdb-simple": 1600,
+    "mostrar-pdb-features": 1600,
+    "mostrar-alineamiento": 1600,
+}
+
+PATRON_LINEA = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+# Sentencias de import que ejecuta un comando (las de su cuerpo, leídas con ast)
+# Se repiten tal cual en la medición: "from X import Y" sirve igual si Y es un módulo
+# o una función de X
+# Entrada = objeto comando de click
+# Salida = lista de sentencias ("from utils import rmsd_analysis", "import numpy")
+def imports_de(comando):
+    arbol = ast.parse(textwrap.dedent(inspect.getsource(comando.callback)))
+    sentencias = []
+    for nodo in ast.walk(arbol):
+        if isinstance(nodo, ast.ImportFrom) and nodo.module and not nodo.level:
+            nombres = ", ".join(alias.name for alias in nodo.names)
+            sentencias.append(f"from {nodo.module} import {nombres}")
+        elif isinstance(nodo, ast.Import):
+            sentencias.extend(f"import {alias.name}" for alias in nodo.names)
+    return sentencias
+
+
+# Ejecuta un intérprete nuevo con -X importtime
+# Entrada = código a ejecutar
+# Salida = diccionario {módulo de primer nivel: tiempo acumulado en µs}
+def importtime(codigo):
+    proceso = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", codigo],
+        cwd=RAIZ,
+        capture_output=True,
+        text=True,
+    )
+    if proceso.returncode != 0:
+        raise RuntimeError(proceso.stderr.strip().splitlines()[-1])
+    tiempos = {}
+    for linea in proceso.stderr.splitlines():
+        coincidencia = PATRON_LINEA.match(linea)
+        # Sólo los imports de primer nivel: su tiempo acumulado ya incluye a los anidados
+        if coincidencia and len(coincidencia.group(3)) == 1:
+            tiempos[coincidencia.group(4)] = int(coincidencia.group(2))
+    return tiempos
+
+
+# Mide el arranque de un comando (mínimo de varias repeticiones)
+# Entrada = lista de sentencias de import, módulos del intérprete vacío, repeticiones
+# Salida = milisegundos y módulos de primer nivel más pesados [(nombre, ms)]
+def medir(sentencias, base, repeticiones):
+    codigo = "; ".join(["import main"] + sentencias)
+    mejor = None
+    for _ in range(repeticiones):
+        tiempos = {m: t for m, t in importtime(codigo).items() if m not in base}
+        total = sum(tiempos.values()) / 1000
+        if mejor is None or total < mejor[0]:
+            mejor = (total, tiempos)
+    total, tiempos = mejor
+    pesados = sorted(tiempos.items(), key=lambda item: -item[1])[:3]
+    return total, [(nombre, t / 1000) for nombre, t in pesados]
+
+
+def main_bench():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("comandos", nargs="*", help="Comandos a medir (default: todos)")
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument(
+        "--factor", type=float, default=1.0, help="Multiplicador de los presupuestos"
+    )
+    args = parser.parse_args()
+
+    base = set(importtime("pass"))
+    comandos = {"--help": []}
+    comandos.update(
+        {nombre: imports_de(comando) for nombre, comando in main.cli.commands.items()}
+    )
+    if args.comandos:
+        comandos = {nombre: comandos[nombre] for nombre in args.comandos}
+
+    print(f"{'Comando':<24}{'Imports (ms)':>14}{'Presupuesto':>13}  Más pesados")
+    excedidos = []
+    for nombre, sentencias in comandos.items():
+        total, pesados = medir(sentencias, base, args.repeticiones)
+        presupuesto = PRESUPUESTOS_MS.get(nombre, PRESUPUESTO_DEFAULT_MS) * args.factor
+        marca = "" if total <= presupuesto else "  << EXCEDIDO"
+        detalle = ", ".join(f"{m} {t:.0f}" for m, t in pesados)
+        print(f"{nombre:<24}{total:>14.1f}{presupuesto:>13.0f}  {detalle}{marca}")
+        if marca:
+            excedidos.append(nombre)
+
+    if excedidos:
+        print(f"\nComandos sobre el presupuesto: {', '.join(excedidos)}")
+        sys.exit(1)
+    print("\nTodos los comandos dentro del presupuesto.")
+
+
+if __name__ == "__main__":
+    main_bench()
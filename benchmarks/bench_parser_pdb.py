@@ -0,0 +1,142 @@
+"""
+Benchmark del parser por columnas (utils.parser_pdb) contra Bio.PDB.PDBParser.
+
+Mide tiempo y pico de memoria para extraer los CA de una cadena, que es lo único que
+necesita el análisis RMSD. Por defecto genera un archivo sintético del tamaño de un
+ribosoma (~250.000 átomos en 50 cadenas); también acepta rutas o IDs de PDB.
+
+Uso:
+    python benchmarks/bench_parser_pdb.py
+    python benchmarks/bench_parser_pdb.py --atomos 500000 --repeticiones 5
+    python benchmarks/bench_parser_pdb.py 4V6X.pdb 1HHO
+"""
+
+import argparse
+import math
+import os
+import string
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Bio.PDB.PDBParser import PDBParser  # noqa: E402
+
+from utils.almacen_ca import cadena_ca_desde_cadena, extraer_cadenas_archivo  # noqa: E402
+from utils.parser_pdb import leer_atomos  # noqa: E402
+
+RESIDUOS = ["ALA", "GLY", "SER", "LEU", "LYS", "GLU", "ASP", "VAL", "ILE", "PHE"]
+ATOMOS_RESIDUO = ["N", "CA", "C", "O", "CB"]
+
+
+# Genera un archivo PDB sintético con la cantidad de átomos pedida
+def generar_pdb_sintetico(ruta, n_atomos, n_cadenas=50):
+    ids_cadena = (string.ascii_uppercase + string.ascii_lowercase + string.digits)[
+        :n_cadenas
+    ]
+    residuos_por_cadena = max(1, n_atomos // (len(ATOMOS_RESIDUO) * n_cadenas))
+    serial = 1
+    with open(ruta, "w") as f:
+        for c, cadena in enumerate(ids_cadena):
+            for i in range(1, residuos_por_cadena + 1):
+                angulo = i * 100 / 180 * math.pi
+                x, y, z = 2.3 * math.cos(angulo) + c * 30, 2.3 * math.sin(angulo), 1.5 * i
+                resname = RESIDUOS[i % len(RESIDUOS)]
+                for k, nombre in enumerate(ATOMOS_RESIDUO):
+                    f.write(
+                        "ATOM  %5d  %-3s %3s %1s%4d    %8.3f%8.3f%8.3f%6.2f%6.2f          %2s\n"
+                        % (
+                            serial % 100000,
+                            nombre,
+                            resname,
+                            cadena,
+                            i % 10000,
+                            x + k * 0.5,
+                            y,
+                            z % 10000,
+                            1.0,
+                            20.0,
+                            nombre[0],
+                        )
+                    )
+                    serial += 1
+            f.write("TER\n")
+        f.write("END\n")
+    return ruta
+
+
+def medir(funcion, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        tiempos.append(time.perf_counter() - inicio)
+
+    tracemalloc.start()
+    funcion()
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return min(tiempos), pico, resultado
+
+
+def comparar(ruta, cadena, repeticiones):
+    def con_biopython():
+        estructura = PDBParser(QUIET=True).get_structure("protein", ruta)
+        return cadena_ca_desde_cadena(estructura[0][cadena])
+
+    def con_parser_columnas():
+        return extraer_cadenas_archivo(ruta, cadenas=[cadena])[cadena]
+
+    def todos_los_atomos():
+        return leer_atomos(ruta, altlocs=None)
+
+    tamano = os.path.getsize(ruta) / 1e6
+    print(f"\n{os.path.basename(ruta)} ({tamano:.1f} MB), cadena {cadena}")
+    print(f"{'Método':<36}{'Tiempo (s)':>12}{'Memoria pico (MB)':>20}")
+
+    filas = [
+        ("PDBParser + CA de la cadena", con_biopython),
+        ("parser_pdb, CA de la cadena", con_parser_columnas),
+        ("parser_pdb, todos los átomos", todos_los_atomos),
+    ]
+    tiempos = {}
+    for nombre, funcion in filas:
+        tiempo, pico, _ = medir(funcion, repeticiones)
+        tiempos[nombre] = tiempo
+        print(f"{nombre:<36}{tiempo:>12.3f}{pico / 1e6:>20.1f}")
+
+    aceleracion = tiempos[filas[0][0]] / tiempos[filas[1][0]]
+    print(f"Aceleración en el camino RMSD: {aceleracion:.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("pdbs", nargs="*", help="Rutas de archivos PDB o IDs de PDB")
+    parser.add_argument("--cadena", default="A", help="Cadena a extraer (default: A)")
+    parser.add_argument("--atomos", type=int, default=250000)
+    parser.add_argument("--repeticiones", type=int, default=3)
+    args = parser.parse_args()
+
+    rutas = []
+    for pdb in args.pdbs:
+        if os.path.exists(pdb):
+            rutas.append(pdb)
+        else:
+            from data.fetch_pdb import descargar_pdb
+
+            rutas.append(descargar_pdb(pdb))
+
+    if rutas:
+        for ruta in rutas:
+            comparar(ruta, args.cadena, args.repeticiones)
+        return
+
+    with tempfile.TemporaryDirectory() as carpeta:
+        ruta = os.path.join(carpeta, "sintetico.pdb")
+        comparar(generar_pdb_sintetico(ruta, args.atomos), "A", args.repeticiones)
+
+
+if __name__ == "__main__":
+    main()
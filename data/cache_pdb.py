@@ -0,0 +1,198 @@
+import hashlib
+import os
+import tempfile
+
+# Carpeta raíz de las caches locales del proyecto (configurable por entorno)
+DIRECTORIO_CACHE = os.environ.get(
+    "BBDD_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "proyecto_bbdd_macromoleculas"),
+)
+
+# Tamaño máximo de la cache de estructuras en MB (configurable por entorno)
+TAMANO_MAXIMO_MB = float(os.environ.get("BBDD_CACHE_PDB_MAX_MB", "2048"))
+
+
+# Escribe un archivo de forma atómica (temporal en la misma carpeta + os.replace)
+# Entrada = ruta destino, contenido en bytes
+# Salida = ruta destino
+def escribir_atomico(ruta, contenido):
+    carpeta = os.path.dirname(ruta)
+    os.makedirs(carpeta, exist_ok=True)
+    descriptor, ruta_temporal = tempfile.mkstemp(dir=carpeta, suffix=".tmp")
+    try:
+        with os.fdopen(descriptor, "wb") as f:
+            f.write(contenido)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(ruta_temporal, ruta)
+    except BaseException:
+        if os.path.exists(ruta_temporal):
+            os.unlink(ruta_temporal)
+        raise
+    return ruta
+
+
+class CacheEstructuras:
+    """
+    Cache persistente de archivos PDB direccionada por contenido.
+    Cada archivo se guarda una sola vez con el nombre de su hash SHA-256 (objetos/) y cada
+    código PDB apunta a su hash mediante un archivo de referencia (refs/). La fecha de
+    modificación de la referencia se usa como último acceso para el desalojo LRU.
+    Todas las escrituras son atómicas, por lo que varios procesos pueden compartir la carpeta.
+    """
+
+    def __init__(self, directorio=None, tamano_maximo_mb=None, verificar=True):
+        self.directorio = directorio or os.path.join(DIRECTORIO_CACHE, "estructuras")
+        if tamano_maximo_mb is None:
+            tamano_maximo_mb = TAMANO_MAXIMO_MB
+        self.tamano_maximo = int(tamano_maximo_mb * 1024 * 1024)
+        self.verificar = verificar
+        self.contadores = {"aciertos": 0, "fallos": 0, "corruptos": 0, "desalojos": 0}
+
+    def _ruta_referencia(self, pdb_id):
+        return os.path.join(self.directorio, "refs", pdb_id.upper())
+
+    def _ruta_objeto(self, digest):
+        return os.path.join(self.directorio, "objetos", digest[:2], f"{digest}.pdb")
+
+    def _leer_referencia(self, pdb_id):
+        try:
+            with open(self._ruta_referencia(pdb_id), "r", encoding="ascii") as f:
+                return f.read().strip()
+        except (FileNotFoundError, UnicodeDecodeError):
+            return None
+
+    def _descartar(self, pdb_id):
+        try:
+            os.unlink(self._ruta_referencia(pdb_id))
+        except FileNotFoundError:
+            pass
+
+    def obtener(self, pdb_id):
+        """
+        Retorna la ruta local del PDB si está en cache e íntegro, o None si no está.
+        Un acierto actualiza la fecha de último acceso de la entrada.
+        """
+        digest = self._leer_referencia(pdb_id)
+        ruta = self._ruta_objeto(digest) if digest else None
+
+        if ruta is None or not os.path.exists(ruta):
+            if digest:
+                self._descartar(pdb_id)
+            self.contadores["fallos"] += 1
+            return None
+
+        if self.verificar and calcular_hash_archivo(ruta) != digest:
+            # Objeto dañado: se elimina para que la siguiente descarga lo reemplace
+            self.contadores["corruptos"] += 1
+            self.contadores["fallos"] += 1
+            self._descartar(pdb_id)
+            try:
+                os.unlink(ruta)
+            except FileNotFoundError:
+                pass
+            return None
+
+        try:
+            os.utime(self._ruta_referencia(pdb_id))
+        except FileNotFoundError:
+            pass
+        self.contadores["aciertos"] += 1
+        return ruta
+
+    def guardar(self, pdb_id, contenido):
+        """
+        Guarda el contenido (str o bytes) de un PDB y retorna la ruta local del objeto.
+        Si el mismo contenido ya existe sólo se escribe la referencia.
+        """
+        if isinstance(contenido, str):
+            contenido = contenido.encode("utf-8")
+
+        digest = hashlib.sha256(contenido).hexdigest()
+        ruta = self._ruta_objeto(digest)
+        if not os.path.exists(ruta):
+            escribir_atomico(ruta, contenido)
+        escribir_atomico(self._ruta_referencia(pdb_id), digest.encode("ascii"))
+
+        self.desalojar(proteger=digest)
+        return ruta
+
+    def desalojar(self, proteger=None):
+        """
+        Elimina las entradas usadas hace más tiempo hasta que el tamaño total de los objetos
+        quede por debajo del máximo configurado. Retorna la cantidad de entradas eliminadas.
+        """
+        carpeta_refs = os.path.join(self.directorio, "refs")
+        if not os.path.isdir(carpeta_refs):
+            return 0
+
+        # Referencias vivas: (último acceso, código, hash)
+        referencias = []
+        for nombre in os.listdir(carpeta_refs):
+            if nombre.endswith(".tmp"):
+                continue
+            ruta_ref = os.path.join(carpeta_refs, nombre)
+            try:
+                acceso = os.stat(ruta_ref).st_mtime
+            except FileNotFoundError:
+                continue
+            digest = self._leer_referencia(nombre)
+            if digest:
+                referencias.append((acceso, nombre, digest))
+
+        tamanos = {}
+        for _, _, digest in referencias:
+            if digest not in tamanos:
+                try:
+                    tamanos[digest] = os.path.getsize(self._ruta_objeto(digest))
+                except FileNotFoundError:
+                    tamanos[digest] = 0
+
+        total = sum(tamanos.values())
+        if total <= self.tamano_maximo:
+            return 0
+
+        usos = {}
+        for _, _, digest in referencias:
+            usos[digest] = usos.get(digest, 0) + 1
+
+        eliminadas = 0
+        for _, nombre, digest in sorted(referencias):
+            if total <= self.tamano_maximo:
+                break
+            if digest == proteger:
+                continue
+            self._descartar(nombre)
+            eliminadas += 1
+            usos[digest] -= 1
+            # El objeto sólo se borra cuando ninguna otra referencia lo usa
+            if usos[digest] == 0:
+                try:
+                    os.unlink(self._ruta_objeto(digest))
+                except FileNotFoundError:
+                    pass
+                total -= tamanos[digest]
+
+        self.contadores["desalojos"] += eliminadas
+        return eliminadas
+
+    def estadisticas(self):
+        """
+        Retorna los contadores de aciertos, fallos, objetos corruptos y desalojos.
+        """
+        return dict(self.contadores)
+
+
+# Calcula el hash SHA-256 de un archivo leyendo por bloques
+# Entrada = ruta del archivo
+# Salida = hash hexadecimal
+def calcular_hash_archivo(ruta, tamano_bloque=1 << 20):
+    digest = hashlib.sha256()
+    with open(ruta, "rb") as f:
+        for bloque in iter(lambda: f.read(tamano_bloque), b""):
+            digest.update(bloque)
+    return digest.hexdigest()
+
+
+# Instancia compartida por todos los módulos del proyecto
+cache_estructuras = CacheEstructuras()
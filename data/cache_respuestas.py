@@ -0,0 +1,253 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from data import cliente_http
+from data.cache_pdb import DIRECTORIO_CACHE
+
+# =============================================================================
+# CACHE PERSISTENTE DE RESPUESTAS HTTP (SQLITE)
+# =============================================================================
+#
+# Guarda las respuestas 200 de las APIs (UniProt, PDBe-SIFTS, NCBI) en una base
+# SQLite, con clave = método + URL normalizada + parámetros ordenados.
+#
+#   - TTL por fuente: dentro del TTL la respuesta se sirve desde disco.
+#   - Vencido el TTL se revalida con If-None-Match / If-Modified-Since; un 304
+#     renueva la entrada sin volver a descargar el cuerpo.
+#   - Tamaño acotado: al superar el máximo se desalojan las entradas con el
+#     acceso más antiguo (LRU).
+#   - Modo sin conexión: sólo se sirve lo que hay en disco (aunque esté vencido).
+#
+# Configuración por variables de entorno (o con configurar()):
+#   BBDD_CACHE_RESPUESTAS_MAX_MB  tamaño máximo de la base (default: 256)
+#   BBDD_SIN_CONEXION             "1" para activar el modo sin conexión
+#
+# =============================================================================
+
+# Tiempo de vida (segundos) de las respuestas de cada fuente
+TTL_POR_FUENTE = {
+    "uniprot": 7 * 24 * 3600,
+    "uniprot_busqueda": 24 * 3600,
+    "sifts": 30 * 24 * 3600,
+    "ncbi": 7 * 24 * 3600,
+}
+TTL_POR_DEFECTO = 24 * 3600
+
+# Encabezados que no se guardan (el cuerpo se guarda ya descomprimido)
+_ENCABEZADOS_DESCARTADOS = {"content-encoding", "content-length", "transfer-encoding", "connection"}
+
+_configuracion = {
+    "ruta": os.path.join(DIRECTORIO_CACHE, "respuestas.sqlite"),
+    "tamano_maximo": int(float(os.environ.get("BBDD_CACHE_RESPUESTAS_MAX_MB", "256")) * 1024 * 1024),
+    "sin_conexion": os.environ.get("BBDD_SIN_CONEXION", "") not in ("", "0"),
+    "activa": True,
+}
+
+_local = threading.local()
+_contadores = {"aciertos": 0, "revalidadas": 0, "descargas": 0, "desalojos": 0}
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS respuestas (
+    clave TEXT PRIMARY KEY,
+    fuente TEXT NOT NULL,
+    url TEXT NOT NULL,
+    encabezados TEXT NOT NULL,
+    contenido BLOB NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    guardado REAL NOT NULL,
+    accedido REAL NOT NULL,
+    tamano INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS respuestas_accedido ON respuestas (accedido);
+"""
+
+
+class SinConexionError(requests.exceptions.ConnectionError):
+    """La respuesta no está en la cache y el modo sin conexión está activo."""
+
+
+# Devuelve la conexión SQLite del hilo actual (la crea si no existe)
+def _conexion():
+    ruta = _configuracion["ruta"]
+    conexion = getattr(_local, "conexion", None)
+    if conexion is None or getattr(_local, "ruta", None) != ruta:
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        conexion = sqlite3.connect(ruta, timeout=30, isolation_level=None)
+        conexion.execute("PRAGMA journal_mode=WAL")
+        conexion.execute("PRAGMA synchronous=NORMAL")
+        conexion.executescript(_ESQUEMA)
+        _local.conexion, _local.ruta = conexion, ruta
+    return conexion
+
+
+# Normaliza URL y parámetros para que consultas equivalentes compartan la clave
+# Entrada = método, URL, parámetros (dict o lista de pares)
+# Salida = (clave SHA-256, URL normalizada)
+def clave_solicitud(metodo, url, params=None):
+    partes = urlsplit(url)
+    pares = parse_qsl(partes.query, keep_blank_values=True)
+    if params:
+        pares += list(params.items()) if isinstance(params, dict) else list(params)
+    pares = sorted((str(k), str(v)) for k, v in pares if v is not None)
+    normalizada = urlunsplit(
+        (partes.scheme.lower(), partes.netloc.lower(), partes.path, urlencode(pares), "")
+    )
+    clave = hashlib.sha256(f"{metodo.upper()} {normalizada}".encode()).hexdigest()
+    return clave, normalizada
+
+
+# Reconstruye un requests.Response a partir de una fila de la cache
+def _respuesta_desde_fila(url, encabezados, contenido):
+    response = requests.Response()
+    response.status_code = 200
+    response.reason = "OK"
+    response.url = url
+    response._content = contenido
+    response.headers = CaseInsensitiveDict(json.loads(encabezados))
+    response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+    response.from_cache = True
+    return response
+
+
+def _guardar(conexion, clave, fuente, url, response):
+    encabezados = {
+        k: v for k, v in response.headers.items() if k.lower() not in _ENCABEZADOS_DESCARTADOS
+    }
+    contenido = response.content
+    ahora = time.time()
+    conexion.execute(
+        "INSERT OR REPLACE INTO respuestas VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        (
+            clave,
+            fuente,
+            url,
+            json.dumps(encabezados),
+            contenido,
+            response.headers.get("ETag"),
+            response.headers.get("Last-Modified"),
+            ahora,
+            ahora,
+            len(contenido),
+        ),
+    )
+    _desalojar(conexion)
+
+
+# Elimina las entradas con acceso más antiguo hasta quedar por debajo del 90 % del máximo
+def _desalojar(conexion):
+    total = conexion.execute("SELECT COALESCE(SUM(tamano), 0) FROM respuestas").fetchone()[0]
+    if total <= _configuracion["tamano_maximo"]:
+        return
+    objetivo = total - int(0.9 * _configuracion["tamano_maximo"])
+    liberado = 0
+    for clave, tamano in conexion.execute(
+        "SELECT clave, tamano FROM respuestas ORDER BY accedido"
+    ).fetchall():
+        if liberado >= objetivo:
+            break
+        conexion.execute("DELETE FROM respuestas WHERE clave = ?", (clave,))
+        liberado += tamano
+        _contadores["desalojos"] += 1
+
+
+# GET con cache persistente
+# Entrada = URL, fuente (clave de TTL_POR_FUENTE), parámetros, limitador de tasa opcional
+#           (cliente_http.LimitadorTasa; sólo se consume si la petición sale a la red)
+#           y argumentos de requests
+# Salida = requests.Response (from_cache=True si se sirvió desde disco)
+# Excepciones: SinConexionError si está en modo sin conexión y no hay copia local
+def get(url, fuente, params=None, limitador=None, **kwargs):
+    if not _configuracion["activa"]:
+        if limitador is not None:
+            limitador.esperar()
+        return cliente_http.get(url, params=params, **kwargs)
+
+    clave, normalizada = clave_solicitud("GET", url, params)
+    conexion = _conexion()
+    fila = conexion.execute(
+        "SELECT encabezados, contenido, etag, last_modified, guardado FROM respuestas WHERE clave = ?",
+        (clave,),
+    ).fetchone()
+
+    ttl = TTL_POR_FUENTE.get(fuente, TTL_POR_DEFECTO)
+    if fila is not None and (
+        _configuracion["sin_conexion"] or time.time() - fila[4] < ttl
+    ):
+        conexion.execute("UPDATE respuestas SET accedido = ? WHERE clave = ?", (time.time(), clave))
+        _contadores["aciertos"] += 1
+        return _respuesta_desde_fila(normalizada, fila[0], fila[1])
+
+    if _configuracion["sin_conexion"]:
+        raise SinConexionError(f"Modo sin conexión: no hay copia local de {normalizada}")
+
+    # Revalidación condicional de una entrada vencida
+    encabezados = dict(kwargs.pop("headers", None) or {})
+    if fila is not None:
+        if fila[2]:
+            encabezados["If-None-Match"] = fila[2]
+        if fila[3]:
+            encabezados["If-Modified-Since"] = fila[3]
+
+    if limitador is not None:
+        limitador.esperar()
+    response = cliente_http.get(url, params=params, headers=encabezados, **kwargs)
+    if response.status_code == 304 and fila is not None:
+        ahora = time.time()
+        conexion.execute(
+            "UPDATE respuestas SET guardado = ?, accedido = ? WHERE clave = ?",
+            (ahora, ahora, clave),
+        )
+        _contadores["revalidadas"] += 1
+        return _respuesta_desde_fila(normalizada, fila[0], fila[1])
+
+    _contadores["descargas"] += 1
+    if response.status_code == 200:
+        _guardar(conexion, clave, fuente, normalizada, response)
+    return response
+
+
+# Cambia la configuración de la cache
+# Entrada = parámetros a modificar (None = sin cambios)
+# Salida = configuración vigente
+def configurar(ruta=None, tamano_maximo_mb=None, sin_conexion=None, activa=None):
+    if ruta is not None:
+        _configuracion["ruta"] = ruta
+    if tamano_maximo_mb is not None:
+        _configuracion["tamano_maximo"] = int(tamano_maximo_mb * 1024 * 1024)
+    if sin_conexion is not None:
+        _configuracion["sin_conexion"] = bool(sin_conexion)
+    if activa is not None:
+        _configuracion["activa"] = bool(activa)
+    return dict(_configuracion)
+
+
+# Elimina las entradas de una fuente (o todas)
+# Entrada = fuente (None = todas)
+# Salida = cantidad de entradas eliminadas
+def limpiar(fuente=None):
+    conexion = _conexion()
+    if fuente is None:
+        cursor = conexion.execute("DELETE FROM respuestas")
+    else:
+        cursor = conexion.execute("DELETE FROM respuestas WHERE fuente = ?", (fuente,))
+    return cursor.rowcount
+
+
+# Retorna entradas y bytes por fuente más los contadores de la sesión
+def estadisticas():
+    filas = _conexion().execute(
+        "SELECT fuente, COUNT(*), SUM(tamano) FROM respuestas GROUP BY fuente"
+    ).fetchall()
+    return {
+        "fuentes": {fuente: {"entradas": n, "bytes": b} for fuente, n, b in filas},
+        **_contadores,
+    }
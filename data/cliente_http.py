@@ -0,0 +1,203 @@
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# =============================================================================
+# CLIENTE HTTP COMPARTIDO
+# =============================================================================
+#
+# Todas las consultas a UniProt, PDBe, RCSB y NCBI pasan por este módulo:
+#   - Una requests.Session por host (esquema + host + puerto), con un pool de
+#     conexiones keep-alive reutilizadas entre llamadas y entre hilos.
+#   - Reintentos ante 429/5xx y errores de conexión con espera exponencial con
+#     jitter, respetando el encabezado Retry-After.
+#   - Negociación de compresión gzip/deflate.
+#   - LimitadorTasa: cubeta de tokens para espaciar peticiones a una API sin
+#     esperas fijas (sólo se espera cuando se agota la ráfaga permitida).
+#   - ejecutar_concurrente(): reparte consultas independientes en un pool de
+#     hilos acotado; el pool de conexiones bloqueante de cada sesión limita
+#     además las peticiones simultáneas contra un mismo host.
+#
+# Configuración por variables de entorno (o con configurar()):
+#   BBDD_HTTP_MAX_CONEXIONES  conexiones simultáneas por host (default: 10)
+#   BBDD_HTTP_REINTENTOS      reintentos por petición (default: 5)
+#   BBDD_HTTP_FACTOR_ESPERA   factor de la espera exponencial en s (default: 0.5)
+#
+# =============================================================================
+
+TIMEOUT_POR_DEFECTO = 30
+
+ESTADOS_REINTENTABLES = (429, 500, 502, 503, 504)
+
+ENCABEZADOS = {
+    "Accept-Encoding": "gzip, deflate",
+    "User-Agent": "Proyecto_BBDD_Macromoleculas (python-requests)",
+}
+
+_configuracion = {
+    "max_conexiones": int(os.environ.get("BBDD_HTTP_MAX_CONEXIONES", "10")),
+    "reintentos": int(os.environ.get("BBDD_HTTP_REINTENTOS", "5")),
+    "factor_espera": float(os.environ.get("BBDD_HTTP_FACTOR_ESPERA", "0.5")),
+    "espera_maxima": 60.0,
+}
+
+_sesiones = {}
+_candado = threading.Lock()
+
+
+class ReintentoConJitter(Retry):
+    """
+    Política de reintentos de urllib3 con espera exponencial "full jitter":
+    cada espera es un valor aleatorio entre 0 y factor * 2^(intento - 1).
+    Si la respuesta trae Retry-After, urllib3 usa ese valor en su lugar.
+    La espera máxima se aplica acá (el argumento backoff_max sólo existe en urllib3 >= 2).
+    """
+
+    def get_backoff_time(self):
+        espera = min(super().get_backoff_time(), _configuracion["espera_maxima"])
+        return random.uniform(0, espera) if espera > 0 else 0
+
+
+class LimitadorTasa:
+    """
+    Limitador de tasa por cubeta de tokens, seguro entre hilos.
+    La cubeta se recarga a `tasa` tokens por segundo hasta `capacidad`; cada petición
+    consume un token y sólo espera si la cubeta está vacía. Empieza llena, así que la
+    primera ráfaga de `capacidad` peticiones sale sin espera.
+    """
+
+    def __init__(self, tasa, capacidad=1):
+        if tasa <= 0:
+            raise ValueError("La tasa debe ser mayor que 0")
+        self.tasa = float(tasa)
+        self.capacidad = float(capacidad)
+        self._tokens = self.capacidad
+        self._ultimo = time.monotonic()
+        self._candado = threading.Lock()
+
+    def esperar(self, tokens=1):
+        """Bloquea hasta disponer de `tokens` y los consume. Retorna los segundos esperados."""
+        with self._candado:
+            ahora = time.monotonic()
+            self._tokens = min(
+                self.capacidad, self._tokens + (ahora - self._ultimo) * self.tasa
+            )
+            self._ultimo = ahora
+            self._tokens -= tokens
+            # Con saldo negativo se reserva el turno y se espera fuera del candado
+            espera = max(0.0, -self._tokens / self.tasa)
+        if espera:
+            time.sleep(espera)
+        return espera
+
+
+# Crea la política de reintentos con la configuración actual
+def _crear_reintentos():
+    return ReintentoConJitter(
+        total=_configuracion["reintentos"],
+        connect=_configuracion["reintentos"],
+        read=_configuracion["reintentos"],
+        status=_configuracion["reintentos"],
+        backoff_factor=_configuracion["factor_espera"],
+        status_forcelist=ESTADOS_REINTENTABLES,
+        allowed_methods=frozenset({"GET", "HEAD", "POST"}),
+        respect_retry_after_header=True,
+        # Al agotar los reintentos se devuelve la última respuesta para que
+        # raise_for_status() informe el error HTTP real
+        raise_on_status=False,
+    )
+
+
+def _clave_host(url):
+    partes = urlsplit(url)
+    return f"{partes.scheme}://{partes.netloc}"
+
+
+# Devuelve la sesión compartida para el host de la URL (la crea si no existe)
+# Entrada = URL
+# Salida = requests.Session con pool de conexiones y reintentos
+def obtener_sesion(url):
+    clave = _clave_host(url)
+    with _candado:
+        sesion = _sesiones.get(clave)
+        if sesion is None:
+            sesion = requests.Session()
+            sesion.headers.update(ENCABEZADOS)
+            adaptador = HTTPAdapter(
+                pool_connections=1,
+                pool_maxsize=_configuracion["max_conexiones"],
+                max_retries=_crear_reintentos(),
+                # Bloquear al agotar el pool limita la concurrencia por host
+                pool_block=True,
+            )
+            sesion.mount(clave + "/", adaptador)
+            _sesiones[clave] = sesion
+        return sesion
+
+
+# Realiza una petición usando la sesión del host
+# Entrada = método HTTP, URL y argumentos de requests
+# Salida = requests.Response
+def solicitar(metodo, url, **kwargs):
+    kwargs.setdefault("timeout", TIMEOUT_POR_DEFECTO)
+    return obtener_sesion(url).request(metodo, url, **kwargs)
+
+
+def get(url, **kwargs):
+    return solicitar("GET", url, **kwargs)
+
+
+def post(url, **kwargs):
+    return solicitar("POST", url, **kwargs)
+
+
+# Cambia la configuración del cliente y descarta las sesiones existentes
+# Entrada = parámetros a modificar (None = sin cambios)
+# Salida = configuración vigente
+def configurar(
+    max_conexiones=None, reintentos=None, factor_espera=None, espera_maxima=None
+):
+    nuevos = {
+        "max_conexiones": max_conexiones,
+        "reintentos": reintentos,
+        "factor_espera": factor_espera,
+        "espera_maxima": espera_maxima,
+    }
+    with _candado:
+        for clave, valor in nuevos.items():
+            if valor is not None:
+                _configuracion[clave] = valor
+        for sesion in _sesiones.values():
+            sesion.close()
+        _sesiones.clear()
+    return dict(_configuracion)
+
+
+# Ejecuta una función sobre varios elementos en un pool de hilos acotado
+# Los resultados se devuelven en el orden de entrada; un error en un elemento no
+# detiene al resto
+# Entrada = función de un argumento, elementos, cantidad de hilos (None = max_conexiones)
+# Salida = lista de tuplas (elemento, resultado, excepción o None)
+def ejecutar_concurrente(funcion, elementos, hilos=None):
+    elementos = list(elementos)
+    if not elementos:
+        return []
+
+    def ejecutar(elemento):
+        try:
+            return elemento, funcion(elemento), None
+        except Exception as e:
+            return elemento, None, e
+
+    hilos = min(hilos or _configuracion["max_conexiones"], len(elementos))
+    if hilos == 1:
+        return [ejecutar(elemento) for elemento in elementos]
+    with ThreadPoolExecutor(max_workers=hilos) as pool:
+        return list(pool.map(ejecutar, elementos))
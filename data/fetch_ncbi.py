@@ -1,22 +1,99 @@
-import json
+import os
+import xml.etree.ElementTree as ET
 
-from Bio import Entrez, SeqIO
+from data import cache_respuestas, cliente_http
+
+# =============================================================================
+# CONSULTAS A NCBI E-UTILITIES
+# =============================================================================
+#
+# buscar_acn_ncbi()  -> un accession: esearch + esummary, con cache persistente.
+# resumenes_ncbi()   -> lista de accessions por lotes con el history server:
+#   1. epost (POST) de hasta TAMANO_LOTE_POST accessions -> WebEnv + query_key
+#   2. esummary del lote guardado en páginas de RETMAX_RESUMEN documentos
+#   Con 50.000 accessions son ~10 epost + ~100 esummary en lugar de 100.000
+#   peticiones. Los resúmenes se entregan lote a lote, en el orden de entrada.
+#
+# Todas las peticiones comparten un limitador de tasa: 3 por segundo sin clave
+# de API y 10 por segundo con clave (límites publicados por NCBI). Las
+# respuestas servidas desde la cache no consumen turnos.
+#
+# Configuración por variables de entorno (o con configurar()):
+#   NCBI_API_KEY / BBDD_NCBI_API_KEY  clave de API de NCBI (opcional)
+#   BBDD_NCBI_EMAIL                   correo de contacto enviado a NCBI
+#
+# =============================================================================
+
+URL_EUTILS = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils"
+HERRAMIENTA = "proyecto_bbdd_macromoleculas"
+
+TASA_SIN_CLAVE = 3
+TASA_CON_CLAVE = 10
+TAMANO_LOTE_POST = 5000
+RETMAX_RESUMEN = 500
+
+_configuracion = {
+    "api_key": os.environ.get("BBDD_NCBI_API_KEY") or os.environ.get("NCBI_API_KEY"),
+    "email": os.environ.get("BBDD_NCBI_EMAIL", "tucorreo@example.com"),
+}
+
+
+def _crear_limitador():
+    tasa = TASA_CON_CLAVE if _configuracion["api_key"] else TASA_SIN_CLAVE
+    # Capacidad 1: peticiones espaciadas 1/tasa s, sin ráfaga inicial que supere el límite
+    return cliente_http.LimitadorTasa(tasa, capacidad=1)
+
+
+# Limitador compartido por todas las consultas a E-utilities del proceso
+LIMITADOR = _crear_limitador()
+
+
+# Cambia la clave de API o el correo y ajusta la tasa del limitador
+# Entrada = parámetros a modificar (None = sin cambios)
+# Salida = configuración vigente (sin la clave)
+def configurar(api_key=None, email=None):
+    global LIMITADOR
+    if api_key is not None:
+        _configuracion["api_key"] = api_key or None
+    if email is not None:
+        _configuracion["email"] = email
+    LIMITADOR = _crear_limitador()
+    return {"email": _configuracion["email"], "tasa": LIMITADOR.tasa}
+
+
+# Parámetros comunes de E-utilities (db, tool, email y api_key si hay)
+def _parametros_base(email=None):
+    parametros = {
+        "db": "protein",
+        "tool": HERRAMIENTA,
+        "email": email or _configuracion["email"],
+    }
+    if _configuracion["api_key"]:
+        parametros["api_key"] = _configuracion["api_key"]
+    return parametros
 
 
 # Busca una proteina en NCBI por ID
+# Las consultas a E-utilities pasan por la cache persistente de respuestas
 # Entrada = texto
 # Salida = data json
-def buscar_acn_ncbi(accession, email="tucorreo@example.com"):
+def buscar_acn_ncbi(accession, email=None):
 
-    Entrez.email = email
     print("Buscando el ID en NCBI")
 
+    parametros_base = {**_parametros_base(email), "retmode": "json"}
+
     try:
         # Paso 1: Buscar el UID del accession
-        handle = Entrez.esearch(db="protein", term=accession, retmode="json")
-        raw_search = handle.read()
-        search_data = json.loads(raw_search)
-        handle.close()
+        response = cache_respuestas.get(
+            f"{URL_EUTILS}/esearch.fcgi",
+            "ncbi",
+            params={**parametros_base, "term": accession},
+            limitador=LIMITADOR,
+            timeout=30,
+        )
+        response.raise_for_status()
+        search_data = response.json()
 
         id_list = search_data["esearchresult"]["idlist"]
         if not id_list:
@@ -26,13 +103,119 @@ def buscar_acn_ncbi(accession, email="tucorreo@example.com"):
         print(f"UID encontrado: {uid}")
 
         # Paso 2: Obtener resumen en JSON
-        handle = Entrez.esummary(db="protein", id=uid, retmode="json")
-        raw_summary = handle.read()
-        summary_data = json.loads(raw_summary)
-        handle.close()
+        response = cache_respuestas.get(
+            f"{URL_EUTILS}/esummary.fcgi",
+            "ncbi",
+            params={**parametros_base, "id": uid},
+            limitador=LIMITADOR,
+            timeout=30,
+        )
+        response.raise_for_status()
+        summary_data = response.json()
 
         return summary_data
 
     except Exception as error:
         print(f"Error en la búsqueda de NCBI: {str(error)}")
         return {"error": f"Error en la búsqueda de NCBI: {str(error)}"}
+
+
+# POST a E-utilities respetando el limitador compartido
+def _post_eutils(utilidad, datos, timeout=120):
+    LIMITADOR.esperar()
+    response = cliente_http.post(f"{URL_EUTILS}/{utilidad}", data=datos, timeout=timeout)
+    response.raise_for_status()
+    return response
+
+
+# Sube una lista de accessions al history server
+# Entrada = lista de accessions
+# Salida = (WebEnv, query_key)
+# Excepciones: RuntimeError si NCBI no devuelve WebEnv
+def _epost(accessions):
+    response = _post_eutils(
+        "epost.fcgi", {**_parametros_base(), "id": ",".join(accessions)}
+    )
+    raiz = ET.fromstring(response.content)
+    webenv, query_key = raiz.findtext("WebEnv"), raiz.findtext("QueryKey")
+    if not webenv or not query_key:
+        error = raiz.findtext("ERROR") or "respuesta sin WebEnv"
+        raise RuntimeError(f"epost de NCBI falló: {error}")
+    return webenv, query_key
+
+
+# Pide los resúmenes de un lote guardado en el history server, página por página
+# Entrada = WebEnv, query_key, máximo de UIDs del lote (evita pedir una página vacía
+#           al final), tamaño de página
+# Salida = generador de documentos de esummary (diccionarios)
+def _esummary_historial(webenv, query_key, total, retmax=RETMAX_RESUMEN):
+    retstart = 0
+    while True:
+        response = _post_eutils(
+            "esummary.fcgi",
+            {
+                **_parametros_base(),
+                "retmode": "json",
+                "WebEnv": webenv,
+                "query_key": query_key,
+                "retstart": retstart,
+                "retmax": retmax,
+            },
+        )
+        resultado = response.json().get("result", {})
+        uids = resultado.get("uids", [])
+        for uid in uids:
+            documento = resultado.get(uid)
+            if isinstance(documento, dict):
+                yield documento
+        retstart += retmax
+        if len(uids) < retmax or retstart >= total:
+            return
+
+
+# Claves con las que un accession de la entrada puede aparecer en un resumen
+def _claves_documento(documento):
+    claves = {str(documento.get("uid", ""))}
+    for campo in ("accessionversion", "caption"):
+        valor = documento.get(campo)
+        if valor:
+            claves.add(valor.upper())
+            claves.add(valor.split(".")[0].upper())
+    return claves
+
+
+# Resuelve una lista de accessions de NCBI Protein con el history server
+# Entrada = iterable de accessions, accessions por epost, documentos por esummary
+# Salida = generador de tuplas (accession, resumen de esummary o None, error o None),
+#          en el orden de entrada, lote por lote
+def resumenes_ncbi(accessions, tamano_lote=TAMANO_LOTE_POST, retmax=RETMAX_RESUMEN):
+    lote = []
+    for accession in accessions:
+        lote.append(accession)
+        if len(lote) == tamano_lote:
+            yield from _resumenes_lote(lote, retmax)
+            lote = []
+    if lote:
+        yield from _resumenes_lote(lote, retmax)
+
+
+def _resumenes_lote(lote, retmax):
+    try:
+        webenv, query_key = _epost(lote)
+        por_clave = {}
+        for documento in _esummary_historial(webenv, query_key, len(lote), retmax):
+            for clave in _claves_documento(documento):
+                por_clave.setdefault(clave, documento)
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+        for accession in lote:
+            yield accession, None, error
+        return
+
+    for accession in lote:
+        clave = accession.strip().upper()
+        documento = por_clave.get(clave) or por_clave.get(clave.split(".")[0])
+        if documento is None:
+            yield accession, None, "No encontrado en NCBI"
+        else:
+            yield accession, documento, None
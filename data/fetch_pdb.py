@@ -1,17 +1,25 @@
-import tempfile
-
 import requests
 
+from data import cliente_http
+from data.cache_pdb import cache_estructuras
+
 
 # Descarga un archivo PDB desde la base de datos PDB
+# Si la estructura ya está en la cache local no se hace ninguna petición de red
 # Entrada = ID de PDB (string)
-# Salida = ruta del archivo temporal descargado
-def descargar_pdb(pdb_id):
+# Salida = ruta del archivo local en la cache de estructuras
+def descargar_pdb(pdb_id, usar_cache=True):
     pdb_id = pdb_id.upper()
+
+    if usar_cache:
+        ruta_cache = cache_estructuras.obtener(pdb_id)
+        if ruta_cache:
+            return ruta_cache
+
     url = f"https://files.rcsb.org/download/{pdb_id}.pdb"
 
     try:
-        response = requests.get(url, timeout=30)
+        response = cliente_http.get(url, timeout=30)
 
         # Manejar específicamente el error 404
         if response.status_code == 404:
@@ -28,12 +36,8 @@ def descargar_pdb(pdb_id):
                 f"El archivo PDB '{pdb_id}' está vacío o no contiene datos válidos"
             )
 
-        # Crear archivo temporal
-        temp_file = tempfile.NamedTemporaryFile(mode="w", suffix=".pdb", delete=False)
-        temp_file.write(response.text)
-        temp_file.close()
-
-        return temp_file.name
+        # Guardar en la cache de estructuras (escritura atómica)
+        return cache_estructuras.guardar(pdb_id, response.content)
 
     except requests.exceptions.Timeout:
         raise Exception(
@@ -1,5 +1,25 @@
+import codecs
+import json
+import re
+import time
+
 import requests
 
+from data import cache_respuestas, cliente_http, indice_sifts
+
+URL_IDMAPPING = "https://rest.uniprot.org/idmapping"
+
+URL_UNIPROT_STREAM = "https://rest.uniprot.org/uniprotkb/stream"
+
+# Campos pedidos en las búsquedas de proteínas
+CAMPOS_BUSQUEDA = "accession,id,sequence,protein_name,organism_name,organism_id,length"
+
+# Máximo de IDs que UniProt acepta en un trabajo de mapeo
+MAX_IDS_TRABAJO = 100000
+
+# Enlace a la página siguiente en el encabezado Link de UniProt
+PATRON_LINK_SIGUIENTE = re.compile(r'<([^>]+)>;\s*rel="next"')
+
 
 # Busca una proteina en UniProt por ID
 # Entrada = texto
@@ -12,12 +32,12 @@ def buscar_id_uniprot(id):
 
     params = {
         "format": "json",
-        "fields": "accession,id,sequence,protein_name,organism_name,organism_id,length",
+        "fields": CAMPOS_BUSQUEDA,
     }
 
     try:
 
-        response = requests.get(base_url, params=params, timeout=30)
+        response = cache_respuestas.get(base_url, "uniprot", params=params, timeout=30)
         response.raise_for_status()
 
         return response.json()
@@ -44,13 +64,15 @@ def buscar_uniprot(query):
     params = {
         "query": query,
         "format": "json",
-        "fields": "accession,id,sequence,protein_name,organism_name,organism_id,length",
+        "fields": CAMPOS_BUSQUEDA,
         "size": 10,
     }
 
     try:
 
-        response = requests.get(base_url, params=params, timeout=30)
+        response = cache_respuestas.get(
+            base_url, "uniprot_busqueda", params=params, timeout=30
+        )
         response.raise_for_status()
 
         return response.json()
@@ -64,17 +86,24 @@ def buscar_uniprot(query):
 
 
 # Busca estructuras PDB asociadas a un accession de UniProt
-# Entrada = accession de UniProt
+# Con el índice local de SIFTS (data.indice_sifts) responde sin red; método y
+# resolución quedan en "N/A" porque la tabla de SIFTS no los incluye
+# Entrada = accession de UniProt, fuente ("auto": índice local si existe, "remota": UniProt)
 # Salida = lista de diccionarios con información de PDB
-def buscar_pdb_uniprot(accession):
+def buscar_pdb_uniprot(accession, fuente="auto"):
 
     print(f"Buscando estructuras PDB para accession: {accession}")
 
+    if fuente == "auto" and indice_sifts.disponible():
+        estructuras = indice_sifts.estructuras_de_accession(accession)
+        if estructuras:
+            return estructuras
+
     # URL de la API de UniProt con extensión .json
     url = f"https://rest.uniprot.org/uniprotkb/{accession}.json"
 
     try:
-        response = requests.get(url, timeout=30)
+        response = cache_respuestas.get(url, "uniprot", timeout=30)
         response.raise_for_status()
         data = response.json()
 
@@ -136,7 +165,7 @@ def buscar_features_uniprot(accession, formato="json"):
 
     try:
         print(f"Realizando consulta a: {url}")
-        response = requests.get(url, timeout=30)
+        response = cliente_http.get(url, timeout=30)
         response.raise_for_status()
         return response.content
 
@@ -151,23 +180,210 @@ def buscar_features_uniprot(accession, formato="json"):
         return f"Error inesperado: {str(error)}"
 
 
+# Obtiene la lista de features de una entrada de UniProt (sin mensajes por consola,
+# pensado para descargas en lote)
+# Entrada = accession de UniProt
+# Salida = lista de features en el formato JSON de UniProt
+# Excepciones: requests.exceptions.RequestException ante errores HTTP o de conexión
+def obtener_features_json(accession):
+    url = f"https://rest.uniprot.org/uniprotkb/{accession}.json"
+    response = cliente_http.get(url, timeout=30)
+    response.raise_for_status()
+    return response.json().get("features", [])
+
+
+# Obtiene los segmentos de SIFTS de un PDB desde la API de PDBe (con cache)
+# Entrada = PDB ID
+# Salida = diccionario {accession: registro con "identifier" y "mappings"}
+# Excepciones: requests.exceptions.RequestException ante errores HTTP o de conexión
+def obtener_mapeo_sifts(pdb_id, timeout=20):
+    url = f"https://www.ebi.ac.uk/pdbe/api/mappings/uniprot/{pdb_id.lower()}"
+    resp = cache_respuestas.get(url, "sifts", timeout=timeout)
+    resp.raise_for_status()
+    return resp.json().get(pdb_id.lower(), {}).get("UniProt", {})
+
+
 # Busca los accession asociados a un PDB en UniProt
 # Entrada = PDB ID, cadena ID
 # Salida = lista de accessions
 def buscar_pdb_accessions(pdb_id: str, chain_id: str, timeout: int = 20) -> set[str]:
 
-    url = f"https://www.ebi.ac.uk/pdbe/api/mappings/uniprot/{pdb_id.lower()}"
+    # Índice local de SIFTS: una búsqueda por (pdb, cadena) en lugar del JSON de toda la entrada
+    if indice_sifts.disponible():
+        acceso = indice_sifts.accessions_de_cadena(pdb_id, chain_id)
+        if acceso is not None:
+            return acceso
+
     try:
-        resp = requests.get(url, timeout=timeout)
-        resp.raise_for_status()
-        data = resp.json()
+        mapeo = obtener_mapeo_sifts(pdb_id, timeout)
     except Exception as exc:
         print(f"Advertencia: no se pudo contactar con PDBe-SIFTS ({exc}).")
         return set()
 
+    # La clave es el accession ("identifier" es el nombre de entrada, p. ej. HBA_HUMAN),
+    # igual que en el índice local
     acceso = set()
-    for record in data.get(pdb_id.lower(), {}).get("UniProt", {}).values():
+    for accession, record in mapeo.items():
         for seg in record.get("mappings", []):
             if seg.get("chain_id").strip() == chain_id.strip():
-                acceso.add(record["identifier"])
+                acceso.add(accession)
     return acceso
+
+
+# Envía un trabajo de mapeo de IDs a UniProt
+# Entrada = lista de IDs, base de datos de origen y de destino
+# Salida = ID del trabajo
+def _enviar_trabajo_mapeo(ids, origen, destino):
+    params = {"from": origen, "to": destino, "ids": ",".join(ids)}
+    try:
+        response = cliente_http.post(f"{URL_IDMAPPING}/run", data=params, timeout=60)
+        response.raise_for_status()
+        return response.json()["jobId"]
+    except Exception as e:
+        raise RuntimeError(f"Error al enviar la solicitud de mapeo: {e}")
+
+
+# Espera a que termine un trabajo de mapeo consultando su estado
+# La primera consulta es casi inmediata y la espera crece hasta espera_maxima
+# Entrada = ID del trabajo, espera inicial y máxima (s), tiempo límite total (s)
+# Excepciones: Lanza RuntimeError si el trabajo falla o se supera el tiempo límite
+def _esperar_trabajo_mapeo(job_id, espera_inicial=0.25, espera_maxima=5.0, limite=3600):
+    status_url = f"{URL_IDMAPPING}/status/{job_id}"
+    espera = espera_inicial
+    inicio = time.monotonic()
+
+    while True:
+        time.sleep(espera)
+        try:
+            # Al terminar, UniProt redirige a los resultados: no se sigue la redirección
+            # para no descargar la primera página dos veces
+            response = cliente_http.get(status_url, timeout=30, allow_redirects=False)
+            if response.is_redirect:
+                return
+            response.raise_for_status()
+            status_data = response.json()
+        except Exception as e:
+            raise RuntimeError(f"Error al verificar el estado del trabajo: {e}")
+
+        job_status = status_data.get("jobStatus")
+        if job_status == "FINISHED" or "results" in status_data:
+            return
+        if job_status in ("FAILED", "ERROR"):
+            raise RuntimeError(f"El mapeo falló: {status_data.get('errors', job_status)}")
+        if time.monotonic() - inicio > limite:
+            raise RuntimeError(f"El trabajo de mapeo {job_id} no terminó en {limite} s")
+        espera = min(espera * 1.5, espera_maxima)
+
+
+# Recorre todas las páginas de resultados de un trabajo de mapeo (encabezado Link)
+# Entrada = ID del trabajo, tamaño de página
+# Salida = generador de diccionarios {"from": ..., "to": ...}
+def _resultados_trabajo_mapeo(job_id, tamano_pagina=500):
+    url = f"{URL_IDMAPPING}/results/{job_id}"
+    params = {"size": tamano_pagina}
+    while url:
+        try:
+            response = cliente_http.get(url, params=params, timeout=60)
+            response.raise_for_status()
+            datos = response.json()
+        except Exception as e:
+            raise RuntimeError(f"Error al obtener los resultados: {e}")
+
+        yield from datos.get("results", [])
+
+        # El enlace "next" ya incluye cursor y tamaño de página
+        siguiente = PATRON_LINK_SIGUIENTE.search(response.headers.get("Link", ""))
+        url = siguiente.group(1) if siguiente else None
+        params = None
+
+
+# Mapea muchos IDs a UniProt con trabajos por lotes de la API de ID mapping
+# Entrada = IDs de origen, base de datos de origen y de destino, tamaño de lote
+# Salida = diccionario {ID de origen: lista de IDs de destino} en el orden de entrada
+#          (lista vacía si el ID no se pudo mapear)
+# Excepciones: Lanza RuntimeError si hay problemas de conexión o el mapeo
+def mapear_ids_uniprot(
+    ids, origen="RefSeq_Protein", destino="UniProtKB", tamano_lote=MAX_IDS_TRABAJO
+):
+    ids = list(dict.fromkeys(str(i).strip() for i in ids if str(i).strip()))
+    mapeo = {id_origen: [] for id_origen in ids}
+
+    for inicio in range(0, len(ids), tamano_lote):
+        lote = ids[inicio : inicio + tamano_lote]
+        job_id = _enviar_trabajo_mapeo(lote, origen, destino)
+        _esperar_trabajo_mapeo(job_id)
+        for item in _resultados_trabajo_mapeo(job_id):
+            destino_id = item["to"]
+            # Con destino UniProtKB algunos endpoints devuelven la entrada completa
+            if isinstance(destino_id, dict):
+                destino_id = destino_id.get("primaryAccession")
+            lista = mapeo.setdefault(item["from"], [])
+            if destino_id and destino_id not in lista:
+                lista.append(destino_id)
+
+    return mapeo
+
+
+# Extrae uno a uno los objetos del arreglo `clave` de un documento JSON que llega
+# por fragmentos, sin cargar el documento completo en memoria
+# Entrada = iterable de fragmentos de texto, nombre del arreglo
+# Salida = generador de objetos (diccionarios)
+def objetos_json_en_flujo(fragmentos, clave="results"):
+    decodificador = json.JSONDecoder()
+    fragmentos = iter(fragmentos)
+    buffer, pos = "", -1
+    marcador = re.compile(r'"%s"\s*:\s*\[' % re.escape(clave))
+
+    # Avanzar hasta el inicio del arreglo
+    while pos < 0:
+        fragmento = next(fragmentos, None)
+        if fragmento is None:
+            return
+        buffer += fragmento
+        encontrado = marcador.search(buffer)
+        if encontrado:
+            buffer, pos = buffer[encontrado.end() :], 0
+        else:
+            # Conservar el final por si el marcador quedó partido entre fragmentos
+            buffer = buffer[-(len(clave) + 16) :]
+
+    while True:
+        # Saltar espacios y separadores entre elementos
+        while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+            pos += 1
+        if pos < len(buffer) and buffer[pos] == "]":
+            return
+        try:
+            if pos >= len(buffer):
+                raise ValueError
+            objeto, fin = decodificador.raw_decode(buffer, pos)
+        except ValueError:
+            # Objeto incompleto: leer otro fragmento
+            fragmento = next(fragmentos, None)
+            if fragmento is None:
+                if buffer[pos:].strip():
+                    raise ValueError("Respuesta JSON truncada")
+                return
+            buffer, pos = buffer[pos:] + fragmento, 0
+            continue
+        yield objeto
+        pos = fin
+        # Descartar lo ya procesado para que el buffer no crezca
+        if pos > 1 << 20:
+            buffer, pos = buffer[pos:], 0
+
+
+# Busca proteínas en UniProt con el endpoint de streaming (todos los resultados)
+# La respuesta se procesa por fragmentos, un resultado a la vez
+# Entrada = consulta, campos a pedir
+# Salida = generador de resultados (diccionarios en el formato JSON de UniProt)
+# Excepciones: requests.exceptions.RequestException ante errores HTTP o de conexión
+def buscar_uniprot_stream(query, campos=CAMPOS_BUSQUEDA):
+    params = {"query": query, "format": "json", "fields": campos}
+    response = cliente_http.get(URL_UNIPROT_STREAM, params=params, stream=True, timeout=60)
+    try:
+        response.raise_for_status()
+        texto = codecs.iterdecode(response.iter_content(chunk_size=1 << 16), "utf-8")
+        yield from objetos_json_en_flujo(texto)
+    finally:
+        response.close()
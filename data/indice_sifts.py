@@ -0,0 +1,300 @@
+import csv
+import gzip
+import io
+import os
+import sqlite3
+import threading
+import time
+
+from data import cliente_http
+from data.cache_pdb import DIRECTORIO_CACHE
+
+# =============================================================================
+# ÍNDICE LOCAL DE SIFTS: CADENA PDB <-> ACCESSION DE UNIPROT
+# =============================================================================
+#
+# Importa la tabla masiva pdb_chain_uniprot de SIFTS (PDBe), ~1 millón de
+# segmentos, en una base SQLite con dos accesos por índice:
+#
+#   (pdb, cadena)  -> accessions de una cadena      (verificación del RMSD);
+#                     clave primaria de la tabla (WITHOUT ROWID, filas agrupadas)
+#   (accession)    -> PDB, cadena y rangos mapeados (buscar-pdb, rmsd-matriz)
+#
+# La tabla se lee en flujo (descarga gzip o archivo local) y se escribe en una
+# base temporal que reemplaza a la anterior al terminar, así que las consultas
+# en curso nunca ven un índice a medio importar. Cada consulta es una búsqueda
+# por índice, sin red.
+#
+# Configuración por variable de entorno:
+#   BBDD_INDICE_SIFTS  ruta de la base (default: <cache>/indice_sifts.sqlite)
+#
+# =============================================================================
+
+URL_PDB_CHAIN_UNIPROT = (
+    "https://ftp.ebi.ac.uk/pub/databases/msd/sifts/flatfiles/tsv/pdb_chain_uniprot.tsv.gz"
+)
+RUTA_INDICE = os.environ.get(
+    "BBDD_INDICE_SIFTS", os.path.join(DIRECTORIO_CACHE, "indice_sifts.sqlite")
+)
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS segmentos (
+    pdb TEXT NOT NULL,
+    cadena TEXT NOT NULL,
+    accession TEXT NOT NULL,
+    res_beg INTEGER,
+    res_end INTEGER,
+    pdb_beg TEXT,
+    pdb_end TEXT,
+    sp_beg INTEGER,
+    sp_end INTEGER,
+    -- Agrupada por cadena: la consulta (pdb, cadena) lee filas contiguas sin índice aparte
+    PRIMARY KEY (pdb, cadena, accession, res_beg)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS metadatos (
+    clave TEXT PRIMARY KEY,
+    valor TEXT
+);
+"""
+
+# El índice por accession se crea después de la carga masiva (más rápido que
+# mantenerlo fila a fila)
+_INDICES = """
+CREATE INDEX IF NOT EXISTS segmentos_accession ON segmentos (accession);
+"""
+
+_INSERTAR = "INSERT OR IGNORE INTO segmentos VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
+
+_COLUMNAS = ("PDB", "CHAIN", "SP_PRIMARY", "RES_BEG", "RES_END", "PDB_BEG", "PDB_END", "SP_BEG", "SP_END")
+
+_local = threading.local()
+
+
+def _entero(valor):
+    try:
+        return int(valor)
+    except (TypeError, ValueError):
+        return None
+
+
+# Indica si hay un índice importado
+def disponible(ruta=None):
+    return os.path.exists(ruta or RUTA_INDICE)
+
+
+# Devuelve la conexión de sólo lectura del hilo actual (se reabre si el archivo cambió)
+def _conexion(ruta=None):
+    ruta = ruta or RUTA_INDICE
+    marca = (ruta, os.stat(ruta).st_mtime_ns)
+    conexion = getattr(_local, "conexion", None)
+    if conexion is None or getattr(_local, "marca", None) != marca:
+        if conexion is not None:
+            conexion.close()
+        conexion = sqlite3.connect(f"file:{ruta}?mode=ro", uri=True, check_same_thread=False)
+        _local.conexion, _local.marca = conexion, marca
+    return conexion
+
+
+# Abre el texto de la tabla SIFTS desde una URL o un archivo (gzip o no)
+# Entrada = origen (URL o ruta)
+# Salida = objeto de texto iterable por líneas y función para cerrarlo
+def _abrir_origen(origen):
+    if origen.startswith(("http://", "https://")):
+        response = cliente_http.get(origen, stream=True, timeout=120)
+        response.raise_for_status()
+        crudo = response.raw
+        # Los archivos .gz se sirven comprimidos tal cual (sin Content-Encoding)
+        if origen.endswith(".gz"):
+            crudo = gzip.GzipFile(fileobj=crudo)
+        return io.TextIOWrapper(crudo, encoding="utf-8", newline=""), response.close
+    abrir = gzip.open if origen.endswith(".gz") else open
+    archivo = abrir(origen, "rt", encoding="utf-8", newline="")
+    return archivo, archivo.close
+
+
+# Lee los segmentos de la tabla pdb_chain_uniprot
+# Entrada = líneas de texto (la primera puede ser un comentario con las versiones)
+# Salida = generador de tuplas en el orden de la tabla segmentos; las versiones se guardan
+#          en el diccionario info. Se omiten los segmentos sin rango de UniProt (SP_BEG o
+#          SP_END vacíos o no numéricos), que no sirven para traducir posiciones
+def _segmentos_desde_tabla(lineas, info):
+    lineas = iter(lineas)
+    primera = next(lineas, "")
+    if primera.startswith("#"):
+        info["versiones"] = primera.lstrip("# ").strip()
+        primera = next(lineas, "")
+    encabezado = primera.rstrip("\r\n").split("\t")
+    faltantes = [c for c in _COLUMNAS if c not in encabezado]
+    if faltantes:
+        raise ValueError(f"Tabla SIFTS sin las columnas: {', '.join(faltantes)}")
+    posiciones = [encabezado.index(c) for c in _COLUMNAS]
+
+    for campos in csv.reader(lineas, delimiter="\t"):
+        if len(campos) < len(encabezado):
+            continue
+        pdb, cadena, accession, res_beg, res_end, pdb_beg, pdb_end, sp_beg, sp_end = (
+            campos[i] for i in posiciones
+        )
+        sp_beg, sp_end = _entero(sp_beg), _entero(sp_end)
+        if sp_beg is None or sp_end is None:
+            continue
+        yield (
+            pdb.upper(),
+            cadena,
+            accession,
+            _entero(res_beg),
+            _entero(res_end),
+            pdb_beg,
+            pdb_end,
+            sp_beg,
+            sp_end,
+        )
+
+
+# Importa la tabla pdb_chain_uniprot de SIFTS al índice local (reemplaza al anterior)
+# Entrada = origen (URL o ruta; default: tabla actual de PDBe), ruta del índice, filas por lote
+# Salida = cantidad de segmentos importados
+def importar(origen=None, ruta=None, tamano_lote=50000):
+    origen = origen or URL_PDB_CHAIN_UNIPROT
+    ruta = ruta or RUTA_INDICE
+    carpeta = os.path.dirname(ruta)
+    if carpeta:
+        os.makedirs(carpeta, exist_ok=True)
+    temporal = f"{ruta}.{os.getpid()}.tmp"
+    if os.path.exists(temporal):
+        os.unlink(temporal)
+
+    inicio = time.perf_counter()
+    print(f"Importando SIFTS desde {origen}...")
+    texto, cerrar = _abrir_origen(origen)
+    info, total = {}, 0
+    conexion = sqlite3.connect(temporal)
+    try:
+        conexion.execute("PRAGMA journal_mode=OFF")
+        conexion.execute("PRAGMA synchronous=OFF")
+        conexion.executescript(_ESQUEMA)
+        lote = []
+        with conexion:
+            for segmento in _segmentos_desde_tabla(texto, info):
+                lote.append(segmento)
+                if len(lote) == tamano_lote:
+                    conexion.executemany(_INSERTAR, lote)
+                    total += len(lote)
+                    lote = []
+                    print(f"\rSegmentos importados: {total}", end="", flush=True)
+            if lote:
+                conexion.executemany(_INSERTAR, lote)
+                total += len(lote)
+            print(f"\rSegmentos importados: {total}")
+            conexion.executescript(_INDICES)
+            conexion.executemany(
+                "INSERT OR REPLACE INTO metadatos VALUES (?, ?)",
+                [
+                    ("origen", origen),
+                    ("versiones", info.get("versiones", "")),
+                    ("importado", time.strftime("%Y-%m-%d %H:%M:%S")),
+                    ("segmentos", str(total)),
+                ],
+            )
+        conexion.execute("ANALYZE")
+        conexion.close()
+        os.replace(temporal, ruta)
+    except BaseException:
+        conexion.close()
+        if os.path.exists(temporal):
+            os.unlink(temporal)
+        raise
+    finally:
+        cerrar()
+
+    print(f"Índice SIFTS guardado en {ruta} ({time.perf_counter() - inicio:.1f} s)")
+    return total
+
+
+# Accessions de UniProt mapeados a una cadena de un PDB
+# Entrada = PDB ID, cadena ID, ruta del índice
+# Salida = conjunto de accessions (vacío si la cadena no tiene mapeo), o None si el PDB
+#          no está en el índice (entrada posterior a la importación)
+def accessions_de_cadena(pdb_id, cadena_id, ruta=None):
+    conexion = _conexion(ruta)
+    pdb_id, cadena_id = pdb_id.upper(), cadena_id.strip()
+    filas = conexion.execute(
+        "SELECT DISTINCT accession FROM segmentos WHERE pdb = ? AND cadena = ?",
+        (pdb_id, cadena_id),
+    ).fetchall()
+    if filas:
+        return {accession for (accession,) in filas}
+    existe = conexion.execute(
+        "SELECT 1 FROM segmentos WHERE pdb = ? LIMIT 1", (pdb_id,)
+    ).fetchone()
+    return set() if existe else None
+
+
+# Segmentos de todas las cadenas de un PDB (para el mapa de numeración por residuo)
+# Los segmentos sin rango de UniProt (de índices importados antes de omitirlos) se ignoran
+# Entrada = PDB ID, ruta del índice
+# Salida = lista de diccionarios con cadena, accession y rangos (vacía si el PDB no está)
+def segmentos_de_pdb(pdb_id, ruta=None):
+    filas = _conexion(ruta).execute(
+        "SELECT cadena, accession, res_beg, res_end, pdb_beg, pdb_end, sp_beg, sp_end "
+        "FROM segmentos WHERE pdb = ? AND sp_beg IS NOT NULL AND sp_end IS NOT NULL "
+        "ORDER BY cadena, accession, sp_beg",
+        (pdb_id.upper(),),
+    ).fetchall()
+    columnas = ("cadena", "accession", "res_beg", "res_end", "pdb_beg", "pdb_end", "sp_beg", "sp_end")
+    return [dict(zip(columnas, fila)) for fila in filas]
+
+
+# Segmentos (PDB, cadena y rangos) mapeados a un accession de UniProt
+# Los segmentos sin rango de UniProt se ignoran, como en segmentos_de_pdb()
+# Entrada = accession, ruta del índice
+# Salida = lista de diccionarios ordenada por PDB y cadena
+def segmentos_de_accession(accession, ruta=None):
+    filas = _conexion(ruta).execute(
+        "SELECT pdb, cadena, res_beg, res_end, pdb_beg, pdb_end, sp_beg, sp_end "
+        "FROM segmentos WHERE accession = ? AND sp_beg IS NOT NULL AND sp_end IS NOT NULL "
+        "ORDER BY pdb, cadena, sp_beg",
+        (accession,),
+    ).fetchall()
+    columnas = ("pdb", "cadena", "res_beg", "res_end", "pdb_beg", "pdb_end", "sp_beg", "sp_end")
+    return [dict(zip(columnas, fila)) for fila in filas]
+
+
+# Agrupa los segmentos de un accession por PDB con el formato de la propiedad "Chains"
+# de UniProt ("A/C=1-141, B/D=1-146"), para que el resto del código no cambie
+# Entrada = accession, ruta del índice
+# Salida = lista de diccionarios {identifier, method, resolution, chain}
+def estructuras_de_accession(accession, ruta=None):
+    por_pdb = {}
+    for segmento in segmentos_de_accession(accession, ruta):
+        cadenas = por_pdb.setdefault(segmento["pdb"], {})
+        inicio, fin = cadenas.get(segmento["cadena"], (segmento["sp_beg"], segmento["sp_end"]))
+        cadenas[segmento["cadena"]] = (
+            min(inicio, segmento["sp_beg"]),
+            max(fin, segmento["sp_end"]),
+        )
+
+    estructuras = []
+    for pdb_id, cadenas in por_pdb.items():
+        por_rango = {}
+        for cadena_id, rango in sorted(cadenas.items()):
+            por_rango.setdefault(rango, []).append(cadena_id)
+        texto = ", ".join(
+            f"{'/'.join(ids)}={inicio}-{fin}"
+            for (inicio, fin), ids in sorted(por_rango.items(), key=lambda item: item[1])
+        )
+        # La tabla de SIFTS no trae método ni resolución
+        estructuras.append(
+            {"identifier": pdb_id, "method": "N/A", "resolution": "N/A", "chain": texto}
+        )
+    return estructuras
+
+
+# Retorna la cantidad de segmentos y los datos de la última importación
+def estadisticas(ruta=None):
+    if not disponible(ruta):
+        return {"segmentos": 0}
+    conexion = _conexion(ruta)
+    datos = dict(conexion.execute("SELECT clave, valor FROM metadatos"))
+    datos["segmentos"] = conexion.execute("SELECT COUNT(*) FROM segmentos").fetchone()[0]
+    return datos
@@ -0,0 +1,324 @@
+import csv
+import datetime
+import gzip
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from data.cache_pdb import DIRECTORIO_CACHE
+from data.fetch_uniprot import buscar_uniprot_stream, objetos_json_en_flujo
+
+# =============================================================================
+# ÍNDICE LOCAL DE TEXTO COMPLETO DE UNIPROT (SQLITE FTS5)
+# =============================================================================
+#
+# Tabla "entradas" con accession, nombre de entrada, nombre de proteína,
+# organismo y longitud, e índice FTS5 sincronizado por triggers sobre los
+# campos de texto. Se alimenta desde:
+#   - archivos descargados: JSON de UniProt ({"results": [...]}), JSONL de la
+#     búsqueda masiva (buscar --masivo) o TSV de UniProt, comprimidos o no;
+#   - consultas remotas (endpoint de streaming); al repetir una consulta sólo
+#     se piden las entradas modificadas desde la última actualización.
+#
+# buscar_local() devuelve el mismo formato JSON que buscar_uniprot(), de modo
+# que prote_search puede responder desde el índice sin cambiar la salida.
+#
+# =============================================================================
+
+RUTA_INDICE = os.environ.get(
+    "BBDD_INDICE_UNIPROT", os.path.join(DIRECTORIO_CACHE, "indice_uniprot.sqlite")
+)
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS entradas (
+    id INTEGER PRIMARY KEY,
+    accession TEXT NOT NULL UNIQUE,
+    entry_name TEXT,
+    protein_name TEXT,
+    organism TEXT,
+    organism_id INTEGER,
+    length INTEGER
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS entradas_fts USING fts5(
+    accession, entry_name, protein_name, organism,
+    content='entradas', content_rowid='id'
+);
+CREATE TRIGGER IF NOT EXISTS entradas_ai AFTER INSERT ON entradas BEGIN
+    INSERT INTO entradas_fts(rowid, accession, entry_name, protein_name, organism)
+    VALUES (new.id, new.accession, new.entry_name, new.protein_name, new.organism);
+END;
+CREATE TRIGGER IF NOT EXISTS entradas_ad AFTER DELETE ON entradas BEGIN
+    INSERT INTO entradas_fts(entradas_fts, rowid, accession, entry_name, protein_name, organism)
+    VALUES ('delete', old.id, old.accession, old.entry_name, old.protein_name, old.organism);
+END;
+CREATE TRIGGER IF NOT EXISTS entradas_au AFTER UPDATE ON entradas BEGIN
+    INSERT INTO entradas_fts(entradas_fts, rowid, accession, entry_name, protein_name, organism)
+    VALUES ('delete', old.id, old.accession, old.entry_name, old.protein_name, old.organism);
+    INSERT INTO entradas_fts(rowid, accession, entry_name, protein_name, organism)
+    VALUES (new.id, new.accession, new.entry_name, new.protein_name, new.organism);
+END;
+CREATE TABLE IF NOT EXISTS actualizaciones (
+    consulta TEXT PRIMARY KEY,
+    fecha TEXT NOT NULL
+);
+"""
+
+_INSERTAR = """
+INSERT INTO entradas (accession, entry_name, protein_name, organism, organism_id, length)
+VALUES (:accession, :entry_name, :protein_name, :organism, :organism_id, :length)
+ON CONFLICT(accession) DO UPDATE SET
+    entry_name = excluded.entry_name,
+    protein_name = excluded.protein_name,
+    organism = excluded.organism,
+    organism_id = excluded.organism_id,
+    length = excluded.length
+"""
+
+_local = threading.local()
+
+# Columnas de los TSV de UniProt (nombre en el encabezado -> campo del índice)
+_COLUMNAS_TSV = {
+    "Entry": "accession",
+    "Entry Name": "entry_name",
+    "Protein names": "protein_name",
+    "Organism": "organism",
+    "Organism (ID)": "organism_id",
+    "Length": "length",
+}
+
+
+# Abre (y crea si hace falta) la base del índice
+# Entrada = ruta (None = RUTA_INDICE)
+# Salida = conexión SQLite
+def conectar(ruta=None):
+    ruta = ruta or RUTA_INDICE
+    carpeta = os.path.dirname(ruta)
+    if carpeta:
+        os.makedirs(carpeta, exist_ok=True)
+    conexion = sqlite3.connect(ruta, timeout=30)
+    conexion.execute("PRAGMA journal_mode=WAL")
+    conexion.executescript(_ESQUEMA)
+    return conexion
+
+
+def existe(ruta=None):
+    return os.path.exists(ruta or RUTA_INDICE)
+
+
+# Devuelve la conexión de sólo lectura del hilo actual para las búsquedas (sin crear
+# carpetas ni esquema; se reabre si el archivo cambió)
+def _conexion(ruta=None):
+    ruta = ruta or RUTA_INDICE
+    marca = (ruta, os.stat(ruta).st_mtime_ns)
+    conexion = getattr(_local, "conexion", None)
+    if conexion is None or getattr(_local, "marca", None) != marca:
+        if conexion is not None:
+            conexion.close()
+        conexion = sqlite3.connect(f"file:{ruta}?mode=ro", uri=True, check_same_thread=False)
+        try:
+            conexion.execute("SELECT 1 FROM entradas LIMIT 0")
+        except sqlite3.OperationalError:
+            # Índice en WAL dentro de una carpeta de sólo lectura: sin poder crear los
+            # archivos -wal/-shm se abre como inmutable
+            conexion.close()
+            conexion = sqlite3.connect(
+                f"file:{ruta}?mode=ro&immutable=1", uri=True, check_same_thread=False
+            )
+        _local.conexion, _local.marca = conexion, marca
+    return conexion
+
+
+def _entero(valor):
+    try:
+        return int(valor)
+    except (TypeError, ValueError):
+        return None
+
+
+# Convierte un resultado JSON de UniProt o una fila de la búsqueda masiva en un registro
+# Entrada = diccionario
+# Salida = registro del índice (o None si no tiene accession)
+def registro_desde_json(result):
+    if "primaryAccession" not in result:
+        # Fila de buscar --masivo (utils.prote_search._fila_masiva)
+        if not result.get("accession"):
+            return None
+        return {
+            "accession": result["accession"],
+            "entry_name": result.get("id"),
+            "protein_name": result.get("nombre"),
+            "organism": result.get("organismo"),
+            "organism_id": _entero(result.get("organismo_id")),
+            "length": _entero(result.get("longitud")),
+        }
+
+    descripcion = result.get("proteinDescription", {})
+    nombre = descripcion.get("recommendedName") or next(
+        iter(descripcion.get("submissionNames") or []), {}
+    )
+    organismo = result.get("organism", {})
+    texto_organismo = organismo.get("scientificName")
+    if texto_organismo and organismo.get("commonName"):
+        texto_organismo += f" ({organismo['commonName']})"
+    return {
+        "accession": result["primaryAccession"],
+        "entry_name": result.get("uniProtkbId"),
+        "protein_name": nombre.get("fullName", {}).get("value"),
+        "organism": texto_organismo,
+        "organism_id": _entero(organismo.get("taxonId")),
+        "length": _entero(result.get("sequence", {}).get("length")),
+    }
+
+
+# Lee los registros de un archivo descargado (JSON, JSONL o TSV; admite .gz)
+# Entrada = ruta
+# Salida = generador de registros del índice
+def registros_desde_archivo(ruta):
+    base = ruta[:-3] if ruta.endswith(".gz") else ruta
+    abrir = gzip.open if ruta.endswith(".gz") else open
+    with abrir(ruta, "rt", encoding="utf-8", newline="") as f:
+        if base.endswith((".tsv", ".tab", ".txt")):
+            for fila in csv.DictReader(f, delimiter="\t"):
+                registro = {
+                    campo: fila.get(columna) for columna, campo in _COLUMNAS_TSV.items()
+                }
+                registro["organism_id"] = _entero(registro["organism_id"])
+                registro["length"] = _entero(registro["length"])
+                if registro["accession"]:
+                    yield registro
+        elif base.endswith(".jsonl"):
+            for linea in f:
+                if linea.strip():
+                    registro = registro_desde_json(json.loads(linea))
+                    if registro:
+                        yield registro
+        else:
+            fragmentos = iter(lambda: f.read(1 << 16), "")
+            for result in objetos_json_en_flujo(fragmentos):
+                registro = registro_desde_json(result)
+                if registro:
+                    yield registro
+
+
+# Inserta o actualiza registros en lotes dentro de una transacción
+# Entrada = conexión, iterable de registros, tamaño de lote
+# Salida = cantidad de registros procesados
+def guardar_registros(conexion, registros, tamano_lote=5000):
+    total, lote = 0, []
+    with conexion:
+        for registro in registros:
+            lote.append(registro)
+            if len(lote) == tamano_lote:
+                conexion.executemany(_INSERTAR, lote)
+                total += len(lote)
+                lote = []
+                print(f"\rEntradas indexadas: {total}", end="", flush=True)
+        if lote:
+            conexion.executemany(_INSERTAR, lote)
+            total += len(lote)
+    print(f"\rEntradas indexadas: {total}")
+    return total
+
+
+# Importa archivos descargados de UniProt al índice
+# Entrada = lista de rutas
+# Salida = cantidad de registros procesados
+def importar_archivos(rutas, ruta_indice=None):
+    conexion = conectar(ruta_indice)
+    try:
+        total = 0
+        for ruta in rutas:
+            print(f"Importando {ruta}...")
+            total += guardar_registros(conexion, registros_desde_archivo(ruta))
+        return total
+    finally:
+        conexion.close()
+
+
+# Actualiza el índice con una consulta remota de UniProt
+# Si la consulta ya se ejecutó, sólo se piden las entradas modificadas desde entonces
+# Entrada = consulta de UniProt, completa (ignorar la fecha de la última actualización)
+# Salida = cantidad de registros procesados
+def actualizar_desde_consulta(consulta, completa=False, ruta_indice=None):
+    conexion = conectar(ruta_indice)
+    try:
+        fila = conexion.execute(
+            "SELECT fecha FROM actualizaciones WHERE consulta = ?", (consulta,)
+        ).fetchone()
+        hoy = datetime.date.today().isoformat()
+        consulta_remota = consulta
+        if fila and not completa:
+            consulta_remota = f"({consulta}) AND (date_modified:[{fila[0]} TO *])"
+            print(f"Actualización incremental desde {fila[0]}")
+
+        campos = "accession,id,protein_name,organism_name,organism_id,length"
+        registros = (
+            registro_desde_json(result)
+            for result in buscar_uniprot_stream(consulta_remota, campos)
+        )
+        total = guardar_registros(conexion, (r for r in registros if r))
+        with conexion:
+            conexion.execute(
+                "INSERT OR REPLACE INTO actualizaciones VALUES (?, ?)", (consulta, hoy)
+            )
+        return total
+    finally:
+        conexion.close()
+
+
+# Convierte texto libre en una consulta FTS5 (todas las palabras, con prefijo)
+def _consulta_fts(texto):
+    palabras = re.findall(r"\w+", texto, flags=re.UNICODE)
+    return " ".join(f'"{palabra}"*' for palabra in palabras)
+
+
+def _resultado_desde_fila(fila):
+    accession, entry_name, protein_name, organism, organism_id, length = fila
+    return {
+        "primaryAccession": accession,
+        "uniProtkbId": entry_name,
+        "proteinDescription": {"recommendedName": {"fullName": {"value": protein_name}}}
+        if protein_name
+        else {},
+        "organism": {"scientificName": organism, "taxonId": organism_id},
+        "sequence": {"length": length},
+    }
+
+
+# Busca en el índice local por accession exacto o por texto libre (ranking BM25)
+# Entrada = texto, máximo de resultados
+# Salida = data en el formato de buscar_uniprot ({"results": [...]}) con el tiempo en ms
+def buscar_local(texto, limite=10, ruta_indice=None):
+    inicio = time.perf_counter()
+    conexion = _conexion(ruta_indice)
+    columnas = "e.accession, e.entry_name, e.protein_name, e.organism, e.organism_id, e.length"
+    filas = conexion.execute(
+        f"SELECT {columnas} FROM entradas e WHERE e.accession = ?", (texto.strip(),)
+    ).fetchall()
+    consulta = _consulta_fts(texto)
+    if not filas and consulta:
+        filas = conexion.execute(
+            # El ranking se resuelve dentro de FTS5 antes de unir con la tabla
+            f"SELECT {columnas} FROM (SELECT rowid, rank FROM entradas_fts "
+            "WHERE entradas_fts MATCH ? ORDER BY rank LIMIT ?) f "
+            "JOIN entradas e ON e.id = f.rowid ORDER BY f.rank",
+            (consulta, limite),
+        ).fetchall()
+    return {
+        "results": [_resultado_desde_fila(fila) for fila in filas],
+        "milisegundos": (time.perf_counter() - inicio) * 1000,
+    }
+
+
+# Retorna la cantidad de entradas y las consultas remotas registradas
+def estadisticas(ruta_indice=None):
+    conexion = conectar(ruta_indice)
+    try:
+        entradas = conexion.execute("SELECT COUNT(*) FROM entradas").fetchone()[0]
+        consultas = dict(conexion.execute("SELECT consulta, fecha FROM actualizaciones"))
+    finally:
+        conexion.close()
+    return {"entradas": entradas, "consultas": consultas}
@@ -1,30 +1,148 @@
 import click
 
-from utils import features_search as fs
-from utils import pdb_search as pdb
-from utils import pdb_viewer as pdbv
-from utils import prote_search as ps
-from utils import rmsd_analysis as rmsd
+from utils.opciones_cli import DPI_DEFAULT, FORMATOS, FORMATOS_IMAGEN, REPRESENTACIONES
+
+# Los módulos de cada comando (pandas, numpy, Bio.PDB, py3Dmol, matplotlib...) se
+# importan dentro del comando, recién cuando se ejecuta: "main.py --help" o
+# "main.py buscar" no cargan las dependencias de los demás comandos. Las opciones
+# compartidas (formatos, dpi, representaciones) vienen de utils/opciones_cli.py,
+# que no importa nada.
+# benchmarks/bench_inicio_cli.py mide el arranque de cada comando con -X importtime.
 
 
 # CLI para buscar proteínas en bases de datos biológicas
 @click.group()
-def cli():
-    pass
+@click.option(
+    "--sin-conexion",
+    is_flag=True,
+    help="Usar sólo respuestas guardadas en la cache local (sin acceder a las APIs)",
+)
+def cli(sin_conexion):
+    if sin_conexion:
+        from data import cache_respuestas
+
+        cache_respuestas.configurar(sin_conexion=True)
 
 
 # Busca información de una proteína por su ID
 @cli.command()
 @click.argument("prompt")
-def buscar(prompt):
-    print(ps.buscar(prompt))
+@click.option(
+    "--masivo",
+    "-m",
+    is_flag=True,
+    help="Descargar todos los resultados de la búsqueda de texto a un archivo",
+)
+@click.option(
+    "--salida",
+    "-o",
+    help="Archivo de la búsqueda masiva (.jsonl.gz o .parquet; default: resultados/busqueda_<consulta>.jsonl.gz)",
+)
+@click.option(
+    "--fuente",
+    type=click.Choice(["auto", "local", "remota"]),
+    default="auto",
+    help="auto: índice local primero y UniProt si no hay resultados; local: sólo índice; remota: sólo UniProt",
+)
+def buscar(prompt, masivo, salida, fuente):
+    from utils import prote_search as ps
+
+    if masivo or salida:
+        print(ps.buscar_masivo(prompt, salida))
+    else:
+        print(ps.buscar(prompt, fuente))
+
+
+# Importa archivos descargados de UniProt (JSON, JSONL de buscar --masivo o TSV) al índice local
+@cli.command()
+@click.argument("archivos", nargs=-1, required=True)
+def indice_importar(archivos):
+    from data import indice_uniprot
+
+    total = indice_uniprot.importar_archivos(archivos)
+    print(f"Importadas {total} entradas. Total en el índice: {indice_uniprot.estadisticas()['entradas']}")
+
+
+# Actualiza el índice local con una consulta de UniProt (incremental si ya se ejecutó)
+@cli.command()
+@click.argument("consulta")
+@click.option(
+    "--completa", is_flag=True, help="Descargar todo aunque la consulta ya esté en el índice"
+)
+def indice_actualizar(consulta, completa):
+    from data import indice_uniprot
+
+    total = indice_uniprot.actualizar_desde_consulta(consulta, completa)
+    print(f"Actualizadas {total} entradas. Total en el índice: {indice_uniprot.estadisticas()['entradas']}")
 
 
 # Busca estructuras PDB asociadas a un accession de UniProt
 @cli.command()
 @click.argument("accession")
-def buscar_pdb(accession):
-    print(pdb.lista_pdb(accession))
+@click.option(
+    "--fuente",
+    type=click.Choice(["auto", "remota"]),
+    default="auto",
+    help="auto: índice local de SIFTS si está importado; remota: UniProt (con método y resolución)",
+)
+def buscar_pdb(accession, fuente):
+    from utils import pdb_search as pdb
+
+    print(pdb.lista_pdb(accession, fuente))
+
+
+# Importa la tabla pdb_chain_uniprot de SIFTS al índice local (cadena PDB <-> UniProt)
+@cli.command()
+@click.argument("origen", required=False)
+def sifts_importar(origen):
+    from data import indice_sifts
+
+    indice_sifts.importar(origen)
+    print(f"Segmentos en el índice: {indice_sifts.estadisticas()['segmentos']}")
+
+
+# Mapea en lote IDs de NCBI (RefSeq Protein) a UniProt
+@cli.command()
+@click.argument("ids", nargs=-1)
+@click.option(
+    "--archivo", "-a", help="Archivo con IDs (uno por línea o separados por comas)"
+)
+@click.option("--salida", "-o", help="Ruta del TSV de salida (opcional)")
+@click.option(
+    "--origen", default="RefSeq_Protein", help="Base de datos de origen (default: RefSeq_Protein)"
+)
+@click.option(
+    "--destino", default="UniProtKB", help="Base de datos de destino (default: UniProtKB)"
+)
+def mapear_ids(ids, archivo, salida, origen, destino):
+    from utils import mapeo_ids as mid
+
+    mid.mapear_ids(ids, archivo, salida, origen, destino)
+
+
+# Anota en lote accessions de NCBI Protein (history server de E-utilities)
+@cli.command()
+@click.argument("ids", nargs=-1)
+@click.option(
+    "--archivo", "-a", help="Archivo con IDs (uno por línea o separados por comas)"
+)
+@click.option(
+    "--salida",
+    "-o",
+    help="Dataset de salida (.jsonl.gz o .parquet; default: resultados/ncbi_<archivo>.jsonl.gz)",
+)
+@click.option(
+    "--api-key",
+    envvar="NCBI_API_KEY",
+    help="Clave de API de NCBI: 10 peticiones/s en lugar de 3 (default: $NCBI_API_KEY)",
+)
+def anotar_ncbi(ids, archivo, salida, api_key):
+    from data import fetch_ncbi
+    from utils import anotacion_ncbi as an
+
+    if api_key:
+        fetch_ncbi.configurar(api_key=api_key)
+    print(an.anotar_ncbi(ids, archivo, salida))
 
 
 # Analiza RMSD local entre dos estructuras PDB
@@ -34,15 +152,83 @@ def buscar_pdb(accession):
 @click.option("--cadena1", "-c1", help="ID de la cadena del PDB1 a analizar (opcional)")
 @click.option("--cadena2", "-c2", help="ID de la cadena del PDB2 a analizar (opcional)")
 @click.option(
-    "--ventana", "-w", default=5, help="Tamaño de la ventana deslizante (default: 5)"
+    "--ventana",
+    "-w",
+    default=[5],
+    multiple=True,
+    type=int,
+    help="Tamaño de la ventana deslizante (default: 5). Repetir para varias ventanas: -w 3 -w 5 -w 10",
+)
+@click.option(
+    "--formato",
+    type=click.Choice(FORMATOS),
+    default="png",
+    help="Salida: png, svg compacto o perfil json (default: png)",
 )
-def rmsd_pdb(pdb1, pdb2, cadena1, cadena2, ventana):
-    resultado = rmsd.analizar_rmsd_local(pdb1, pdb2, cadena1, cadena2, ventana)
+@click.option(
+    "--dpi", default=DPI_DEFAULT, help=f"Resolución del PNG (default: {DPI_DEFAULT})"
+)
+def rmsd_pdb(pdb1, pdb2, cadena1, cadena2, ventana, formato, dpi):
+    from utils import rmsd_analysis as rmsd
+
+    # Una sola ventana mantiene el análisis clásico; varias se calculan en una pasada
+    ventana = ventana[0] if len(ventana) == 1 else list(ventana)
+    resultado = rmsd.analizar_rmsd_local(
+        pdb1, pdb2, cadena1, cadena2, ventana, formato, dpi
+    )
     if resultado[0]:
         print(f"\nAnálisis completado exitosamente!")
         print(f"Archivo generado: {resultado[0]}")
 
 
+# Grafica en paralelo perfiles JSON de RMSD local (rmsd-pdb --formato json)
+@cli.command()
+@click.argument("perfiles", nargs=-1, required=True)
+@click.option(
+    "--formato",
+    type=click.Choice(FORMATOS_IMAGEN),
+    default="svg",
+    help="Formato de los gráficos (default: svg)",
+)
+@click.option(
+    "--dpi", default=DPI_DEFAULT, help=f"Resolución del PNG (default: {DPI_DEFAULT})"
+)
+@click.option("--carpeta", "-o", default="graficos", help="Carpeta de salida (default: graficos)")
+@click.option("--procesos", "-p", type=int, help="Procesos de trabajo (default: CPUs)")
+def graficar_rmsd(perfiles, formato, dpi, carpeta, procesos):
+    from utils import graficos_rmsd as graf
+
+    graf.graficar_lote(list(perfiles), formato, dpi, carpeta, procesos)
+
+
+# Calcula la matriz de RMSD global entre todas las estructuras PDB de un accession
+@cli.command()
+@click.argument("accession")
+@click.option("--salida", "-o", help="Ruta del archivo .npz de salida (opcional)")
+@click.option(
+    "--procesos", "-p", type=int, help="Procesos para el cálculo (default: CPUs)"
+)
+@click.option(
+    "--hilos", default=8, help="Descargas concurrentes de estructuras (default: 8)"
+)
+@click.option(
+    "--min-comunes",
+    default=10,
+    help="Mínimo de residuos comunes para calcular el RMSD de un par (default: 10)",
+)
+@click.option(
+    "--todas-las-cadenas",
+    is_flag=True,
+    help="Comparar todas las cadenas de cada PDB (default: sólo la primera)",
+)
+def rmsd_matriz(accession, salida, procesos, hilos, min_comunes, todas_las_cadenas):
+    from utils import rmsd_matriz as rmat
+
+    rmat.analizar_matriz_rmsd(
+        accession, salida, procesos, hilos, min_comunes, todas_las_cadenas
+    )
+
+
 # Descarga features de una proteína por accession de UniProt
 @cli.command()
 @click.argument("accession")
@@ -50,15 +236,52 @@ def rmsd_pdb(pdb1, pdb2, cadena1, cadena2, ventana):
     "--formato", "-f", default="json", help="Formato de salida (json, txt, xml, gff)"
 )
 def features(accession, formato):
+    from utils import features_search as fs
+
     print(fs.descargar_features(accession, formato))
 
 
+# Descarga en lote las features de una lista de accessions a un único dataset
+@cli.command()
+@click.argument("archivo")
+@click.option(
+    "--salida",
+    "-o",
+    help="Dataset de salida (.jsonl.gz o .parquet; default: resultados/features_<archivo>.jsonl.gz)",
+)
+@click.option("--hilos", type=int, help="Descargas concurrentes (default: BBDD_HTTP_MAX_CONEXIONES)")
+def features_lote(archivo, salida, hilos):
+    from utils import features_search as fs
+
+    print(fs.descargar_features_lote(archivo, salida, hilos))
+
+
+# Opciones comunes de la estructura embebida en los reportes HTML
+def opciones_estructura(comando):
+    comando = click.option(
+        "--comprimir",
+        is_flag=True,
+        help="Embeber la estructura comprimida (gzip + base64)",
+    )(comando)
+    return click.option(
+        "--representacion",
+        type=click.Choice(REPRESENTACIONES),
+        default="auto",
+        help="Estructura embebida: auto (traza de CA en ensamblajes enormes), completa, cadena o ca",
+    )(comando)
+
+
 # Mostrar la estructura de la proteína según su pdb.
 @cli.command()
 @click.argument("codigopdb")
 @click.option("--cadena", "-c", help="ID de la cadena a analizar (opcional)")
-def mostrar_PDB_simple(codigopdb, cadena):
-    pdbMostrador = pdbv.PDB_Viewer(codigopdb)
+@opciones_estructura
+def mostrar_PDB_simple(codigopdb, cadena, representacion, comprimir):
+    from utils import pdb_viewer as pdbv
+
+    pdbMostrador = pdbv.PDB_Viewer(
+        codigopdb, representacion=representacion, comprimir=comprimir
+    )
     pdbMostrador.mostrar_pdb_desde_id(cadena)
 
 
@@ -71,11 +294,37 @@ def mostrar_PDB_simple(codigopdb, cadena):
     type=(str, int, int, str),
     help="Color, comienzo y fin, y nombre de la feature a añadir. Color hex, inicio, fin, nombre. Ej: -f '#FF0000' 10 50 dominio",
 )
-def mostrar_PDB_features(codigopdb, feature):
-    pdbMostrador = pdbv.PDB_Viewer(codigopdb)
+@opciones_estructura
+def mostrar_PDB_features(codigopdb, feature, representacion, comprimir):
+    from utils import pdb_viewer as pdbv
+
+    pdbMostrador = pdbv.PDB_Viewer(
+        codigopdb, representacion=representacion, comprimir=comprimir
+    )
     pdbMostrador.mostrar_pdb_domains_regiones(feature)
 
 
+# Genera en lote los reportes HTML del visor, en paralelo y sin abrir el navegador
+@cli.command()
+@click.argument("archivo")
+@click.option(
+    "--carpeta", "-o", default="graficos", help="Carpeta de salida (default: graficos)"
+)
+@click.option("--procesos", "-p", type=int, help="Procesos de trabajo (default: CPUs)")
+@click.option(
+    "--con-features",
+    is_flag=True,
+    help="Pintar dominios y regiones de UniProt en todos los reportes",
+)
+@opciones_estructura
+def render_lote(archivo, carpeta, procesos, con_features, representacion, comprimir):
+    from utils import render_lote as rl
+
+    rl.renderizar_lote(
+        archivo, carpeta, procesos, con_features, representacion, comprimir
+    )
+
+
 # Mostrar el alineamiento entre dos proteínas según sus códigos pdb.
 @cli.command()
 @click.argument("codigopdb1")
@@ -92,6 +341,8 @@ def mostrar_PDB_features(codigopdb, feature):
     help="Colores de las cadenas alineadas. Color_1 Color_2. Ej: blue green (Opcional)",
 )
 def mostrar_alineamiento(codigopdb1, codigopdb2, cadena, colores, ventana):
+    from utils import pdb_viewer as pdbv
+
     pdbMostrador = pdbv.PDB_Viewer(codigopdb1)
     pdbMostrador.mostrar_alineamiento_pdb(codigopdb2, cadena, colores, ventana)
 
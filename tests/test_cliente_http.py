@@ -0,0 +1,147 @@
+import gzip
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from data import cliente_http
+
+
+# Servidor HTTP local: cada ruta responde una secuencia de (estado, encabezados, cuerpo);
+# la última respuesta se repite. Registra hora, puerto del cliente y encabezados de cada
+# petición recibida
+class _Manejador(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, para poder observar la reutilización
+
+    def do_GET(self):
+        servidor = self.server
+        with servidor.candado:
+            servidor.peticiones.append(
+                {
+                    "ruta": self.path,
+                    "hora": time.monotonic(),
+                    "puerto": self.client_address[1],
+                    "encabezados": dict(self.headers),
+                }
+            )
+            respuestas = servidor.respuestas[self.path]
+            estado, encabezados, cuerpo = respuestas.pop(0) if len(respuestas) > 1 else respuestas[0]
+        self.send_response(estado)
+        for nombre, valor in encabezados.items():
+            self.send_header(nombre, valor)
+        self.send_header("Content-Length", str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def servidor():
+    servidor = ThreadingHTTPServer(("127.0.0.1", 0), _Manejador)
+    servidor.candado = threading.Lock()
+    servidor.peticiones = []
+    servidor.respuestas = {}
+    servidor.url = f"http://127.0.0.1:{servidor.server_address[1]}"
+    hilo = threading.Thread(target=servidor.serve_forever, args=(0.05,), daemon=True)
+    hilo.start()
+    original = cliente_http.configurar()
+    # Esperas cortas para que los reintentos no demoren la suite
+    cliente_http.configurar(reintentos=3, factor_espera=0.05, espera_maxima=0.2)
+    yield servidor
+    cliente_http.configurar(**original)
+    servidor.shutdown()
+    servidor.server_close()
+
+
+def _peticiones(servidor, ruta):
+    return [p for p in servidor.peticiones if p["ruta"] == ruta]
+
+
+def test_reintenta_errores_5xx_hasta_responder(servidor):
+    servidor.respuestas["/inestable"] = [(503, {}, b""), (502, {}, b""), (200, {}, b"ok")]
+
+    respuesta = cliente_http.get(servidor.url + "/inestable")
+
+    assert respuesta.status_code == 200
+    assert respuesta.text == "ok"
+    assert len(_peticiones(servidor, "/inestable")) == 3
+
+
+def test_agotar_reintentos_devuelve_la_ultima_respuesta(servidor):
+    servidor.respuestas["/caido"] = [(500, {}, b"error")]
+
+    respuesta = cliente_http.get(servidor.url + "/caido")
+
+    # raise_on_status=False: la respuesta real queda disponible para raise_for_status()
+    assert respuesta.status_code == 500
+    assert len(_peticiones(servidor, "/caido")) == 1 + 3
+
+
+def test_respeta_retry_after_en_429(servidor):
+    servidor.respuestas["/limitado"] = [(429, {"Retry-After": "1"}, b""), (200, {}, b"ok")]
+
+    respuesta = cliente_http.get(servidor.url + "/limitado")
+
+    assert respuesta.status_code == 200
+    primera, segunda = _peticiones(servidor, "/limitado")
+    # La espera propia (a lo sumo 0.2 s) no alcanza: el segundo que pide el servidor sí
+    assert segunda["hora"] - primera["hora"] >= 0.95
+
+
+def test_la_espera_exponencial_respeta_el_maximo(servidor):
+    # Con factor 10 s las esperas sin tope serían de hasta 20 y 40 s
+    cliente_http.configurar(factor_espera=10.0, espera_maxima=0.2)
+    servidor.respuestas["/lento"] = [(500, {}, b"")] * 3 + [(200, {}, b"ok")]
+
+    inicio = time.monotonic()
+    respuesta = cliente_http.get(servidor.url + "/lento")
+
+    assert respuesta.status_code == 200
+    horas = [p["hora"] for p in _peticiones(servidor, "/lento")]
+    assert len(horas) == 4
+    assert max(b - a for a, b in zip(horas, horas[1:])) < 0.2 + 0.15
+    assert time.monotonic() - inicio < 2
+
+
+def test_tiempo_de_espera_acotado_y_con_jitter():
+    original = cliente_http.configurar(factor_espera=10.0, espera_maxima=0.5)
+    try:
+        reintentos = cliente_http._crear_reintentos()
+        for _ in range(4):
+            reintentos = reintentos.increment(method="GET", url="/x", error=ConnectionError())
+        esperas = [reintentos.get_backoff_time() for _ in range(200)]
+    finally:
+        cliente_http.configurar(**original)
+
+    assert all(0 <= espera <= 0.5 for espera in esperas)
+    # Full jitter: las esperas varían entre intentos
+    assert len(set(esperas)) > 1
+
+
+def test_negocia_gzip(servidor):
+    cuerpo = b"ACGT" * 1000
+    servidor.respuestas["/comprimido"] = [(200, {"Content-Encoding": "gzip"}, gzip.compress(cuerpo))]
+
+    respuesta = cliente_http.get(servidor.url + "/comprimido")
+
+    (peticion,) = _peticiones(servidor, "/comprimido")
+    assert "gzip" in peticion["encabezados"]["Accept-Encoding"]
+    assert respuesta.content == cuerpo
+
+
+def test_reutiliza_sesion_y_conexion_por_host(servidor):
+    servidor.respuestas["/a"] = [(200, {}, b"a")]
+    servidor.respuestas["/b"] = [(200, {}, b"b")]
+
+    sesion = cliente_http.obtener_sesion(servidor.url + "/a")
+    assert cliente_http.obtener_sesion(servidor.url + "/b?x=1") is sesion
+    assert cliente_http.obtener_sesion("http://127.0.0.1:1/a") is not sesion
+
+    for ruta in ("/a", "/b", "/a"):
+        assert cliente_http.get(servidor.url + ruta).status_code == 200
+
+    # Las tres peticiones llegan por la misma conexión keep-alive
+    assert len({p["puerto"] for p in servidor.peticiones}) == 1
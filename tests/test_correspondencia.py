@@ -0,0 +1,120 @@
+import numpy as np
+import pytest
+
+from utils.correspondencia import (
+    PUNTAJE_COINCIDENCIA,
+    PUNTAJE_DIFERENCIA,
+    PUNTAJE_GAP,
+    alinear_secuencias,
+    correspondencia_arreglos,
+)
+
+SECUENCIA = "MVLSPADKTNVKAAWGKVGAHAGEYGAEALERMFLSFPTTKTYFPHF"
+
+
+# Puntaje de un alineamiento dado por sus posiciones emparejadas (gap lineal)
+def _puntaje(secuencia1, secuencia2, indices1, indices2):
+    pares = len(indices1)
+    sustitucion = sum(
+        PUNTAJE_COINCIDENCIA if secuencia1[i] == secuencia2[j] else PUNTAJE_DIFERENCIA
+        for i, j in zip(indices1, indices2)
+    )
+    return sustitucion + PUNTAJE_GAP * (len(secuencia1) + len(secuencia2) - 2 * pares)
+
+
+# Needleman-Wunsch completo, celda por celda
+def _puntaje_optimo(secuencia1, secuencia2):
+    n, m = len(secuencia1), len(secuencia2)
+    tabla = np.zeros((n + 1, m + 1), dtype=np.int64)
+    tabla[:, 0] = np.arange(n + 1) * PUNTAJE_GAP
+    tabla[0, :] = np.arange(m + 1) * PUNTAJE_GAP
+    for i in range(1, n + 1):
+        for j in range(1, m + 1):
+            sustitucion = (
+                PUNTAJE_COINCIDENCIA
+                if secuencia1[i - 1] == secuencia2[j - 1]
+                else PUNTAJE_DIFERENCIA
+            )
+            tabla[i, j] = max(
+                tabla[i - 1, j - 1] + sustitucion,
+                tabla[i - 1, j] + PUNTAJE_GAP,
+                tabla[i, j - 1] + PUNTAJE_GAP,
+            )
+    return tabla[n, m]
+
+
+def test_alinear_con_una_delecion():
+    # La cadena 2 perdió el residuo 20
+    secuencia2 = SECUENCIA[:20] + SECUENCIA[21:]
+
+    indices1, indices2 = alinear_secuencias(SECUENCIA, secuencia2)
+
+    np.testing.assert_array_equal(indices1, np.delete(np.arange(len(SECUENCIA)), 20))
+    np.testing.assert_array_equal(indices2, np.arange(len(secuencia2)))
+
+
+def test_alinear_secuencias_vacias():
+    for secuencia1, secuencia2 in (("", SECUENCIA), (SECUENCIA, ""), ("", "")):
+        indices1, indices2 = alinear_secuencias(secuencia1, secuencia2)
+        assert len(indices1) == len(indices2) == 0
+        assert indices1.dtype == np.int64
+
+
+def test_alinear_en_el_borde_de_la_banda():
+    # Deleción de 6 residuos al inicio: el camino óptimo se aleja de la diagonal casi la
+    # diferencia de largo, que es lo que cubre la banda automática como mínimo
+    secuencia2 = SECUENCIA[6:]
+
+    indices1, indices2 = alinear_secuencias(SECUENCIA, secuencia2, banda=6)
+
+    np.testing.assert_array_equal(indices1, np.arange(6, len(SECUENCIA)))
+    np.testing.assert_array_equal(indices2, np.arange(len(secuencia2)))
+
+    # Una banda más angosta deja el camino óptimo afuera
+    indices1, indices2 = alinear_secuencias(SECUENCIA, secuencia2, banda=3)
+    assert _puntaje(SECUENCIA, secuencia2, indices1, indices2) < _puntaje_optimo(
+        SECUENCIA, secuencia2
+    )
+
+
+def test_alinear_igual_que_needleman_wunsch_completo():
+    generador = np.random.default_rng(0)
+    letras = np.array(list("ACDEFGHIKLMNPQRSTVWY"))
+    for _ in range(20):
+        secuencia1 = "".join(generador.choice(letras, generador.integers(1, 40)))
+        # Mutaciones, inserciones y deleciones sobre la misma secuencia
+        secuencia2 = "".join(
+            generador.choice(letras) if generador.random() < 0.15 else letra
+            for letra in secuencia1
+            if generador.random() > 0.1
+        ) + "".join(generador.choice(letras, generador.integers(0, 4)))
+
+        indices1, indices2 = alinear_secuencias(secuencia1, secuencia2)
+
+        if not secuencia2:
+            assert len(indices1) == 0
+            continue
+        assert np.all(np.diff(indices1) > 0) and np.all(np.diff(indices2) > 0)
+        assert _puntaje(secuencia1, secuencia2, indices1, indices2) == _puntaje_optimo(
+            secuencia1, secuencia2
+        )
+
+
+def test_correspondencia_usa_numeracion_o_alineamiento():
+    secuencia = SECUENCIA.encode("ascii")
+    claves1 = np.arange(1, len(secuencia) + 1) * 256
+    # Misma numeración -> cruce por claves
+    indices1, indices2, metodo = correspondencia_arreglos(claves1, secuencia, claves1, secuencia)
+    assert metodo == "numeracion"
+    np.testing.assert_array_equal(indices1, indices2)
+
+    # Numeración desplazada en 100 -> no hay claves comunes, se alinea la secuencia
+    indices1, indices2, metodo = correspondencia_arreglos(
+        claves1, secuencia, claves1 + 100 * 256, secuencia[1:]
+    )
+    assert metodo == "alineamiento"
+    np.testing.assert_array_equal(indices1, np.arange(1, len(secuencia)))
+    np.testing.assert_array_equal(indices2, np.arange(len(secuencia) - 1))
+
+    with pytest.raises(ValueError):
+        correspondencia_arreglos(claves1, secuencia, claves1, secuencia, metodo="otro")
@@ -0,0 +1,44 @@
+import sqlite3
+
+from data import indice_sifts
+
+TABLA = """# 2024/01/01 - 12:00 | PDB: 01.24 | UNIPROT: 2024_01
+PDB\tCHAIN\tSP_PRIMARY\tRES_BEG\tRES_END\tPDB_BEG\tPDB_END\tSP_BEG\tSP_END
+1abc\tA\tP69905\t1\t141\t1\t141\t2\t142
+1abc\tB\tP69905\t1\t141\t1\t141\t2\t142
+2xyz\tA\tP69905\t1\t50\t1\t50\t2\t51
+2xyz\tA\tP69905\t51\t60\t51\t60\t\t
+2xyz\tC\tP69905\t1\t10\t1\t10\tNone\t10
+"""
+
+
+def test_segmentos_sin_rango_de_uniprot_se_omiten(tmp_path):
+    origen = tmp_path / "pdb_chain_uniprot.tsv"
+    origen.write_text(TABLA)
+    ruta = str(tmp_path / "sifts.sqlite")
+
+    assert indice_sifts.importar(str(origen), ruta) == 3
+
+    estructuras = indice_sifts.estructuras_de_accession("P69905", ruta)
+    assert [(e["identifier"], e["chain"]) for e in estructuras] == [
+        ("1ABC", "A/B=2-142"),
+        ("2XYZ", "A=2-51"),
+    ]
+
+
+def test_indice_anterior_con_rangos_nulos(tmp_path):
+    # Índices importados antes de omitir esos segmentos pueden tener sp_beg/sp_end NULL
+    origen = tmp_path / "pdb_chain_uniprot.tsv"
+    origen.write_text(TABLA)
+    ruta = str(tmp_path / "sifts.sqlite")
+    indice_sifts.importar(str(origen), ruta)
+    conexion = sqlite3.connect(ruta)
+    with conexion:
+        conexion.execute(
+            "INSERT INTO segmentos VALUES ('2XYZ', 'D', 'P69905', 1, 5, '1', '5', NULL, NULL)"
+        )
+    conexion.close()
+
+    estructuras = indice_sifts.estructuras_de_accession("P69905", ruta)
+    assert [e["chain"] for e in estructuras] == ["A/B=2-142", "A=2-51"]
+    assert {s["cadena"] for s in indice_sifts.segmentos_de_pdb("2XYZ", ruta)} == {"A"}
@@ -0,0 +1,61 @@
+import os
+import sqlite3
+
+import pytest
+
+from data import indice_uniprot
+
+
+def _registro(accession, entry_name, protein_name, organism="Homo sapiens"):
+    return {
+        "accession": accession,
+        "entry_name": entry_name,
+        "protein_name": protein_name,
+        "organism": organism,
+        "organism_id": 9606,
+        "length": 100,
+    }
+
+
+def _crear_indice(ruta, registros):
+    conexion = indice_uniprot.conectar(str(ruta))
+    try:
+        indice_uniprot.guardar_registros(conexion, registros)
+    finally:
+        conexion.close()
+
+
+def test_buscar_local_solo_lee_y_reutiliza_la_conexion(tmp_path):
+    ruta = tmp_path / "indice.sqlite"
+    _crear_indice(
+        ruta,
+        [
+            _registro("P69905", "HBA_HUMAN", "Hemoglobin subunit alpha"),
+            _registro("P68871", "HBB_HUMAN", "Hemoglobin subunit beta"),
+        ],
+    )
+    antes = os.stat(ruta).st_mtime_ns
+
+    exacto = indice_uniprot.buscar_local("P68871", ruta_indice=str(ruta))
+    texto = indice_uniprot.buscar_local("hemoglobin alpha", ruta_indice=str(ruta))
+    conexion = indice_uniprot._conexion(str(ruta))
+
+    assert [r["primaryAccession"] for r in exacto["results"]] == ["P68871"]
+    assert [r["primaryAccession"] for r in texto["results"]] == ["P69905"]
+    assert indice_uniprot.buscar_local("hemoglobin", ruta_indice=str(ruta))["results"]
+    assert indice_uniprot._conexion(str(ruta)) is conexion
+    # La búsqueda no escribe en la base (ni esquema ni PRAGMA)
+    assert os.stat(ruta).st_mtime_ns == antes
+    with pytest.raises(sqlite3.OperationalError):
+        conexion.execute("CREATE TABLE prueba (x)")
+
+
+def test_buscar_local_ve_entradas_importadas_despues(tmp_path):
+    ruta = tmp_path / "indice.sqlite"
+    _crear_indice(ruta, [_registro("P69905", "HBA_HUMAN", "Hemoglobin subunit alpha")])
+    assert not indice_uniprot.buscar_local("myoglobin", ruta_indice=str(ruta))["results"]
+
+    _crear_indice(ruta, [_registro("P02144", "MYG_HUMAN", "Myoglobin")])
+
+    resultado = indice_uniprot.buscar_local("myoglobin", ruta_indice=str(ruta))
+    assert [r["primaryAccession"] for r in resultado["results"]] == ["P02144"]
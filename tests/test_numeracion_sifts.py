@@ -0,0 +1,51 @@
+import numpy as np
+
+from utils import numeracion_sifts
+from utils.almacen_ca import extraer_cadenas_archivo
+
+
+# Escribe un PDB mínimo (sólo CA) con los residuos indicados [(número, código de inserción)]
+def _escribir_pdb(ruta, residuos, desplazamiento=0.0):
+    lineas = []
+    for k, (numero, codigo) in enumerate(residuos, start=1):
+        lineas.append(
+            f"ATOM  {k:5d}  CA  ALA A{numero:4d}{codigo or ' ':1}   "
+            f"{k * 3.8 + desplazamiento:8.3f}{0.0:8.3f}{0.0:8.3f}  1.00  0.00           C"
+        )
+    ruta.write_text("\n".join(lineas) + "\nEND\n")
+    return str(ruta)
+
+
+def test_correspondencia_uniprot_con_cadenas_del_almacen(tmp_path, monkeypatch):
+    # 1AAA numera igual que UniProt (11-30); 2BBB está desplazado (1-20) y tiene una
+    # inserción 10A que corresponde a la posición UniProt 21
+    residuos1 = [(n, "") for n in range(11, 31)]
+    residuos2 = [(n, "") for n in range(1, 11)] + [(10, "A")] + [(n, "") for n in range(11, 20)]
+    cadena1 = extraer_cadenas_archivo(_escribir_pdb(tmp_path / "1aaa.pdb", residuos1))["A"]
+    cadena2 = extraer_cadenas_archivo(_escribir_pdb(tmp_path / "2bbb.pdb", residuos2, 1.0))["A"]
+
+    segmentos = {
+        "1AAA": [
+            {"cadena": "A", "accession": "P00001", "pdb_beg": "11", "pdb_end": "30",
+             "sp_beg": 11, "sp_end": 30},
+        ],
+        "2BBB": [
+            {"cadena": "A", "accession": "P00001", "pdb_beg": "1", "pdb_end": "19",
+             "sp_beg": 11, "sp_end": 30},
+        ],
+    }
+    monkeypatch.setattr(numeracion_sifts, "segmentos_sifts", lambda pdb: segmentos[pdb.upper()])
+    monkeypatch.setattr(numeracion_sifts, "obtener_cadenas", lambda pdb: {"A": cadena2})
+    monkeypatch.setattr(numeracion_sifts, "DIRECTORIO_NUMERACION", str(tmp_path / "mapas"))
+    monkeypatch.setattr(numeracion_sifts, "_mapas", {})
+
+    mapa2 = numeracion_sifts.obtener_mapa("2BBB")
+    unp2 = mapa2.pdb_a_uniprot("A", cadena2.resnum, cadena2.icode)
+    assert (unp2 >= 0).all()
+    assert unp2[10] == 21
+
+    pares = numeracion_sifts.correspondencia_uniprot("1AAA", "A", cadena1, "2BBB", "A", cadena2)
+    assert pares is not None
+    indices1, indices2 = pares
+    assert len(indices1) == 20
+    np.testing.assert_array_equal(indices1, indices2)
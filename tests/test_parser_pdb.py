@@ -0,0 +1,52 @@
+import numpy as np
+from Bio.PDB.PDBParser import PDBParser
+
+from utils.parser_pdb import leer_atomos
+
+
+def _linea(registro, numero, nombre, altloc, cadena, resnum, x):
+    return (
+        f"{registro}{numero:5d}  {nombre:<3}{altloc}ALA {cadena}{resnum:4d}    "
+        f"{x:8.3f}{x + 1:8.3f}{x + 2:8.3f}  1.00 10.00           C"
+    )
+
+
+# Dos modelos, dos cadenas, altlocs B/C en el residuo 3 y líneas con CRLF
+def _escribir_pdb(ruta):
+    lineas, numero = ["HEADER    PRUEBA"], 1
+    for modelo in (1, 2):
+        lineas.append(f"MODEL     {modelo:4d}")
+        for cadena in "AB":
+            for resnum in range(1, 6):
+                for nombre in ("N", "CA", "C"):
+                    for altloc in ("B", "C") if resnum == 3 else (" ",):
+                        x = modelo * 100 + resnum * 3.8 + (altloc == "C")
+                        lineas.append(_linea("ATOM  ", numero, nombre, altloc, cadena, resnum, x))
+                        numero += 1
+            lineas.append("TER")
+        lineas.append("ENDMDL")
+    lineas.append("END")
+    ruta.write_text("\r\n".join(lineas) + "\r\n")
+    return str(ruta)
+
+
+def test_leer_atomos_no_depende_del_tamano_de_bloque(tmp_path):
+    ruta = _escribir_pdb(tmp_path / "1abc.pdb")
+    for filtros in ({}, {"modelo": 2}, {"modelo": None}, {"cadenas": ("B",), "nombres_atomo": ("CA",)}):
+        esperado = leer_atomos(ruta, **filtros)
+        for tamano_bloque in (1, 40, 81, 1000):
+            np.testing.assert_array_equal(
+                leer_atomos(ruta, tamano_bloque=tamano_bloque, **filtros), esperado
+            )
+
+
+def test_ca_igual_que_pdbparser(tmp_path):
+    ruta = _escribir_pdb(tmp_path / "1abc.pdb")
+    estructura = PDBParser(QUIET=True).get_structure("x", ruta)
+    for indice, modelo in enumerate((1, 2)):
+        for cadena in "AB":
+            atomos = leer_atomos(ruta, modelo=modelo, cadenas=(cadena,), nombres_atomo=("CA",))
+            esperado = [residuo["CA"].coord for residuo in estructura[indice][cadena]]
+            np.testing.assert_allclose(atomos["coord"], esperado)
+            np.testing.assert_array_equal(atomos["resnum"], np.arange(1, 6))
+            assert set(atomos["modelo"]) == {modelo}
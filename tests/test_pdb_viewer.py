@@ -0,0 +1,34 @@
+import base64
+import gzip
+import json
+import re
+
+import py3Dmol
+
+from utils.pdb_viewer import agregar_modelo_comprimido, envolver_modelos_comprimidos
+
+PDB = "ATOM      1  CA  ALA A   1       0.000   0.000   0.000  1.00  0.00           C\nEND\n"
+
+
+def test_modelo_comprimido_sin_tocar_la_plantilla_de_py3dmol():
+    vista = py3Dmol.view(js="3Dmol-min.js")
+    marca, datos = agregar_modelo_comprimido(vista, PDB)
+    vista.setStyle({"cartoon": {"color": "spectrum"}})
+    html = vista._make_html()
+
+    assert gzip.decompress(base64.b64decode(datos)).decode("utf-8") == PDB
+    assert PDB not in html
+
+    cuerpo = envolver_modelos_comprimidos(html, {marca: datos})
+
+    # La vista queda inerte en un <template> y lee el modelo descomprimido por su marca
+    plantilla = re.search(r'<template id="(\w+)">(.*?)</template>', cuerpo, re.DOTALL)
+    assert plantilla is not None
+    assert f"addModel({json.dumps(marca)}" not in plantilla.group(2)
+    assert f"addModel(window.modelos_pdb[{json.dumps(marca)}]" in plantilla.group(2)
+    assert f'getElementById("{plantilla.group(1)}")' in cuerpo
+    assert json.dumps(datos) in cuerpo
+
+
+def test_vista_sin_modelos_comprimidos_queda_igual():
+    assert envolver_modelos_comprimidos("<div></div>", {}) == "<div></div>"
@@ -0,0 +1,63 @@
+import numpy as np
+from Bio.PDB.Structure import Structure
+
+from utils.estructura_diferida import EstructuraDiferida
+from utils.rmsd_analysis import (
+    calcular_rmsd_ventanas,
+    cargar_estructura,
+    estructura_PDB_a_str,
+    ids_cadenas,
+)
+
+
+# RMSD local ventana por ventana, sin sumas acumuladas
+def _rmsd_ventanas_directo(coords1, coords2, ventanas):
+    n = len(coords1)
+    matriz = np.full((n, len(ventanas)), np.nan)
+    for k, ventana in enumerate(ventanas):
+        for inicio in range(n - ventana + 1):
+            diferencias = coords1[inicio : inicio + ventana] - coords2[inicio : inicio + ventana]
+            matriz[inicio + ventana // 2, k] = np.sqrt(np.mean(np.sum(diferencias**2, axis=1)))
+    return matriz
+
+
+def test_rmsd_ventanas_igual_que_bucle_directo():
+    generador = np.random.default_rng(0)
+    coords1 = np.cumsum(generador.normal(scale=2.2, size=(60, 3)), axis=0)
+    coords2 = coords1 + generador.normal(scale=0.8, size=(60, 3))
+    ventanas = [1, 4, 5, 60, 61]
+
+    matriz = calcular_rmsd_ventanas(coords1, coords2, ventanas)
+
+    assert matriz.shape == (60, 5)
+    np.testing.assert_allclose(
+        matriz, _rmsd_ventanas_directo(coords1, coords2, ventanas), atol=1e-9
+    )
+    # Ventana más larga que la cadena: columna vacía
+    assert np.isnan(matriz[:, 4]).all()
+
+
+def test_rmsd_ventanas_de_cadenas_identicas_es_cero():
+    coords = np.arange(30, dtype=np.float64).reshape(10, 3)
+    matriz = calcular_rmsd_ventanas(coords, coords.copy(), [3])
+    np.testing.assert_array_equal(matriz[1:9, 0], 0.0)
+    assert np.isnan(matriz[[0, 9], 0]).all()
+
+
+def test_cargar_estructura_completa_por_default_y_diferida_opcional(tmp_path):
+    ruta = tmp_path / "1abc.pdb"
+    lineas = [
+        f"ATOM  {k:5d}  CA  ALA {cadena}{k:4d}    {k * 3.8:8.3f}{0.0:8.3f}{0.0:8.3f}  1.00  0.00           C"
+        for k, cadena in enumerate("AAABB", start=1)
+    ]
+    ruta.write_text("\n".join(lineas) + "\nEND\n")
+
+    completa = cargar_estructura(str(ruta))
+    assert isinstance(completa, Structure)
+    assert [cadena.id for cadena in completa.get_chains()] == ["A", "B"]
+
+    diferida = cargar_estructura(str(ruta), diferida=True)
+    assert isinstance(diferida, EstructuraDiferida)
+    assert ids_cadenas(diferida) == ids_cadenas(completa)
+    assert estructura_PDB_a_str(diferida, "B") == estructura_PDB_a_str(completa, "B")
+    assert diferida.cadenas_materializadas() == [(0, "B")]
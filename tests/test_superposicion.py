@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+from Bio.SVDSuperimposer import SVDSuperimposer
+
+from utils.superposicion import aplicar_transformacion, kabsch, rmsd_lote, superponer
+
+
+def _rotacion_aleatoria(generador):
+    q, r = np.linalg.qr(generador.normal(size=(3, 3)))
+    q *= np.sign(np.diag(r))
+    if np.linalg.det(q) < 0:
+        q[:, 0] *= -1
+    return q
+
+
+# Par de nubes de CA: la móvil es la referencia rotada, trasladada y con ruido
+def _par(generador, largo, ruido=0.5):
+    referencia = np.cumsum(generador.normal(scale=2.2, size=(largo, 3)), axis=0)
+    movil = referencia @ _rotacion_aleatoria(generador) + generador.normal(scale=10, size=3)
+    return referencia, movil + generador.normal(scale=ruido, size=(largo, 3))
+
+
+def _bio(referencia, movil):
+    sup = SVDSuperimposer()
+    sup.set(referencia, movil)
+    sup.run()
+    rotacion, traslacion = sup.get_rotran()
+    return rotacion, traslacion, sup.get_rms()
+
+
+def test_kabsch_igual_que_svdsuperimposer():
+    generador = np.random.default_rng(0)
+    for largo in (3, 10, 150):
+        referencia, movil = _par(generador, largo)
+        rotacion, traslacion, rmsd = kabsch(referencia, movil)
+        rotacion_bio, traslacion_bio, rmsd_bio = _bio(referencia, movil)
+
+        assert rmsd == pytest.approx(rmsd_bio, abs=1e-9)
+        np.testing.assert_allclose(rotacion, rotacion_bio, atol=1e-9)
+        np.testing.assert_allclose(traslacion, traslacion_bio, atol=1e-9)
+
+
+def test_kabsch_no_devuelve_reflexiones():
+    # La imagen especular no se puede superponer con una rotación propia
+    generador = np.random.default_rng(1)
+    referencia, _ = _par(generador, 40)
+    espejo = referencia * np.array([-1.0, 1.0, 1.0])
+
+    rotacion, traslacion, rmsd = kabsch(referencia, espejo)
+    _, _, rmsd_bio = _bio(referencia, espejo)
+
+    assert np.linalg.det(rotacion) == pytest.approx(1.0)
+    assert rmsd == pytest.approx(rmsd_bio, abs=1e-9)
+    assert rmsd > 1.0
+    superpuesta, rmsd_superponer = superponer(referencia, espejo)
+    np.testing.assert_allclose(superpuesta, aplicar_transformacion(espejo, rotacion, traslacion))
+    assert rmsd_superponer == pytest.approx(rmsd)
+
+
+def test_kabsch_en_lote_igual_que_por_par():
+    generador = np.random.default_rng(2)
+    pares = [_par(generador, 25) for _ in range(6)]
+    referencias = np.stack([referencia for referencia, _ in pares])
+    moviles = np.stack([movil for _, movil in pares])
+
+    rotaciones, traslaciones, rmsd = kabsch(referencias, moviles)
+
+    assert rotaciones.shape == (6, 3, 3) and traslaciones.shape == (6, 3)
+    for i, (referencia, movil) in enumerate(pares):
+        assert rmsd[i] == pytest.approx(_bio(referencia, movil)[2], abs=1e-9)
+
+
+def test_rmsd_lote_con_relleno_igual_que_por_par():
+    # Largos distintos: los pares cortos se rellenan con peso 0
+    generador = np.random.default_rng(3)
+    pares = [_par(generador, largo) for largo in (4, 57, 12, 200, 33)]
+
+    rmsd = rmsd_lote(pares)
+
+    np.testing.assert_allclose(rmsd, [_bio(*par)[2] for par in pares], atol=1e-9)
+    assert rmsd_lote([]).shape == (0,)
+
+
+def test_kabsch_rechaza_formas_distintas():
+    with pytest.raises(ValueError):
+        kabsch(np.zeros((5, 3)), np.zeros((4, 3)))
@@ -0,0 +1,234 @@
+import json
+import os
+from collections import namedtuple
+from io import BytesIO
+
+import numpy as np
+from Bio.Data.IUPACData import protein_letters_3to1
+from Bio.PDB.Polypeptide import is_aa
+
+from data.cache_pdb import DIRECTORIO_CACHE, escribir_atomico
+from data.fetch_pdb import descargar_pdb
+from utils.parser_pdb import cadenas_en_orden, leer_atomos
+
+# =============================================================================
+# ALMACÉN BINARIO DE COORDENADAS CA
+# =============================================================================
+#
+# Cada cadena se guarda como un único archivo .npy con un arreglo estructurado
+# (una fila por residuo estándar con átomo CA) que se abre con memoria mapeada:
+#
+#   coord  -> float32 (3,)  coordenadas del CA
+#   resnum -> int32         número de residuo del autor
+#   icode  -> S1            código de inserción
+#   aa     -> S1            código de una letra del aminoácido
+#
+# Estructura en disco:  <cache>/ca/<PDB_ID>/indice.json
+#                       <cache>/ca/<PDB_ID>/cadena_<ord>.npy
+#
+# =============================================================================
+
+DIRECTORIO_ALMACEN = os.path.join(DIRECTORIO_CACHE, "ca")
+
+# Versión del preprocesamiento; los PDB guardados con otra versión se vuelven a procesar
+# (v2: primera ubicación alternativa de cada átomo en lugar de filtrar por altloc "A")
+VERSION_ALMACEN = 2
+
+DTYPE_CADENA_CA = np.dtype(
+    [("coord", "<f4", (3,)), ("resnum", "<i4"), ("icode", "S1"), ("aa", "S1")]
+)
+
+# Código de una letra para los 20 aminoácidos estándar (nombres de residuo en mayúscula)
+TRES_A_UNO = {tres.upper(): uno for tres, uno in protein_letters_3to1.items()}
+
+# Coordenadas CA de una cadena como arreglos paralelos de NumPy
+CadenaCA = namedtuple("CadenaCA", ["coords", "resnum", "icode", "aa"])
+
+
+# Construye una CadenaCA a partir de una cadena de BioPython
+# Entrada = objeto cadena de BioPython
+# Salida = CadenaCA con los residuos estándar que tienen átomo CA
+def cadena_ca_desde_cadena(cadena):
+    tabla = np.array(
+        [
+            (
+                residuo["CA"].get_coord(),
+                residuo.id[1],
+                residuo.id[2].strip().encode("ascii"),
+                TRES_A_UNO[residuo.get_resname()].encode("ascii"),
+            )
+            for residuo in cadena
+            if is_aa(residuo, standard=True) and "CA" in residuo
+        ],
+        dtype=DTYPE_CADENA_CA,
+    )
+    return cadena_ca_desde_tabla(tabla)
+
+
+# Construye una CadenaCA a partir de los átomos leídos con parser_pdb.leer_atomos
+# Entrada = arreglo de átomos de una cadena
+# Salida = CadenaCA con los residuos estándar que tienen átomo CA (primer altloc)
+def cadena_ca_desde_atomos(atomos):
+    atomos = atomos[
+        (atomos["nombre"] == b"CA")
+        & np.isin(atomos["resname"], [tres.encode("ascii") for tres in TRES_A_UNO])
+    ]
+
+    # Un solo CA por residuo: se conserva el primero que aparece en el archivo
+    claves = atomos["resnum"].astype(np.int64) * 256 + atomos["icode"].view(np.uint8)
+    _, primeros = np.unique(claves, return_index=True)
+    atomos = atomos[np.sort(primeros)]
+
+    tabla = np.empty(len(atomos), dtype=DTYPE_CADENA_CA)
+    tabla["coord"] = atomos["coord"]
+    tabla["resnum"] = atomos["resnum"]
+    tabla["icode"] = atomos["icode"]
+    tabla["aa"] = [TRES_A_UNO[tres.decode("ascii")] for tres in atomos["resname"]]
+    return cadena_ca_desde_tabla(tabla)
+
+
+# Separa un arreglo estructurado en los campos de una CadenaCA (sin copiar)
+# Entrada = arreglo estructurado con DTYPE_CADENA_CA
+# Salida = CadenaCA
+def cadena_ca_desde_tabla(tabla):
+    return CadenaCA(tabla["coord"], tabla["resnum"], tabla["icode"], tabla["aa"])
+
+
+# Selecciona un subconjunto de residuos de una CadenaCA
+# Entrada = CadenaCA, índices o slice
+# Salida = CadenaCA con los residuos seleccionados
+def seleccionar_residuos(cadena, indices):
+    return CadenaCA(*(campo[indices] for campo in cadena))
+
+
+# Codifica (número de residuo, código de inserción) de cada residuo como un entero
+# ordenable, para cruzar residuos de dos cadenas con operaciones de conjuntos de NumPy
+# Entrada = CadenaCA
+# Salida = arreglo int64
+def claves_residuos(cadena):
+    icode = np.frombuffer(np.ascontiguousarray(cadena.icode).tobytes(), dtype=np.uint8)
+    return cadena.resnum.astype(np.int64) * 256 + icode
+
+
+# Devuelve la secuencia de una letra de una CadenaCA como texto
+def secuencia_cadena(cadena):
+    return cadena.aa.tobytes().decode("ascii")
+
+
+def _carpeta_pdb(pdb_id, directorio=None):
+    return os.path.join(directorio or DIRECTORIO_ALMACEN, pdb_id.upper())
+
+
+def _nombre_archivo_cadena(cadena_id):
+    # El ID de cadena distingue mayúsculas: se usa su código para el nombre del archivo
+    return f"cadena_{ord(cadena_id):03d}.npy"
+
+
+# Guarda todas las cadenas de un PDB en el almacén
+# Entrada = ID de PDB, diccionario {cadena_id: CadenaCA}
+# Salida = lista de IDs de cadenas guardadas
+def guardar_cadenas(pdb_id, cadenas, directorio=None):
+    carpeta = _carpeta_pdb(pdb_id, directorio)
+    os.makedirs(carpeta, exist_ok=True)
+
+    for cadena_id, cadena in cadenas.items():
+        tabla = np.empty(len(cadena.resnum), dtype=DTYPE_CADENA_CA)
+        tabla["coord"] = cadena.coords
+        tabla["resnum"] = cadena.resnum
+        tabla["icode"] = cadena.icode
+        tabla["aa"] = cadena.aa
+        ruta = os.path.join(carpeta, _nombre_archivo_cadena(cadena_id))
+        escribir_atomico(ruta, _serializar_npy(tabla))
+
+    # El índice se escribe al final: su presencia indica que el PDB está completo
+    indice = {
+        "pdb_id": pdb_id.upper(),
+        "cadenas": list(cadenas),
+        "version": VERSION_ALMACEN,
+    }
+    escribir_atomico(
+        os.path.join(carpeta, "indice.json"), json.dumps(indice).encode("utf-8")
+    )
+    return list(cadenas)
+
+
+def _serializar_npy(tabla):
+    buffer = BytesIO()
+    np.save(buffer, tabla, allow_pickle=False)
+    return buffer.getvalue()
+
+
+# Lista las cadenas almacenadas de un PDB
+# Entrada = ID de PDB
+# Salida = lista de IDs de cadena, o None si el PDB no está preprocesado (o lo está con
+#          otra versión del almacén)
+def cadenas_almacenadas(pdb_id, directorio=None):
+    try:
+        with open(
+            os.path.join(_carpeta_pdb(pdb_id, directorio), "indice.json"),
+            "r",
+            encoding="utf-8",
+        ) as f:
+            indice = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+    if indice.get("version", 1) != VERSION_ALMACEN:
+        return None
+    return indice.get("cadenas")
+
+
+# Carga una cadena del almacén con memoria mapeada
+# Entrada = ID de PDB, ID de cadena
+# Salida = CadenaCA (arreglos de sólo lectura respaldados por el archivo)
+def cargar_cadena(pdb_id, cadena_id, directorio=None):
+    ruta = os.path.join(
+        _carpeta_pdb(pdb_id, directorio), _nombre_archivo_cadena(cadena_id)
+    )
+    return cadena_ca_desde_tabla(np.load(ruta, mmap_mode="r", allow_pickle=False))
+
+
+# Preprocesa un archivo PDB: extrae los CA de todas las cadenas del primer modelo
+# Entrada = ruta del archivo PDB, IDs de cadena opcionales
+# Salida = diccionario {cadena_id: CadenaCA}
+def extraer_cadenas_archivo(archivo_pdb, cadenas=None):
+    atomos = leer_atomos(archivo_pdb, modelo=1, cadenas=cadenas, nombres_atomo=("CA",))
+    return {
+        cadena_id: cadena_ca_desde_atomos(
+            atomos[atomos["cadena"] == cadena_id.encode("ascii")]
+        )
+        for cadena_id in cadenas_en_orden(atomos)
+    }
+
+
+# Obtiene todas las cadenas de un PDB desde el almacén, preprocesándolo si hace falta
+# Entrada = ID de PDB, ruta opcional del archivo ya descargado
+# Salida = diccionario {cadena_id: CadenaCA}
+def obtener_cadenas(pdb_id, archivo_pdb=None, directorio=None):
+    ids_cadenas = cadenas_almacenadas(pdb_id, directorio)
+
+    if ids_cadenas is None:
+        if archivo_pdb is None:
+            archivo_pdb = descargar_pdb(pdb_id)
+        try:
+            cadenas = extraer_cadenas_archivo(archivo_pdb)
+        except Exception as e:
+            raise Exception(f"Error al cargar estructura: {e}")
+        guardar_cadenas(pdb_id, cadenas, directorio)
+        ids_cadenas = list(cadenas)
+
+    return {
+        cadena_id: cargar_cadena(pdb_id, cadena_id, directorio)
+        for cadena_id in ids_cadenas
+    }
+
+
+# Obtiene una cadena de un PDB desde el almacén
+# Entrada = ID de PDB, ID de cadena
+# Salida = CadenaCA
+def obtener_cadena(pdb_id, cadena_id, directorio=None):
+    if cadenas_almacenadas(pdb_id, directorio) is None:
+        obtener_cadenas(pdb_id, directorio=directorio)
+    try:
+        return cargar_cadena(pdb_id, cadena_id, directorio)
+    except FileNotFoundError:
+        raise Exception(f"No existe la cadena {cadena_id} en el PDB {pdb_id}")
@@ -0,0 +1,89 @@
+import os
+import time
+
+from data import fetch_ncbi
+from utils.mapeo_ids import leer_ids_archivo
+from utils.salida_filas import escribir_filas
+
+# Columnas del dataset de anotaciones (una fila por accession de entrada)
+COLUMNAS_NCBI = [
+    ("accession", "str"),
+    ("uid", "str"),
+    ("accession_version", "str"),
+    ("titulo", "str"),
+    ("organismo", "str"),
+    ("taxid", "int"),
+    ("longitud", "int"),
+    ("actualizado", "str"),
+    ("error", "str"),
+]
+
+
+def _entero(valor):
+    try:
+        return int(valor)
+    except (TypeError, ValueError):
+        return None
+
+
+# Convierte un resumen de esummary en una fila del dataset
+# Entrada = accession de entrada, resumen (o None), error (o None)
+# Salida = diccionario con las columnas de COLUMNAS_NCBI
+def fila_resumen(accession, resumen, error=None):
+    resumen = resumen or {}
+    return {
+        "accession": accession,
+        "uid": resumen.get("uid"),
+        "accession_version": resumen.get("accessionversion"),
+        "titulo": resumen.get("title"),
+        "organismo": resumen.get("organism"),
+        "taxid": _entero(resumen.get("taxid")),
+        "longitud": _entero(resumen.get("slen")),
+        "actualizado": resumen.get("updatedate"),
+        "error": error,
+    }
+
+
+# Función principal: anota en lote accessions de NCBI Protein con sus resúmenes
+# Entrada = IDs sueltos, archivo con IDs, ruta de salida (.jsonl.gz o .parquet)
+# Salida = mensaje con el resultado
+def anotar_ncbi(ids=(), archivo=None, salida=None):
+    ids = list(ids)
+    if archivo:
+        ids.extend(leer_ids_archivo(archivo))
+    # Sin duplicados, conservando el orden
+    ids = list(dict.fromkeys(ids))
+    if not ids:
+        return "No se indicaron IDs para anotar."
+
+    if salida is None:
+        nombre = os.path.splitext(os.path.basename(archivo))[0] if archivo else "ids"
+        salida = os.path.join("resultados", f"ncbi_{nombre}.jsonl.gz")
+
+    inicio = time.perf_counter()
+    estado = {"procesados": 0, "fallidos": 0}
+    print(f"Anotando {len(ids)} accessions con NCBI E-utilities...")
+
+    def filas():
+        for accession, resumen, error in fetch_ncbi.resumenes_ncbi(ids):
+            estado["procesados"] += 1
+            if error:
+                estado["fallidos"] += 1
+            if estado["procesados"] % 1000 == 0 or estado["procesados"] == len(ids):
+                print(
+                    f"\rAccessions procesados: {estado['procesados']}/{len(ids)}",
+                    end="",
+                    flush=True,
+                )
+            yield fila_resumen(accession, resumen, error)
+
+    try:
+        total = escribir_filas(salida, filas(), COLUMNAS_NCBI)
+    except Exception as e:
+        return f"Error al escribir las anotaciones: {e}"
+
+    print()
+    return (
+        f"{total - estado['fallidos']} de {total} accessions anotados "
+        f"en {salida} ({time.perf_counter() - inicio:.1f} s)"
+    )
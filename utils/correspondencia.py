@@ -0,0 +1,159 @@
+import numpy as np
+
+from utils.almacen_ca import claves_residuos
+
+# =============================================================================
+# CORRESPONDENCIA DE RESIDUOS ENTRE DOS CADENAS
+# =============================================================================
+#
+# Determina qué residuo de una cadena equivale a qué residuo de la otra antes
+# de superponer o calcular RMSD local. Dos métodos:
+#
+#   numeracion  -> cruce por (número de residuo, código de inserción) con
+#                  operaciones de conjuntos de NumPy, cuando ambas cadenas
+#                  usan la misma numeración.
+#   alineamiento -> alineamiento global (Needleman-Wunsch) en banda de las
+#                  secuencias extraídas, vectorizado por filas: la dependencia
+#                  horizontal de cada fila se resuelve con un máximo acumulado,
+#                  así que el único bucle de Python es sobre las filas.
+#
+# =============================================================================
+
+# Puntajes del alineamiento (identidad, gap lineal)
+PUNTAJE_COINCIDENCIA = 2
+PUNTAJE_DIFERENCIA = -1
+PUNTAJE_GAP = -2
+
+# Fracción mínima de residuos comunes con el mismo aminoácido para confiar en la numeración
+MINIMA_IDENTIDAD_NUMERACION = 0.9
+
+_NEGATIVO = -(1 << 28)
+
+
+# Empareja residuos con igual número de residuo y código de inserción
+# Entrada = claves de residuo (almacen_ca.claves_residuos) de ambas cadenas
+# Salida = índices emparejados de la cadena 1 y de la cadena 2 (en el orden de la cadena 1)
+def correspondencia_por_claves(claves1, claves2):
+    _, indices1, indices2 = np.intersect1d(claves1, claves2, return_indices=True)
+    orden = np.argsort(indices1, kind="stable")
+    return indices1[orden], indices2[orden]
+
+
+# Alineamiento global en banda de dos secuencias
+# Entrada = secuencias (str, bytes o arreglos uint8), semiancho de la banda (None = automático)
+# Salida = índices de las posiciones alineadas (sin gaps) de la secuencia 1 y de la 2
+def alinear_secuencias(secuencia1, secuencia2, banda=None):
+    a = _codigos(secuencia1)
+    b = _codigos(secuencia2)
+    n, m = len(a), len(b)
+    if n == 0 or m == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+    # La banda sigue la diagonal (0, 0) -> (n, m) y cubre al menos la diferencia de largo
+    if banda is None:
+        banda = abs(n - m) + 32
+    centros = np.rint(np.arange(n + 1) * (m / n)).astype(np.int64)
+    inicios = np.clip(centros - banda, 0, m)
+    finales = np.clip(centros + banda, 0, m)
+    ancho = int((finales - inicios).max()) + 1
+
+    # Punteros: 0 = diagonal, 1 = arriba (gap en la secuencia 2), 2 = izquierda
+    punteros = np.zeros((n + 1, ancho), dtype=np.int8)
+    columnas = np.arange(m + 1, dtype=np.int64)
+
+    fila = np.full(m + 1, _NEGATIVO, dtype=np.int64)
+    lo, hi = inicios[0], finales[0]
+    fila[lo : hi + 1] = columnas[lo : hi + 1] * PUNTAJE_GAP
+    punteros[0, : hi - lo + 1] = 2
+
+    for i in range(1, n + 1):
+        anterior = fila
+        lo, hi = inicios[i], finales[i]
+        j = columnas[lo : hi + 1]
+
+        # Candidatos verticales y diagonales (dependen sólo de la fila anterior)
+        arriba = anterior[lo : hi + 1] + PUNTAJE_GAP
+        diagonal = np.full(len(j), _NEGATIVO, dtype=np.int64)
+        desde = 1 if lo == 0 else 0
+        sustitucion = np.where(
+            b[j[desde:] - 1] == a[i - 1], PUNTAJE_COINCIDENCIA, PUNTAJE_DIFERENCIA
+        )
+        diagonal[desde:] = anterior[j[desde:] - 1] + sustitucion
+        candidato = np.maximum(diagonal, arriba)
+        puntero = np.where(diagonal >= arriba, 0, 1).astype(np.int8)
+
+        # Gaps horizontales: H[j] = max_k<=j (candidato[k] + gap * (j - k))
+        acumulado = np.maximum.accumulate(candidato - PUNTAJE_GAP * j)
+        valores = acumulado + PUNTAJE_GAP * j
+        puntero[valores > candidato] = 2
+
+        fila = np.full(m + 1, _NEGATIVO, dtype=np.int64)
+        fila[lo : hi + 1] = valores
+        punteros[i, : hi - lo + 1] = puntero
+
+    # Reconstrucción del camino desde (n, m)
+    indices1, indices2 = [], []
+    i, j = n, m
+    while i > 0 or j > 0:
+        puntero = punteros[i, j - inicios[i]] if i > 0 else 2
+        if puntero == 0:
+            i, j = i - 1, j - 1
+            indices1.append(i)
+            indices2.append(j)
+        elif puntero == 1:
+            i -= 1
+        else:
+            j -= 1
+
+    return (
+        np.array(indices1[::-1], dtype=np.int64),
+        np.array(indices2[::-1], dtype=np.int64),
+    )
+
+
+def _codigos(secuencia):
+    if isinstance(secuencia, str):
+        secuencia = secuencia.encode("ascii")
+    if isinstance(secuencia, (bytes, bytearray)):
+        return np.frombuffer(secuencia, dtype=np.uint8)
+    return np.frombuffer(np.ascontiguousarray(secuencia).tobytes(), dtype=np.uint8)
+
+
+# Decide si dos cadenas comparten numeración comparando los aminoácidos de los
+# residuos con la misma clave
+# Entrada = índices emparejados por numeración, secuencias (uint8) de ambas cadenas
+# Salida = booleano
+def numeracion_compatible(indices1, indices2, secuencia1, secuencia2):
+    minimo = min(len(secuencia1), len(secuencia2))
+    if minimo == 0 or len(indices1) < 0.5 * minimo:
+        return False
+    identidad = np.mean(secuencia1[indices1] == secuencia2[indices2])
+    return identidad >= MINIMA_IDENTIDAD_NUMERACION
+
+
+# Correspondencia de residuos a partir de arreglos (claves de residuo y secuencias)
+# Entrada = claves y secuencias de ambas cadenas, método ("auto", "numeracion", "alineamiento")
+# Salida = índices emparejados de ambas cadenas y método utilizado
+def correspondencia_arreglos(claves1, secuencia1, claves2, secuencia2, metodo="auto"):
+    secuencia1, secuencia2 = _codigos(secuencia1), _codigos(secuencia2)
+
+    if metodo in ("auto", "numeracion"):
+        indices1, indices2 = correspondencia_por_claves(claves1, claves2)
+        if metodo == "numeracion" or numeracion_compatible(
+            indices1, indices2, secuencia1, secuencia2
+        ):
+            return indices1, indices2, "numeracion"
+    elif metodo != "alineamiento":
+        raise ValueError(f"Método de correspondencia no válido: {metodo}")
+
+    indices1, indices2 = alinear_secuencias(secuencia1, secuencia2)
+    return indices1, indices2, "alineamiento"
+
+
+# Correspondencia de residuos entre dos cadenas CA
+# Entrada = dos CadenaCA, método ("auto", "numeracion", "alineamiento")
+# Salida = índices emparejados de ambas cadenas y método utilizado
+def correspondencia(cadena1, cadena2, metodo="auto"):
+    return correspondencia_arreglos(
+        claves_residuos(cadena1), cadena1.aa, claves_residuos(cadena2), cadena2.aa, metodo
+    )
@@ -0,0 +1,159 @@
+import os
+from io import StringIO
+
+import numpy as np
+from Bio.PDB.PDBParser import PDBParser
+
+# =============================================================================
+# CARGA DIFERIDA DE ESTRUCTURAS PDB POR CADENA
+# =============================================================================
+#
+# PDBParser materializa todos los modelos, cadenas y átomos de la entrada,
+# aunque el análisis sólo use estructura[0][cadena]. En ensamblados grandes
+# (ribosomas, cápsides virales) eso son gigabytes para leer una cadena.
+#
+# EstructuraDiferida recorre el archivo una sola vez (memoria mapeada y
+# operaciones vectorizadas de NumPy sobre los inicios de línea) y guarda, por
+# (modelo, cadena), los rangos de bytes de sus registros ATOM/HETATM/ANISOU.
+# Una cadena se parsea con BioPython recién cuando se pide, leyendo sólo sus
+# rangos, y queda en memoria para los siguientes accesos:
+#
+#   estructura = EstructuraDiferida(ruta)
+#   estructura.cadenas()        -> IDs de cadena del primer modelo (sin parsear)
+#   estructura[0]["A"]          -> Chain de BioPython (se materializa acá)
+#
+# La memoria crece con las cadenas usadas, no con el tamaño de la entrada.
+#
+# =============================================================================
+
+# Registros que pertenecen a una cadena (primeros 4 bytes de la línea)
+REGISTROS_ATOMO = (b"ATOM", b"HETA", b"ANIS")
+
+# Columna del ID de cadena en los registros de átomos (desde 0)
+COLUMNA_CADENA = 21
+
+
+# Recorre un archivo PDB y agrupa los registros de átomos por modelo y cadena
+# Entrada = ruta del archivo PDB
+# Salida = diccionario {(índice de modelo, cadena_id): [(inicio, fin), ...]} con rangos de
+#          bytes en orden de archivo; el índice de modelo es la posición del registro
+#          MODEL (0 = primero, igual que estructura[0] en BioPython)
+def indexar_rangos(archivo_pdb):
+    # np.memmap no acepta archivos de tamaño cero
+    if os.path.getsize(archivo_pdb) == 0:
+        return {}
+    datos = np.memmap(archivo_pdb, dtype=np.uint8, mode="r")
+    n = len(datos)
+
+    finales = np.flatnonzero(datos == ord("\n")) + 1
+    if not len(finales) or finales[-1] != n:
+        finales = np.append(finales, n)
+    inicios = np.concatenate(([0], finales[:-1]))
+
+    # Primeros bytes y columna de cadena de cada línea (índices acotados al archivo)
+    def columna(k):
+        return datos[np.minimum(inicios + k, n - 1)]
+
+    primeros = [columna(k) for k in range(4)]
+
+    def es_registro(nombre):
+        mascara = np.ones(len(inicios), dtype=bool)
+        for k, byte in enumerate(nombre):
+            mascara &= primeros[k] == byte
+        return mascara
+
+    atomicas = np.zeros(len(inicios), dtype=bool)
+    for registro in REGISTROS_ATOMO:
+        atomicas |= es_registro(registro)
+    # Sin registros MODEL todo es el modelo 0; antes del primero también
+    modelos = np.maximum(np.cumsum(es_registro(b"MODE")) - 1, 0)
+
+    lineas = np.flatnonzero(atomicas)
+    if not len(lineas):
+        return {}
+    claves = modelos[lineas].astype(np.int64) * 256 + columna(COLUMNA_CADENA)[lineas]
+
+    # Tramos de líneas de átomos consecutivas con el mismo (modelo, cadena)
+    cortes = np.flatnonzero(claves[1:] != claves[:-1]) + 1
+    primeras = np.concatenate(([0], cortes))
+    ultimas = np.concatenate((cortes, [len(lineas)])) - 1
+
+    rangos = {}
+    for primera, ultima in zip(primeras, ultimas):
+        clave = int(claves[primera])
+        rangos.setdefault((clave // 256, chr(clave % 256)), []).append(
+            (int(inicios[lineas[primera]]), int(finales[lineas[ultima]]))
+        )
+    return rangos
+
+
+class ModeloDiferido:
+    """
+    Un modelo de una EstructuraDiferida. Indexarlo por ID de cadena materializa la cadena
+    (Chain de BioPython); "cadena_id in modelo" no parsea nada.
+    """
+
+    def __init__(self, estructura, indice):
+        self.estructura = estructura
+        self.indice = indice
+
+    def __getitem__(self, cadena_id):
+        return self.estructura.cadena(cadena_id, self.indice)
+
+    def __contains__(self, cadena_id):
+        return (self.indice, cadena_id) in self.estructura.rangos
+
+    def __iter__(self):
+        for cadena_id in self.estructura.cadenas(self.indice):
+            yield self[cadena_id]
+
+
+class EstructuraDiferida:
+    """
+    Estructura PDB indexada por (modelo, cadena) que parsea cada cadena recién cuando se
+    usa. Admite el acceso estructura[modelo][cadena] de BioPython.
+    """
+
+    def __init__(self, archivo_pdb, id_estructura="protein"):
+        self.archivo_pdb = archivo_pdb
+        self.id = id_estructura
+        self.rangos = indexar_rangos(archivo_pdb)
+        self._cadenas = {}  # (modelo, cadena_id) -> Chain ya materializada
+
+    def __len__(self):
+        """Cantidad de modelos con átomos."""
+        return len({modelo for modelo, _ in self.rangos})
+
+    def __getitem__(self, indice):
+        if not any(modelo == indice for modelo, _ in self.rangos):
+            raise KeyError(indice)
+        return ModeloDiferido(self, indice)
+
+    def cadenas(self, modelo=0):
+        """IDs de cadena de un modelo en orden de aparición, sin parsear átomos."""
+        return [cadena_id for m, cadena_id in self.rangos if m == modelo]
+
+    def texto_cadena(self, cadena_id, modelo=0):
+        """Líneas del archivo de una cadena (sólo sus rangos de bytes), como texto."""
+        partes = []
+        with open(self.archivo_pdb, "rb") as f:
+            for inicio, fin in self.rangos[(modelo, cadena_id)]:
+                f.seek(inicio)
+                partes.append(f.read(fin - inicio))
+        return b"".join(partes).decode("ascii", errors="replace")
+
+    def cadena(self, cadena_id, modelo=0):
+        """Retorna la cadena como Chain de BioPython, parseándola la primera vez."""
+        clave = (modelo, cadena_id)
+        if clave not in self._cadenas:
+            if clave not in self.rangos:
+                raise KeyError(cadena_id)
+            parser = PDBParser(QUIET=True)
+            texto = self.texto_cadena(cadena_id, modelo)
+            estructura = parser.get_structure(self.id, StringIO(texto))
+            self._cadenas[clave] = estructura[0][cadena_id]
+        return self._cadenas[clave]
+
+    def cadenas_materializadas(self):
+        """Claves (modelo, cadena_id) de las cadenas ya parseadas."""
+        return list(self._cadenas)
@@ -1,8 +1,25 @@
 import json
 import os
+import time
 
-from data.fetch_uniprot import buscar_features_uniprot
+from data import cliente_http
+from data.fetch_uniprot import (
+    buscar_features_uniprot,
+    mapear_ids_uniprot,
+    obtener_features_json,
+)
+from utils.mapeo_ids import leer_ids_archivo
 from utils.pdb_search import es_accession_uniprot, map_ncbi_to_uni
+from utils.salida_filas import escribir_filas
+
+# Columnas del dataset de features en lote (una fila por feature)
+COLUMNAS_FEATURES = [
+    ("accession", "str"),
+    ("type", "str"),
+    ("start", "int"),
+    ("end", "int"),
+    ("note", "str"),
+]
 
 # Guarda features en un archivo
 # Entrada = contenido, accession, formato
@@ -69,15 +86,18 @@ def descargar_features(accession, formato):
         except Exception as e:
             return f"Error durante el mapeo: {e}"
 
-        for uid in uniprot_ids:
-            try:
-                print(f"Descargando features para UniProt ID: {uid}")
-                contenido = buscar_features_uniprot(uid, formato)
-                ruta = guardar_features_archivo(contenido, uid, formato)
-                if ruta:
-                    archivos_guardados.append(ruta)
-            except Exception as e:
-                print(f"No se pudieron obtener features para '{uid}': {e}")
+        # Descargas concurrentes; se guardan en el orden de los IDs mapeados
+        print(f"Descargando features para {len(uniprot_ids)} UniProt IDs...")
+        descargas = cliente_http.ejecutar_concurrente(
+            lambda uid: buscar_features_uniprot(uid, formato), uniprot_ids
+        )
+        for uid, contenido, error in descargas:
+            if error is not None:
+                print(f"No se pudieron obtener features para '{uid}': {error}")
+                continue
+            ruta = guardar_features_archivo(contenido, uid, formato)
+            if ruta:
+                archivos_guardados.append(ruta)
     
     if not archivos_guardados:
         return "No se guardó ningún archivo."
@@ -86,4 +106,89 @@ def descargar_features(accession, formato):
     for archivo in archivos_guardados:
         print(f"  - {archivo}")
     
-    return None  # No es necesario devolver texto si ya imprime todo
\ No newline at end of file
+    return None  # No es necesario devolver texto si ya imprime todo
+
+
+def _posicion(location, extremo):
+    valor = location.get(extremo, {}).get("value")
+    return valor if isinstance(valor, int) else None
+
+
+# Convierte las features JSON de UniProt en filas planas
+# Entrada = accession, lista de features de UniProt
+# Salida = generador de filas (accession, type, start, end, note)
+def filas_features(accession, features):
+    for feature in features:
+        location = feature.get("location", {})
+        yield {
+            "accession": accession,
+            "type": feature.get("type"),
+            "start": _posicion(location, "start"),
+            "end": _posicion(location, "end"),
+            "note": feature.get("description") or None,
+        }
+
+
+# Resuelve una lista de IDs a accessions de UniProt (los IDs de NCBI se mapean en un solo lote)
+# Entrada = lista de IDs
+# Salida = lista de accessions sin repetir, en el orden de entrada
+def resolver_accessions(ids):
+    otros = [i for i in ids if not es_accession_uniprot(i)]
+    mapeo = mapear_ids_uniprot(otros) if otros else {}
+    accessions = []
+    for i in ids:
+        accessions.extend([i] if es_accession_uniprot(i) else mapeo.get(i, []))
+    return list(dict.fromkeys(accessions))
+
+
+# Descarga las features de una lista de accessions a un único dataset comprimido
+# Las descargas son concurrentes y las filas se escriben por bloques a medida que llegan
+# Entrada = archivo con IDs, ruta de salida (.jsonl.gz o .parquet), hilos, accessions por bloque
+# Salida = mensaje de estado de la descarga
+def descargar_features_lote(archivo, salida=None, hilos=None, tamano_bloque=200):
+    if salida is None:
+        nombre = os.path.splitext(os.path.basename(archivo))[0]
+        salida = os.path.join("resultados", f"features_{nombre}.jsonl.gz")
+
+    try:
+        accessions = resolver_accessions(leer_ids_archivo(archivo))
+    except Exception as e:
+        return f"Error al leer o mapear los IDs: {e}"
+    if not accessions:
+        return "No se encontraron accessions de UniProt para descargar."
+
+    inicio = time.perf_counter()
+    estado = {"procesados": 0, "fallidos": []}
+
+    def filas():
+        for desde in range(0, len(accessions), tamano_bloque):
+            bloque = accessions[desde : desde + tamano_bloque]
+            for accession, features, error in cliente_http.ejecutar_concurrente(
+                obtener_features_json, bloque, hilos
+            ):
+                if error is not None:
+                    estado["fallidos"].append(accession)
+                else:
+                    yield from filas_features(accession, features)
+            estado["procesados"] += len(bloque)
+            print(
+                f"\rAccessions procesados: {estado['procesados']}/{len(accessions)}",
+                end="",
+                flush=True,
+            )
+
+    try:
+        total = escribir_filas(salida, filas(), COLUMNAS_FEATURES)
+    except Exception as e:
+        return f"Error al escribir el dataset de features: {e}"
+
+    print()
+    if estado["fallidos"]:
+        print(
+            f"No se pudieron obtener features para {len(estado['fallidos'])} accessions: "
+            f"{', '.join(estado['fallidos'][:20])}"
+        )
+    return (
+        f"{total} features de {len(accessions) - len(estado['fallidos'])} accessions "
+        f"guardadas en {salida} ({time.perf_counter() - inicio:.1f} s)"
+    )
@@ -0,0 +1,309 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from utils.opciones_cli import DPI_DEFAULT, FORMATOS
+
+# =============================================================================
+# SALIDA DE GRÁFICOS DE RMSD LOCAL (PNG, SVG O PERFIL JSON)
+# =============================================================================
+#
+# matplotlib y seaborn se importan recién al dibujar el primer gráfico. Las
+# figuras no pasan por pyplot: se dibujan con FigureCanvasAgg (sin ventanas) y
+# cada hilo reutiliza una sola Figure que se limpia entre gráficos, así que no
+# se acumulan figuras abiertas en análisis por lote. El estilo se aplica con
+# matplotlib.rc_context al crear, dibujar y guardar cada figura, sin cambiar el
+# backend ni los rcParams globales de quien importe este módulo.
+#
+# Formatos:
+#   png  -> imagen con DPI configurable (DPI_DEFAULT)
+#   svg  -> vectorial compacto (texto como texto, sin marcadores en curvas largas)
+#   json -> perfil pequeño (posiciones, RMSD por ventana y estadísticas) para
+#           embeber en reportes HTML o graficar después con graficar_lote()
+#
+# =============================================================================
+
+# Curvas con más puntos que esto se dibujan sin marcadores (SVG más liviano)
+MAX_PUNTOS_MARCADORES = 300
+
+_matplotlib = {}
+_local = threading.local()
+
+
+# Importa matplotlib y seaborn una sola vez y arma el estilo de los gráficos
+# Salida = clases Figure y FigureCanvasAgg
+def _cargar_matplotlib():
+    if not _matplotlib:
+        import matplotlib
+        import seaborn as sns
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.figure import Figure
+
+        # Mismo estilo que antes, guardado aparte en vez de aplicarlo a los rcParams globales
+        estilo = dict(matplotlib.style.library["seaborn-v0_8"])
+        estilo["axes.prop_cycle"] = matplotlib.cycler(color=sns.color_palette("husl"))
+        estilo["svg.fonttype"] = "none"
+        _matplotlib.update(
+            Figure=Figure,
+            FigureCanvasAgg=FigureCanvasAgg,
+            rc_context=matplotlib.rc_context,
+            estilo=estilo,
+        )
+    return _matplotlib["Figure"], _matplotlib["FigureCanvasAgg"]
+
+
+# Contexto con el estilo de los gráficos (rcParams temporales)
+def _estilo():
+    _cargar_matplotlib()
+    return _matplotlib["rc_context"](_matplotlib["estilo"])
+
+
+# Crea una figura fuera de pyplot (se libera sola al perder la referencia)
+def nueva_figura(figsize=(12, 6)):
+    Figure, FigureCanvasAgg = _cargar_matplotlib()
+    with _estilo():
+        fig = Figure(figsize=figsize)
+    FigureCanvasAgg(fig)
+    return fig
+
+
+# Figura reutilizable del hilo actual, limpia
+def _figura_reutilizable():
+    fig = getattr(_local, "figura", None)
+    if fig is None:
+        fig = _local.figura = nueva_figura()
+    else:
+        fig.clear()
+    return fig
+
+
+# Normaliza los valores RMSD a una lista de ventanas y una columna por ventana
+# Entrada = valores RMSD (lista o matriz posiciones x ventanas), ventana (entero o lista)
+# Salida = lista de ventanas y lista de arreglos (uno por ventana)
+def _series(rmsd_values, ventana):
+    valores = np.asarray(rmsd_values, dtype=np.float64)
+    if valores.ndim == 2:
+        return list(ventana), [valores[:, k] for k in range(valores.shape[1])]
+    return [ventana], [valores]
+
+
+# Estadísticas de una serie ignorando NaN
+def estadisticas(valores):
+    valores = np.asarray(valores, dtype=np.float64)
+    valores = valores[~np.isnan(valores)]
+    if not len(valores):
+        return {"promedio": None, "desv_est": None, "maximo": None, "minimo": None}
+    return {
+        "promedio": round(float(np.mean(valores)), 4),
+        "desv_est": round(float(np.std(valores)), 4),
+        "maximo": round(float(np.max(valores)), 4),
+        "minimo": round(float(np.min(valores)), 4),
+    }
+
+
+# Construye el perfil JSON de un análisis RMSD local
+# Entrada = posiciones, valores RMSD, IDs de PDB, cadenas, ventana (entero o lista)
+# Salida = diccionario serializable (NaN -> None, RMSD redondeado a 3 decimales)
+def perfil_rmsd(posiciones, rmsd_values, pdb1_id, pdb2_id, cadena1_id, cadena2_id, ventana):
+    ventanas, columnas = _series(rmsd_values, ventana)
+    return {
+        "pdb1": pdb1_id,
+        "pdb2": pdb2_id,
+        "cadena1": cadena1_id,
+        "cadena2": cadena2_id,
+        "ventanas": [int(v) for v in ventanas],
+        "posiciones": [int(p) for p in posiciones],
+        "rmsd": [
+            [None if np.isnan(v) else round(float(v), 3) for v in columna]
+            for columna in columnas
+        ],
+        "estadisticas": [estadisticas(columna) for columna in columnas],
+    }
+
+
+# Dibuja el gráfico de RMSD local en una figura
+# Entrada = figura, posiciones, valores RMSD, IDs de PDB, cadenas, ventana (entero o lista)
+# Salida = la misma figura
+def dibujar_rmsd(
+    fig, posiciones, rmsd_values, pdb1_id, pdb2_id, cadena1_id, cadena2_id, ventana=5
+):
+    with _estilo():
+        return _dibujar_rmsd(
+            fig, posiciones, rmsd_values, pdb1_id, pdb2_id, cadena1_id, cadena2_id, ventana
+        )
+
+
+def _dibujar_rmsd(fig, posiciones, rmsd_values, pdb1_id, pdb2_id, cadena1_id, cadena2_id, ventana):
+    ax = fig.add_subplot(1, 1, 1)
+    ventanas, columnas = _series(rmsd_values, ventana)
+    varias = len(ventanas) > 1
+
+    # Una curva por tamaño de ventana; sin marcadores si la curva es muy larga
+    estilo = "o-" if len(posiciones) <= MAX_PUNTOS_MARCADORES else "-"
+    for tamano, columna in zip(ventanas, columnas):
+        ax.plot(
+            posiciones,
+            columna,
+            estilo,
+            linewidth=2,
+            markersize=3 if varias else 4,
+            alpha=0.7,
+            label=f"Ventana={tamano}",
+        )
+    if varias:
+        ax.legend(loc="upper right")
+
+    ax.set_xlabel("Posición del residuo", fontsize=12)
+    ax.set_ylabel("RMSD Local (Å)", fontsize=12)
+    ax.set_title(
+        f"RMSD Local entre {pdb1_id} y {pdb2_id} (Cadena {cadena1_id} y {cadena2_id}, "
+        f"Ventana={', '.join(str(tamano) for tamano in ventanas)})",
+        fontsize=14,
+        fontweight="bold",
+    )
+    ax.grid(True, alpha=0.3)
+
+    # Estadísticas de la primera ventana
+    stats = estadisticas(columnas[0])
+    if stats["promedio"] is not None:
+        ax.text(
+            0.02,
+            0.98,
+            f"Promedio: {stats['promedio']:.3f} Å\nDesv. Est.: {stats['desv_est']:.3f} Å\n"
+            f"Máximo: {stats['maximo']:.3f} Å",
+            transform=ax.transAxes,
+            fontsize=10,
+            verticalalignment="top",
+            bbox=dict(boxstyle="round", facecolor="wheat", alpha=0.8),
+        )
+
+    fig.tight_layout()
+    return fig
+
+
+# Nombre base del archivo de un análisis (sin extensión)
+def nombre_base(pdb1_id, pdb2_id, cadena1_id, cadena2_id, ventana):
+    nombre = f"rmsd_local_{pdb1_id}_{pdb2_id}_{cadena1_id}_{cadena2_id}"
+    if isinstance(ventana, (list, tuple)) and len(ventana) > 1:
+        nombre += "_w" + "-".join(str(tamano) for tamano in ventana)
+    return nombre
+
+
+# Guarda el análisis RMSD local en el formato pedido
+# Entrada = posiciones, valores RMSD, IDs de PDB, cadenas, ventana, formato (png, svg,
+#           json), dpi (sólo png), carpeta de salida
+# Salida = ruta del archivo guardado
+def guardar_grafico_rmsd(
+    posiciones,
+    rmsd_values,
+    pdb1_id,
+    pdb2_id,
+    cadena1_id,
+    cadena2_id,
+    ventana,
+    formato="png",
+    dpi=DPI_DEFAULT,
+    carpeta="graficos",
+):
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato inválido: {formato} (opciones: {', '.join(FORMATOS)})")
+
+    os.makedirs(carpeta, exist_ok=True)
+    ruta = os.path.join(
+        carpeta,
+        f"{nombre_base(pdb1_id, pdb2_id, cadena1_id, cadena2_id, ventana)}.{formato}",
+    )
+
+    if formato == "json":
+        perfil = perfil_rmsd(
+            posiciones, rmsd_values, pdb1_id, pdb2_id, cadena1_id, cadena2_id, ventana
+        )
+        with open(ruta, "w", encoding="utf-8") as f:
+            json.dump(perfil, f, ensure_ascii=False, separators=(",", ":"))
+        return ruta
+
+    fig = dibujar_rmsd(
+        _figura_reutilizable(),
+        posiciones,
+        rmsd_values,
+        pdb1_id,
+        pdb2_id,
+        cadena1_id,
+        cadena2_id,
+        ventana,
+    )
+    with _estilo():
+        if formato == "svg":
+            fig.savefig(ruta, format="svg", metadata={"Date": None})
+        else:
+            fig.savefig(ruta, dpi=dpi)
+    fig.clear()
+    return ruta
+
+
+# Grafica un perfil JSON guardado (se ejecuta en un proceso del pool)
+# Entrada = ruta del perfil, formato, dpi, carpeta
+# Salida = (ruta generada, segundos, error o None)
+def graficar_perfil(ruta_perfil, formato="svg", dpi=DPI_DEFAULT, carpeta="graficos"):
+    inicio = time.perf_counter()
+    try:
+        with open(ruta_perfil, encoding="utf-8") as f:
+            perfil = json.load(f)
+        # Las columnas se vuelven a armar como matriz posiciones x ventanas (None -> NaN)
+        matriz = np.array(perfil["rmsd"], dtype=np.float64).T
+        ventanas = perfil["ventanas"]
+        ruta = guardar_grafico_rmsd(
+            perfil["posiciones"],
+            matriz if len(ventanas) > 1 else matriz[:, 0],
+            perfil["pdb1"],
+            perfil["pdb2"],
+            perfil["cadena1"],
+            perfil["cadena2"],
+            ventanas if len(ventanas) > 1 else ventanas[0],
+            formato,
+            dpi,
+            carpeta,
+        )
+        return ruta, time.perf_counter() - inicio, None
+    except Exception as e:
+        return None, time.perf_counter() - inicio, f"{type(e).__name__}: {e}"
+
+
+# Inicializa cada proceso del pool: backend sin ventanas antes de cualquier import
+def _inicializar_proceso():
+    os.environ["MPLBACKEND"] = "Agg"
+
+
+# Grafica en paralelo una lista de perfiles JSON
+# Entrada = rutas de perfiles, formato, dpi, carpeta, procesos (None = CPUs)
+# Salida = lista de (ruta generada, segundos, error) en el orden de entrada
+def graficar_lote(perfiles, formato="svg", dpi=DPI_DEFAULT, carpeta="graficos", procesos=None):
+    if formato == "json":
+        raise ValueError("Los perfiles ya están en JSON; elegir png o svg")
+    inicio = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=procesos, initializer=_inicializar_proceso) as pool:
+        resultados = list(
+            pool.map(
+                graficar_perfil,
+                perfiles,
+                [formato] * len(perfiles),
+                [dpi] * len(perfiles),
+                [carpeta] * len(perfiles),
+                chunksize=max(1, len(perfiles) // (4 * (procesos or os.cpu_count() or 1))),
+            )
+        )
+
+    fallidos = 0
+    for perfil, (ruta, segundos, error) in zip(perfiles, resultados):
+        if error:
+            fallidos += 1
+            print(f"ERROR {perfil}: {error}")
+    print(
+        f"{len(resultados) - fallidos} gráficos generados, {fallidos} con error "
+        f"en {time.perf_counter() - inicio:.1f} s"
+    )
+    return resultados
@@ -0,0 +1,171 @@
+import bisect
+
+# =============================================================================
+# ÍNDICE DE INTERVALOS PARA FEATURES DE UNA PROTEÍNA
+# =============================================================================
+#
+# Guarda dominios, regiones y features personalizadas como intervalos
+# [inicio, final] (numeración de residuos, extremos incluidos) y construye,
+# una sola vez, la partición de la secuencia en segmentos elementales: los
+# bordes son todos los inicios y todos los finales + 1, ordenados. Cada
+# segmento conoce las features que lo cubren, así que:
+#
+#   en_residuo(i)        -> features que cubren el residuo i: búsqueda binaria
+#                           sobre los bordes, O(log n + k)
+#   residuos_de(S)       -> tramos de residuos cubiertos por un conjunto de
+#                           features, ya fusionados, O(|S| log |S|)
+#   estilos_por_color()  -> tramos de residuos por color (la última feature
+#                           agregada manda en los solapamientos, igual que
+#                           llamadas sucesivas a addStyle), para emitir un solo
+#                           addStyle por color; opcionalmente traducidos a la
+#                           numeración de autor del PDB (utils.numeracion_sifts)
+#
+# =============================================================================
+
+
+class IndiceFeatures:
+    """
+    Almacén de features con índice de intervalos ordenado.
+    Cada feature es un diccionario con id, tipo, inicio, final, note y color.
+    """
+
+    def __init__(self):
+        self.features = []
+        self._bordes = None
+        self._cubiertas = None
+
+    def __len__(self):
+        return len(self.features)
+
+    def agregar(self, inicio, final, note, tipo="otro", color=None):
+        """
+        Agrega una feature y retorna su id (posición de inserción).
+        Las features agregadas después se pintan por encima de las anteriores.
+        """
+        inicio, final = int(inicio), int(final)
+        if final < inicio:
+            inicio, final = final, inicio
+        feature = {
+            "id": len(self.features),
+            "tipo": tipo,
+            "inicio": inicio,
+            "final": final,
+            "note": note,
+            "color": color,
+        }
+        self.features.append(feature)
+        self._bordes = self._cubiertas = None
+        return feature["id"]
+
+    def agregar_lista(self, features, tipo):
+        """Agrega una lista de diccionarios con inicio, final y note (p. ej. PDB_Viewer.dominios)."""
+        return [
+            self.agregar(f["inicio"], f["final"], f.get("note"), tipo, f.get("color"))
+            for f in features or []
+        ]
+
+    def _construir(self):
+        # Segmentos elementales [bordes[k], bordes[k + 1]) con sus features ordenadas por id
+        eventos = sorted(
+            {f["inicio"] for f in self.features} | {f["final"] + 1 for f in self.features}
+        )
+        cubiertas = [[] for _ in eventos]
+        for feature in self.features:
+            desde = bisect.bisect_left(eventos, feature["inicio"])
+            hasta = bisect.bisect_left(eventos, feature["final"] + 1)
+            for k in range(desde, hasta):
+                cubiertas[k].append(feature["id"])
+        self._bordes = eventos
+        self._cubiertas = [tuple(ids) for ids in cubiertas]
+
+    def _segmentos(self):
+        if self._bordes is None:
+            self._construir()
+        return self._bordes, self._cubiertas
+
+    def en_residuo(self, residuo):
+        """Retorna las features que cubren el residuo, en orden de inserción."""
+        bordes, cubiertas = self._segmentos()
+        k = bisect.bisect_right(bordes, residuo) - 1
+        if k < 0:
+            return []
+        return [self.features[i] for i in cubiertas[k]]
+
+    def seleccionar(self, tipos=None, ids=None):
+        """Retorna las features de los tipos o ids indicados (None = todas)."""
+        return [
+            f
+            for f in self.features
+            if (tipos is None or f["tipo"] in tipos) and (ids is None or f["id"] in ids)
+        ]
+
+    def residuos_de(self, features=None):
+        """
+        Retorna los tramos (inicio, final) de residuos cubiertos por las features dadas
+        (None = todas), ordenados y fusionados cuando se solapan o son contiguos.
+        """
+        intervalos = sorted(
+            (f["inicio"], f["final"]) for f in (self.features if features is None else features)
+        )
+        tramos = []
+        for inicio, final in intervalos:
+            if tramos and inicio <= tramos[-1][1] + 1:
+                tramos[-1] = (tramos[-1][0], max(tramos[-1][1], final))
+            else:
+                tramos.append((inicio, final))
+        return tramos
+
+    def tramos_de_color(self):
+        """
+        Retorna los tramos (inicio, final, color) en orden de residuo, donde cada residuo
+        toma el color de la última feature agregada que lo cubre. Los segmentos contiguos
+        del mismo color se fusionan en un solo tramo.
+        """
+        bordes, cubiertas = self._segmentos()
+        tramos = []
+        for k, ids in enumerate(cubiertas):
+            if not ids:
+                continue
+            inicio, final = bordes[k], bordes[k + 1] - 1
+            color = self.features[ids[-1]]["color"]
+            if tramos and tramos[-1][2] == color and tramos[-1][1] + 1 == inicio:
+                tramos[-1] = (tramos[-1][0], final, color)
+            else:
+                tramos.append((inicio, final, color))
+        return tramos
+
+    def estilos_por_color(self, traducir=None):
+        """
+        Agrupa los tramos por color en selecciones de 3Dmol ("inicio-final").
+        traducir (opcional) convierte los tramos a otra numeración: recibe las listas de
+        inicios y finales y retorna, por tramo, una lista de selecciones (p. ej.
+        MapaNumeracion.rangos_a_pdb de utils.numeracion_sifts).
+        Retorna un diccionario {color: ["10-25", "40-52", ...]}.
+        """
+        tramos = self.tramos_de_color()
+        if traducir is None:
+            selecciones = [
+                [str(inicio) if inicio == final else f"{inicio}-{final}"]
+                for inicio, final, _ in tramos
+            ]
+        else:
+            selecciones = traducir([t[0] for t in tramos], [t[1] for t in tramos])
+        estilos = {}
+        for (_, _, color), residuos in zip(tramos, selecciones):
+            if residuos:
+                estilos.setdefault(color, []).extend(residuos)
+        return estilos
+
+    def aplicar_estilos(self, view3Dmol, seleccion_base=None, traducir=None):
+        """
+        Pinta todas las features con un único addStyle por color.
+        seleccion_base (opcional) restringe la selección, p. ej. {"chain": "A"}.
+        traducir (opcional) se pasa a estilos_por_color.
+        Retorna la cantidad de llamadas a addStyle emitidas.
+        """
+        estilos = self.estilos_por_color(traducir)
+        for color, residuos in estilos.items():
+            view3Dmol.addStyle(
+                {**(seleccion_base or {}), "resi": residuos}, {"cartoon": {"color": color}}
+            )
+        return len(estilos)
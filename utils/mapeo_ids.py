@@ -0,0 +1,65 @@
+import os
+import re
+import time
+
+from data.fetch_uniprot import mapear_ids_uniprot
+
+
+# Lee IDs desde un archivo de texto (uno por línea, o separados por comas, espacios o tabulaciones)
+# Las líneas que empiezan con "#" se ignoran
+# Entrada = ruta del archivo
+# Salida = lista de IDs
+def leer_ids_archivo(ruta):
+    ids = []
+    with open(ruta, encoding="utf-8") as f:
+        for linea in f:
+            linea = linea.strip()
+            if linea and not linea.startswith("#"):
+                ids.extend(i for i in re.split(r"[,\s]+", linea) if i)
+    return ids
+
+
+# Guarda el mapeo en un TSV con una fila por par (origen, destino)
+# Los IDs sin correspondencia se escriben con el destino vacío
+# Entrada = ruta, diccionario {ID de origen: lista de IDs de destino}
+# Salida = ruta del archivo guardado
+def guardar_mapeo_tsv(ruta, mapeo):
+    carpeta = os.path.dirname(ruta)
+    if carpeta:
+        os.makedirs(carpeta, exist_ok=True)
+    with open(ruta, "w", encoding="utf-8") as f:
+        f.write("from\tto\n")
+        for origen, destinos in mapeo.items():
+            for destino in destinos or [""]:
+                f.write(f"{origen}\t{destino}\n")
+    return ruta
+
+
+# Función principal: mapea en lote IDs de NCBI (u otra base) a UniProt
+# Entrada = IDs sueltos, archivo con IDs, ruta de salida TSV, bases de origen y destino
+# Salida = diccionario {ID de origen: lista de IDs de destino}
+def mapear_ids(ids=(), archivo=None, salida=None, origen="RefSeq_Protein", destino="UniProtKB"):
+    ids = list(ids)
+    if archivo:
+        ids.extend(leer_ids_archivo(archivo))
+    if not ids:
+        print("No se indicaron IDs para mapear.")
+        return {}
+
+    inicio = time.perf_counter()
+    print(f"Mapeando {len(ids)} IDs de {origen} a {destino}...")
+    mapeo = mapear_ids_uniprot(ids, origen, destino)
+
+    mapeados = sum(1 for destinos in mapeo.values() if destinos)
+    print(
+        f"Mapeados {mapeados} de {len(mapeo)} IDs "
+        f"({sum(len(d) for d in mapeo.values())} correspondencias) "
+        f"en {time.perf_counter() - inicio:.1f} s"
+    )
+
+    if salida:
+        print(f"Mapeo guardado en: {guardar_mapeo_tsv(salida, mapeo)}")
+    else:
+        for origen_id, destinos in mapeo.items():
+            print(f"{origen_id}\t{', '.join(destinos) if destinos else '-'}")
+    return mapeo
@@ -0,0 +1,374 @@
+import os
+import re
+from io import BytesIO
+
+import numpy as np
+
+from data import indice_sifts
+from data.cache_pdb import DIRECTORIO_CACHE, escribir_atomico
+from data.fetch_uniprot import obtener_mapeo_sifts
+from utils.almacen_ca import CadenaCA, claves_residuos, obtener_cadenas
+
+# =============================================================================
+# MAPA DE NUMERACIÓN POR RESIDUO: POSICIÓN UNIPROT <-> RESIDUO PDB (SIFTS)
+# =============================================================================
+#
+# A partir de los segmentos de SIFTS de un PDB (índice local de data.indice_sifts
+# o API de PDBe) se arma una tabla con una fila por residuo mapeado:
+#
+#   cadena | accession | posición UniProt | número de residuo (autor) | código de inserción
+#
+# ordenada por (cadena, accession, posición UniProt). Dentro de un segmento la
+# numeración de autor suele ser un desplazamiento constante de la de UniProt;
+# cuando hay códigos de inserción se recorren los residuos observados de la
+# cadena (almacén de CA). La tabla se guarda en disco (<cache>/sifts_residuos)
+# y se carga con memoria mapeada, así que cada PDB se arma una sola vez.
+#
+# Las traducciones son búsquedas binarias sobre los arreglos de cada bloque
+# (cadena, accession): miles de rangos de features se traducen en una sola
+# llamada a np.searchsorted.
+#
+# =============================================================================
+
+DIRECTORIO_NUMERACION = os.path.join(DIRECTORIO_CACHE, "sifts_residuos")
+
+# Versión del formato de las tablas en disco; al cambiarla se rearman las anteriores
+# (v2: código de inserción vacío como b"", igual que el almacén de CA)
+VERSION_TABLA = 2
+
+DTYPE_NUMERACION = np.dtype(
+    [
+        ("cadena", "S4"),
+        ("accession", "S16"),
+        ("unp", "<i4"),
+        ("resnum", "<i4"),
+        ("icode", "S1"),
+    ]
+)
+
+# Mínima fracción de residuos de la cadena más corta que debe quedar emparejada
+# por posición UniProt para usar esa correspondencia en el RMSD
+MINIMA_COBERTURA_UNIPROT = 0.5
+
+PATRON_RESIDUO = re.compile(r"^\s*(-?\d+)\s*([A-Za-z]?)\s*$")
+
+# Mapas ya cargados en este proceso
+_mapas = {}
+
+
+# Claves enteras (número de residuo, código de inserción) con la misma codificación que
+# almacen_ca.claves_residuos (código vacío = b"" = 0)
+def _claves(resnum, icode):
+    return claves_residuos(
+        CadenaCA(None, np.asarray(resnum), np.asarray(icode, dtype="S1"), None)
+    )
+
+
+def _clave_residuo(residuo):
+    numero, codigo = residuo
+    return numero * 256 + (ord(codigo) if codigo else 0)
+
+
+# Interpreta un número de residuo de autor con código de inserción opcional ("52A")
+# Salida = (número, código) o None si no hay número
+def _residuo(texto):
+    coincidencia = PATRON_RESIDUO.match(str(texto)) if texto is not None else None
+    if coincidencia is None:
+        return None
+    return int(coincidencia.group(1)), coincidencia.group(2)
+
+
+def _texto_residuo(extremo):
+    numero = (extremo or {}).get("author_residue_number")
+    if numero is None:
+        return None
+    return f"{numero}{(extremo.get('author_insertion_code') or '').strip()}"
+
+
+# Segmentos de SIFTS de un PDB: índice local si lo tiene, si no la API de PDBe
+# Entrada = PDB ID
+# Salida = lista de diccionarios con cadena, accession, pdb_beg, pdb_end, sp_beg y sp_end
+def segmentos_sifts(pdb_id):
+    if indice_sifts.disponible():
+        segmentos = indice_sifts.segmentos_de_pdb(pdb_id)
+        if segmentos:
+            return segmentos
+
+    segmentos = []
+    for accession, registro in obtener_mapeo_sifts(pdb_id).items():
+        for mapeo in registro.get("mappings", []):
+            segmentos.append(
+                {
+                    "cadena": mapeo["chain_id"].strip(),
+                    "accession": accession,
+                    "pdb_beg": _texto_residuo(mapeo.get("start")),
+                    "pdb_end": _texto_residuo(mapeo.get("end")),
+                    "sp_beg": mapeo["unp_start"],
+                    "sp_end": mapeo["unp_end"],
+                }
+            )
+    return segmentos
+
+
+# Residuos de un segmento de SIFTS
+# Entrada = segmento, función que devuelve la CadenaCA observada (sólo se usa si hay
+#           códigos de inserción)
+# Salida = (posiciones UniProt, números de residuo, códigos de inserción) o None
+def residuos_segmento(segmento, cadena_observada):
+    sp_beg, sp_end = segmento["sp_beg"], segmento["sp_end"]
+    if sp_beg is None or sp_end is None or sp_end < sp_beg:
+        return None
+    largo = sp_end - sp_beg + 1
+    inicio, fin = _residuo(segmento["pdb_beg"]), _residuo(segmento["pdb_end"])
+    if inicio is None and fin is None:
+        return None
+    # Un extremo sin número de autor (residuo no observado): se deduce del otro
+    if inicio is None:
+        inicio = (fin[0] - largo + 1, "")
+    if fin is None:
+        fin = (inicio[0] + largo - 1, "")
+
+    unp = np.arange(sp_beg, sp_end + 1, dtype=np.int32)
+    sin_codigo = np.zeros(largo, dtype="S1")
+
+    # Caso habitual: numeración consecutiva, desplazamiento constante
+    if fin[0] - inicio[0] == largo - 1 and not inicio[1] and not fin[1]:
+        return unp, inicio[0] + (unp - sp_beg), sin_codigo
+
+    # Códigos de inserción: residuos observados entre el primero y el último del segmento
+    cadena = cadena_observada(segmento["cadena"])
+    if cadena is not None:
+        claves = claves_residuos(cadena)
+        desde = np.flatnonzero(claves == _clave_residuo(inicio))
+        hasta = np.flatnonzero(claves == _clave_residuo(fin))
+        if len(desde) and len(hasta) and hasta[0] - desde[0] + 1 == largo:
+            tramo = slice(desde[0], hasta[0] + 1)
+            return unp, np.asarray(cadena.resnum[tramo]), np.asarray(cadena.icode[tramo])
+
+    # Último recurso: desplazamiento desde el inicio, acotado al rango del segmento
+    resnum = inicio[0] + (unp - sp_beg)
+    dentro = resnum <= fin[0]
+    return unp[dentro], resnum[dentro], sin_codigo[dentro]
+
+
+# Arma la tabla de numeración de un PDB a partir de sus segmentos de SIFTS
+# Entrada = PDB ID
+# Salida = arreglo estructurado DTYPE_NUMERACION ordenado por (cadena, accession, unp)
+def construir_tabla(pdb_id):
+    observadas = {}
+
+    def cadena_observada(cadena_id):
+        # Las cadenas del almacén sólo se cargan si algún segmento tiene inserciones
+        if "cadenas" not in observadas:
+            try:
+                observadas["cadenas"] = obtener_cadenas(pdb_id)
+            except Exception:
+                observadas["cadenas"] = {}
+        return observadas["cadenas"].get(cadena_id)
+
+    bloques = []
+    for segmento in segmentos_sifts(pdb_id):
+        residuos = residuos_segmento(segmento, cadena_observada)
+        if residuos is None:
+            continue
+        unp, resnum, icode = residuos
+        bloque = np.empty(len(unp), dtype=DTYPE_NUMERACION)
+        bloque["cadena"] = segmento["cadena"].encode("ascii")
+        bloque["accession"] = segmento["accession"].encode("ascii")
+        bloque["unp"], bloque["resnum"], bloque["icode"] = unp, resnum, icode
+        bloques.append(bloque)
+
+    if not bloques:
+        return np.empty(0, dtype=DTYPE_NUMERACION)
+    tabla = np.concatenate(bloques)
+    orden = np.lexsort((tabla["unp"], tabla["accession"], tabla["cadena"]))
+    return tabla[orden]
+
+
+def _ruta_tabla(pdb_id, directorio=None, version=VERSION_TABLA):
+    nombre = f"{pdb_id.upper()}.npy" if version == 1 else f"{pdb_id.upper()}.v{version}.npy"
+    return os.path.join(directorio or DIRECTORIO_NUMERACION, nombre)
+
+
+# Obtiene el mapa de numeración de un PDB (desde el disco o armándolo y guardándolo)
+# Entrada = PDB ID
+# Salida = MapaNumeracion
+def obtener_mapa(pdb_id, directorio=None):
+    clave = (pdb_id.upper(), directorio)
+    if clave in _mapas:
+        return _mapas[clave]
+
+    ruta = _ruta_tabla(pdb_id, directorio)
+    try:
+        tabla = np.load(ruta, mmap_mode="r", allow_pickle=False)
+    except (FileNotFoundError, ValueError):
+        tabla = construir_tabla(pdb_id)
+        buffer = BytesIO()
+        np.save(buffer, tabla, allow_pickle=False)
+        escribir_atomico(ruta, buffer.getvalue())
+        # Las tablas de versiones anteriores ya no se leen
+        for version in range(1, VERSION_TABLA):
+            try:
+                os.unlink(_ruta_tabla(pdb_id, directorio, version))
+            except FileNotFoundError:
+                pass
+
+    mapa = _mapas[clave] = MapaNumeracion(pdb_id, tabla)
+    return mapa
+
+
+class MapaNumeracion:
+    """
+    Mapa por residuo entre posiciones de UniProt y residuos (número de autor y código de
+    inserción) de las cadenas de un PDB. Cada bloque (cadena, accession) es un tramo
+    contiguo de la tabla ordenado por posición UniProt.
+    """
+
+    def __init__(self, pdb_id, tabla):
+        self.pdb_id = pdb_id.upper()
+        self.tabla = tabla
+        self._bloques = {}
+        if len(tabla):
+            cambios = np.flatnonzero(
+                (tabla["cadena"][1:] != tabla["cadena"][:-1])
+                | (tabla["accession"][1:] != tabla["accession"][:-1])
+            ) + 1
+            inicios = np.concatenate(([0], cambios))
+            finales = np.concatenate((cambios, [len(tabla)]))
+            for inicio, final in zip(inicios, finales):
+                clave = (
+                    tabla["cadena"][inicio].decode("ascii"),
+                    tabla["accession"][inicio].decode("ascii"),
+                )
+                self._bloques[clave] = slice(int(inicio), int(final))
+
+    def __len__(self):
+        return len(self.tabla)
+
+    def cadenas(self, accession=None):
+        """Cadenas mapeadas (a un accession dado, o a cualquiera), en orden."""
+        return list(
+            dict.fromkeys(c for c, a in self._bloques if accession is None or a == accession)
+        )
+
+    def accessions(self, cadena=None):
+        """Accessions mapeados (en una cadena dada, o en cualquiera), en orden."""
+        return list(
+            dict.fromkeys(a for c, a in self._bloques if cadena is None or c == cadena)
+        )
+
+    def _bloque(self, cadena, accession=None):
+        if accession is None:
+            accession = next(iter(self.accessions(cadena)), None)
+        tramo = self._bloques.get((cadena, accession))
+        return None if tramo is None else self.tabla[tramo]
+
+    def uniprot_a_pdb(self, cadena, posiciones, accession=None):
+        """
+        Traduce posiciones de UniProt a residuos de la cadena.
+        Retorna (números de residuo, códigos de inserción, máscara de posiciones mapeadas).
+        """
+        posiciones = np.asarray(posiciones, dtype=np.int64)
+        bloque = self._bloque(cadena, accession)
+        if bloque is None or not len(bloque):
+            vacio = np.zeros(len(posiciones), dtype=bool)
+            return np.zeros(len(posiciones), dtype=np.int32), np.zeros(len(posiciones), dtype="S1"), vacio
+        k = np.clip(np.searchsorted(bloque["unp"], posiciones), 0, len(bloque) - 1)
+        mapeadas = bloque["unp"][k] == posiciones
+        return bloque["resnum"][k], bloque["icode"][k], mapeadas
+
+    def pdb_a_uniprot(self, cadena, resnum, icode=None, accession=None):
+        """
+        Traduce residuos de la cadena (número y código de inserción) a posiciones de UniProt.
+        Retorna un arreglo con -1 en los residuos sin mapeo.
+        """
+        resnum = np.asarray(resnum, dtype=np.int64)
+        if icode is None:
+            icode = np.zeros(len(resnum), dtype="S1")
+        claves = _claves(resnum, icode)
+        resultado = np.full(len(resnum), -1, dtype=np.int64)
+        bloque = self._bloque(cadena, accession)
+        if bloque is None or not len(bloque):
+            return resultado
+        claves_bloque = _claves(bloque["resnum"], bloque["icode"])
+        orden = np.argsort(claves_bloque, kind="stable")
+        ordenadas = claves_bloque[orden]
+        k = np.clip(np.searchsorted(ordenadas, claves), 0, len(ordenadas) - 1)
+        encontradas = ordenadas[k] == claves
+        resultado[encontradas] = bloque["unp"][orden[k[encontradas]]]
+        return resultado
+
+    def rangos_a_pdb(self, cadena, inicios, finales, accession=None):
+        """
+        Traduce rangos de UniProt [inicio, final] a selecciones de residuos de 3Dmol
+        ("10-25") en la numeración de la cadena. Un rango que cruza un salto de numeración
+        se divide en varios tramos. Retorna una lista de listas (una por rango; vacía si
+        el rango no tiene residuos mapeados).
+        """
+        inicios = np.asarray(inicios, dtype=np.int64)
+        finales = np.asarray(finales, dtype=np.int64)
+        bloque = self._bloque(cadena, accession)
+        if bloque is None or not len(bloque):
+            return [[] for _ in inicios]
+
+        unp, resnum = bloque["unp"], bloque["resnum"]
+        desde = np.searchsorted(unp, inicios, side="left")
+        hasta = np.searchsorted(unp, finales, side="right")
+
+        # Tramos de numeración consecutiva (un código de inserción repite el número)
+        salto = np.concatenate(([True], (resnum[1:] - resnum[:-1] > 1) | (resnum[1:] < resnum[:-1])))
+        tramo = np.cumsum(salto) - 1
+        vacios = desde >= hasta
+        ultimo = np.maximum(hasta - 1, 0)
+        simples = ~vacios & (tramo[np.minimum(desde, len(tramo) - 1)] == tramo[ultimo])
+
+        selecciones = []
+        for k in range(len(inicios)):
+            if vacios[k]:
+                selecciones.append([])
+            elif simples[k]:
+                selecciones.append([_seleccion(resnum[desde[k]], resnum[ultimo[k]])])
+            else:
+                # Pocos rangos cruzan saltos: se dividen uno por uno
+                partes = tramo[desde[k] : hasta[k]]
+                cortes = np.flatnonzero(np.diff(partes)) + 1
+                selecciones.append(
+                    [
+                        _seleccion(resnum[desde[k] + a], resnum[desde[k] + b - 1])
+                        for a, b in zip(
+                            np.concatenate(([0], cortes)),
+                            np.concatenate((cortes, [len(partes)])),
+                        )
+                    ]
+                )
+        return selecciones
+
+
+def _seleccion(inicio, final):
+    return str(inicio) if inicio == final else f"{inicio}-{final}"
+
+
+# Correspondencia de residuos entre dos cadenas por posición UniProt (SIFTS)
+# Entrada = PDB ID, ID de cadena y CadenaCA de cada estructura
+# Salida = índices emparejados de ambas cadenas (en el orden de la cadena 1), o None si
+#          no comparten accession, no hay mapeo o la cobertura es insuficiente
+def correspondencia_uniprot(pdb1_id, cadena1_id, cadena1, pdb2_id, cadena2_id, cadena2):
+    try:
+        mapa1, mapa2 = obtener_mapa(pdb1_id), obtener_mapa(pdb2_id)
+    except Exception as e:
+        print(f"Advertencia: sin mapa de numeración SIFTS ({e})")
+        return None
+
+    comunes = [a for a in mapa1.accessions(cadena1_id) if a in mapa2.accessions(cadena2_id)]
+    if not comunes:
+        return None
+    unp1 = mapa1.pdb_a_uniprot(cadena1_id, cadena1.resnum, cadena1.icode, comunes[0])
+    unp2 = mapa2.pdb_a_uniprot(cadena2_id, cadena2.resnum, cadena2.icode, comunes[0])
+    validos1, validos2 = np.flatnonzero(unp1 >= 0), np.flatnonzero(unp2 >= 0)
+    _, k1, k2 = np.intersect1d(unp1[validos1], unp2[validos2], return_indices=True)
+    indices1, indices2 = validos1[k1], validos2[k2]
+
+    if len(indices1) < MINIMA_COBERTURA_UNIPROT * min(len(cadena1.resnum), len(cadena2.resnum)):
+        return None
+    orden = np.argsort(indices1, kind="stable")
+    return indices1[orden], indices2[orden]
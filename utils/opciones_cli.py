@@ -0,0 +1,18 @@
+# =============================================================================
+# VALORES DE OPCIONES COMPARTIDOS ENTRE LA CLI Y LOS MÓDULOS
+# =============================================================================
+#
+# main.py los usa en las opciones de click sin importar los módulos pesados
+# (matplotlib, py3Dmol...); graficos_rmsd y pdb_viewer validan con los mismos
+# valores. Este módulo sólo puede depender de la biblioteca estándar.
+#
+# =============================================================================
+
+# Formatos de salida del RMSD local (utils.graficos_rmsd)
+FORMATOS = ("png", "svg", "json")
+# Formatos de imagen (graficar perfiles JSON ya guardados)
+FORMATOS_IMAGEN = ("png", "svg")
+DPI_DEFAULT = 150
+
+# Representaciones de la estructura embebida en los reportes (utils.pdb_viewer)
+REPRESENTACIONES = ("auto", "completa", "cadena", "ca")
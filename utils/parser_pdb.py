@@ -0,0 +1,242 @@
+import numpy as np
+
+# =============================================================================
+# PARSER PDB POR COLUMNAS FIJAS
+# =============================================================================
+#
+# Lee los registros ATOM/HETATM de un archivo PDB por bloques de bytes y llena
+# arreglos NumPy directamente, sin crear un objeto de Python por átomo ni por
+# línea: los registros (ATOM/HETATM/MODEL/ENDMDL) y los filtros de modelo,
+# cadena, nombre de átomo y altloc se evalúan con operaciones vectorizadas
+# sobre los inicios de línea de cada bloque, de modo que para el análisis RMSD
+# sólo se copian y convierten las líneas de los CA buscados.
+#
+# Columnas del formato PDB (índices desde 0):
+#   0-5 registro | 12-15 nombre | 16 altloc | 17-19 residuo | 21 cadena
+#   22-25 número de residuo | 26 código de inserción | 30-53 x, y, z
+#   54-59 ocupación | 60-65 factor B | 76-77 elemento
+#
+# =============================================================================
+
+DTYPE_ATOMOS = np.dtype(
+    [
+        ("modelo", "<i4"),
+        ("hetatm", "?"),
+        ("nombre", "S4"),
+        ("altloc", "S1"),
+        ("resname", "S3"),
+        ("cadena", "S1"),
+        ("resnum", "<i4"),
+        ("icode", "S1"),
+        ("coord", "<f4", (3,)),
+        ("ocupacion", "<f4"),
+        ("bfactor", "<f4"),
+        ("elemento", "S2"),
+    ]
+)
+
+ANCHO_LINEA = 80
+
+# Valor de altlocs que conserva, para cada átomo, la primera ubicación alternativa que
+# aparece en el archivo (como BioPython), sea cual sea su código
+PRIMER_ALTLOC = "primero"
+
+# Cantidad aproximada de bytes leídos por bloque
+TAMANO_BLOQUE = 8 * 1024 * 1024
+
+
+# Lee los átomos de un archivo PDB aplicando filtros durante la lectura
+# Entrada = ruta del archivo PDB
+#           modelo: número de modelo (1 por default, None = todos)
+#           cadenas: IDs de cadena a conservar (None = todas)
+#           nombres_atomo: nombres de átomo a conservar, p. ej. ("CA",) (None = todos)
+#           altlocs: PRIMER_ALTLOC (default: la primera ubicación alternativa de cada
+#                    átomo), códigos altloc aceptados ("" representa sin altloc) o None
+#                    (todas)
+#           hetatm: incluir registros HETATM
+# Salida = arreglo estructurado con DTYPE_ATOMOS, en el orden del archivo
+def leer_atomos(
+    archivo_pdb,
+    modelo=1,
+    cadenas=None,
+    nombres_atomo=None,
+    altlocs=PRIMER_ALTLOC,
+    hetatm=True,
+    tamano_bloque=TAMANO_BLOQUE,
+):
+    registros = (b"ATOM  ", b"HETATM") if hetatm else (b"ATOM  ",)
+    bloques = []
+    primer_altloc = altlocs == PRIMER_ALTLOC
+    filtro_altlocs = None if primer_altloc else altlocs
+
+    # Los archivos sin registros MODEL se consideran modelo 1
+    modelo_actual = 1
+    with open(archivo_pdb, "rb") as f:
+        resto = b""
+        terminado = False
+        while not terminado:
+            datos = f.read(tamano_bloque)
+            if not datos and not resto:
+                break
+            # Bloques de líneas completas: la línea cortada pasa al bloque siguiente
+            texto = resto + datos
+            if datos:
+                corte = texto.rfind(b"\n") + 1
+                texto, resto = texto[:corte], texto[corte:]
+                if not texto:
+                    continue
+            else:
+                resto = b""
+
+            matriz, modelos, modelo_actual, terminado = _seleccionar_lineas(
+                np.frombuffer(texto, dtype=np.uint8),
+                registros,
+                modelo,
+                modelo_actual,
+                cadenas,
+                nombres_atomo,
+                filtro_altlocs,
+            )
+            if len(matriz):
+                bloques.append(_parsear_matriz(matriz, modelos))
+
+    if not bloques:
+        return np.empty(0, dtype=DTYPE_ATOMOS)
+    atomos = np.concatenate(bloques)
+    return _primera_ubicacion(atomos) if primer_altloc else atomos
+
+
+# Selecciona las líneas de átomos de un bloque de bytes sin recorrerlas en Python: los
+# registros y filtros se evalúan con operaciones vectorizadas sobre los inicios de línea
+# (sólo las líneas MODEL se leen una por una, para obtener su número)
+# Entrada = bloque (uint8, líneas completas), registros aceptados, modelo pedido, modelo
+#           vigente al inicio del bloque, filtros de cadena, nombre de átomo y altloc
+# Salida = matriz de bytes (líneas x ANCHO_LINEA), modelo de cada línea, modelo vigente al
+#          final del bloque y si el modelo pedido ya se leyó completo (ENDMDL)
+def _seleccionar_lineas(
+    buffer, registros, modelo, modelo_actual, cadenas, nombres_atomo, altlocs
+):
+    n = len(buffer)
+    finales = np.flatnonzero(buffer == ord("\n")) + 1
+    if not len(finales) or finales[-1] != n:
+        finales = np.append(finales, n)
+    inicios = np.concatenate(([0], finales[:-1]))
+    largos = finales - inicios
+
+    # Byte k de cada línea (espacio si la línea es más corta o es un control como \r)
+    def columna(k, filas=None):
+        desde, largo = (inicios, largos) if filas is None else (inicios[filas], largos[filas])
+        valores = np.where(k < largo, buffer[np.minimum(desde + k, n - 1)], 32)
+        return np.where(valores < 32, 32, valores).astype(np.uint8)
+
+    primeros = [columna(k) for k in range(6)]
+
+    def es_registro(nombre):
+        mascara = np.ones(len(inicios), dtype=bool)
+        for k, byte in enumerate(nombre):
+            mascara &= primeros[k] == byte
+        return mascara
+
+    # Modelo de cada línea: el del último registro MODEL anterior (o el vigente al inicio)
+    es_modelo = es_registro(b"MODEL ")
+    numeros = np.array(
+        [modelo_actual]
+        + [
+            int(bytes(buffer[inicios[i] + 6 : finales[i]]).split()[0])
+            for i in np.flatnonzero(es_modelo)
+        ],
+        dtype=np.int64,
+    )
+    modelos = numeros[np.cumsum(es_modelo)]
+
+    seleccion = np.zeros(len(inicios), dtype=bool)
+    for registro in registros:
+        seleccion |= es_registro(registro)
+
+    terminado = False
+    if modelo is not None:
+        seleccion &= modelos == modelo
+        # El modelo pedido ya se leyó completo: se descarta el resto del archivo
+        fin_modelo = np.flatnonzero(es_registro(b"ENDMDL") & (modelos == modelo))
+        if len(fin_modelo):
+            seleccion[fin_modelo[0] :] = False
+            terminado = True
+
+    filas = np.flatnonzero(seleccion)
+    if cadenas is not None:
+        codigos = [ord(cadena) for cadena in cadenas]
+        filas = filas[np.isin(columna(21, filas), codigos)]
+    if altlocs is not None:
+        codigos = [ord(altloc) if altloc else 32 for altloc in altlocs]
+        filas = filas[np.isin(columna(16, filas), codigos)]
+    if nombres_atomo is not None:
+        nombres = np.stack([columna(k, filas) for k in range(12, 16)], axis=1)
+        nombres = np.char.strip(np.ascontiguousarray(nombres).view("S4").ravel())
+        filas = filas[np.isin(nombres, [nombre.encode("ascii") for nombre in nombres_atomo])]
+
+    # Matriz de bytes (líneas x 80 columnas) de las líneas seleccionadas: filas de una vista
+    # de ventanas deslizantes sobre el bloque, sin matriz de índices; lo que queda después
+    # del fin de cada línea pasa a espacios
+    relleno = np.concatenate((buffer, np.full(ANCHO_LINEA, 32, dtype=np.uint8)))
+    ventanas = np.lib.stride_tricks.sliding_window_view(relleno, ANCHO_LINEA)
+    matriz = ventanas[inicios[filas]]
+    matriz[np.arange(ANCHO_LINEA) >= largos[filas, None]] = 32
+    matriz[matriz < 32] = 32
+    return matriz, modelos[filas], int(numeros[-1]), terminado
+
+
+# Conserva la primera ubicación alternativa de cada átomo (mismo modelo, cadena, residuo
+# y nombre), sin importar si su código es A, B u otro; los átomos sin altloc no cambian
+def _primera_ubicacion(atomos):
+    alternativos = np.flatnonzero(atomos["altloc"] != b"")
+    if not len(alternativos):
+        return atomos
+    claves = atomos[alternativos][["modelo", "cadena", "resnum", "icode", "nombre"]]
+    _, primeros = np.unique(claves, return_index=True)
+    descartar = np.ones(len(alternativos), dtype=bool)
+    descartar[primeros] = False
+    conservar = np.ones(len(atomos), dtype=bool)
+    conservar[alternativos[descartar]] = False
+    return atomos[conservar]
+
+
+# Convierte la matriz de bytes de las líneas seleccionadas a un arreglo estructurado
+def _parsear_matriz(matriz, modelos):
+    atomos = np.empty(len(matriz), dtype=DTYPE_ATOMOS)
+    atomos["modelo"] = modelos
+    atomos["hetatm"] = matriz[:, 0] == ord("H")
+    atomos["nombre"] = np.char.strip(_columna(matriz, 12, 16))
+    atomos["altloc"] = np.char.strip(_columna(matriz, 16, 17))
+    atomos["resname"] = np.char.strip(_columna(matriz, 17, 20))
+    atomos["cadena"] = _columna(matriz, 21, 22)
+    atomos["resnum"] = _columna(matriz, 22, 26).astype(np.int32)
+    atomos["icode"] = np.char.strip(_columna(matriz, 26, 27))
+    coords = np.ascontiguousarray(matriz[:, 30:54]).view("S8")
+    atomos["coord"] = coords.astype(np.float32)
+    atomos["ocupacion"] = _columna_float(matriz, 54, 60, 1.0)
+    atomos["bfactor"] = _columna_float(matriz, 60, 66, 0.0)
+    atomos["elemento"] = np.char.strip(_columna(matriz, 76, 78))
+    return atomos
+
+
+# Extrae columnas fijas de la matriz de bytes como arreglo de strings de NumPy
+def _columna(matriz, inicio, fin):
+    ancho = fin - inicio
+    return np.ascontiguousarray(matriz[:, inicio:fin]).view(f"S{ancho}").ravel()
+
+
+# Extrae una columna numérica opcional (vacía en algunos archivos)
+def _columna_float(matriz, inicio, fin, defecto):
+    texto = np.char.strip(_columna(matriz, inicio, fin))
+    valores = np.full(len(texto), defecto, dtype=np.float32)
+    presentes = texto != b""
+    valores[presentes] = texto[presentes].astype(np.float32)
+    return valores
+
+
+# Lista los IDs de cadena de un arreglo de átomos en orden de aparición
+# Entrada = arreglo estructurado con DTYPE_ATOMOS
+# Salida = lista de IDs de cadena (str)
+def cadenas_en_orden(atomos):
+    codigos, primeros = np.unique(atomos["cadena"], return_index=True)
+    return [codigos[i].decode("ascii") for i in np.argsort(primeros)]
@@ -1,10 +1,8 @@
 import re
-import requests
-import time
-import pandas as pd
-import requests
+from functools import partial
 
-from data.fetch_uniprot import buscar_pdb_uniprot
+from data import cliente_http
+from data.fetch_uniprot import buscar_pdb_uniprot, mapear_ids_uniprot
 
 
 # Verifica si el accession es de UniProt
@@ -22,48 +20,7 @@ def es_accession_uniprot(accession):
 # Salida = lista de IDs de UniProt correspondientes
 # Excepciones: Lanza RuntimeError si hay problemas de conexión o el mapeo
 def map_ncbi_to_uni(ncbi_id):
-    run_url = "https://rest.uniprot.org/idmapping/run"
-    params = {"from": "RefSeq_Protein", "to": "UniProtKB", "ids": ncbi_id}
-
-    try:
-        response = requests.post(run_url, data=params, timeout=30)
-        response.raise_for_status()
-        job_id = response.json()["jobId"]
-    except Exception as e:
-        raise RuntimeError(f"Error al enviar la solicitud de mapeo: {e}")
-
-    status_url = f"https://rest.uniprot.org/idmapping/status/{job_id}"
-
-    while True:
-        try:
-            time.sleep(3)
-            status_response = requests.get(status_url, timeout=30)
-            status_response.raise_for_status()
-            status_data = status_response.json()
-
-            if "jobStatus" in status_data:
-                job_status = status_data["jobStatus"]
-                if job_status == "FINISHED":
-                    break
-                elif job_status == "FAILED":
-                    raise RuntimeError("El mapeo falló.")
-            elif "results" in status_data:
-                break
-        except Exception as e:
-            raise RuntimeError(f"Error al verificar el estado del trabajo: {e}")
-
-    result_url = f"https://rest.uniprot.org/idmapping/results/{job_id}"
-
-    try:
-        result_response = requests.get(result_url, timeout=30)
-        result_response.raise_for_status()
-        results_data = result_response.json()
-    except Exception as e:
-        raise RuntimeError(f"Error al obtener los resultados: {e}")
-
-    uniprot_ids = [item["to"] for item in results_data.get("results", [])]
-
-    return uniprot_ids
+    return mapear_ids_uniprot([ncbi_id]).get(ncbi_id, [])
 
 
 # Formatea los resultados de PDB en una tabla usando pandas
@@ -77,6 +34,9 @@ def formatear_resultados_pdb(resultados):
     if not resultados:
         return "No se encontraron estructuras PDB"
 
+    # pandas se importa sólo al imprimir la tabla
+    import pandas as pd
+
     # Crear DataFrame con la nueva estructura
     df = pd.DataFrame(resultados)
 
@@ -99,10 +59,11 @@ def formatear_resultados_pdb(resultados):
 
 
 # Busca estructuras PDB asociadas a un accession
-# Entrada = accession de UniProt
+# Entrada = accession de UniProt, fuente ("auto": índice local de SIFTS si existe,
+#           "remota": referencias cruzadas de UniProt con método y resolución)
 # Salida = tabla con información detallada de PDBs encontrados
 
-def lista_pdb(accession):
+def lista_pdb(accession, fuente="auto"):
 
    #Resolver accession → lista de UniProt IDs
     if es_accession_uniprot(accession):
@@ -115,71 +76,22 @@ def lista_pdb(accession):
         except Exception as e:
             return f"Error durante el mapeo: {e}"
 
-    #Buscar PDBs para cada UniProt ID
+    #Buscar PDBs para cada UniProt ID (consultas concurrentes, resultados en orden)
     total_pdbs = []
-    for uid in uniprot_ids:
-        pdb_info = buscar_pdb_uniprot(uid)
-        if pdb_info:
+    for uid, pdb_info, error in cliente_http.ejecutar_concurrente(
+        partial(buscar_pdb_uniprot, fuente=fuente), uniprot_ids
+    ):
+        if error is not None:
+            print(f"Error al buscar PDBs para '{uid}': {error}")
+        elif pdb_info:
             total_pdbs.extend(pdb_info)
 
     if not total_pdbs:
         return f"No se encontraron estructuras PDB para el ID '{accession}' (UniProt: {', '.join(uniprot_ids)})"
 
     # Usar pandas para formatear y mostrar los resultados
-    tabla_formateada = formatear_resultados_pdb(pdb_info)
+    tabla_formateada = formatear_resultados_pdb(total_pdbs)
     print(f"\nEncontradas {len(total_pdbs)} estructuras PDB:")
     print("=" * 120)
     print(tabla_formateada)
     print("=" * 120)
-
-# Mapea un ID de NCBI a UniProt usando la API de UniProt
-# Entrada = ID de NCBI (RefSeq Protein)
-# Salida = lista de IDs de UniProt correspondientes
-# Excepciones: Lanza RuntimeError si hay problemas de conexión o el mapeo
-def map_ncbi_to_uni(ncbi_id):
-    run_url = "https://rest.uniprot.org/idmapping/run"
-    params = {
-        "from": "RefSeq_Protein",
-        "to": "UniProtKB",
-        "ids": ncbi_id
-    }
-
-    try:
-        response = requests.post(run_url, data=params, timeout=30)
-        response.raise_for_status()
-        job_id = response.json()["jobId"]
-    except Exception as e:
-        raise RuntimeError(f"Error al enviar la solicitud de mapeo: {e}")
-
-    status_url = f"https://rest.uniprot.org/idmapping/status/{job_id}"
-
-    while True:
-        try:
-            time.sleep(3)
-            status_response = requests.get(status_url, timeout=30)
-            status_response.raise_for_status()
-            status_data = status_response.json()
-
-            if "jobStatus" in status_data:
-                job_status = status_data["jobStatus"]
-                if job_status == "FINISHED":
-                    break
-                elif job_status == "FAILED":
-                    raise RuntimeError("El mapeo falló.")
-            elif "results" in status_data:
-                break
-        except Exception as e:
-            raise RuntimeError(f"Error al verificar el estado del trabajo: {e}")
-
-    result_url = f"https://rest.uniprot.org/idmapping/results/{job_id}"
-
-    try:
-        result_response = requests.get(result_url, timeout=30)
-        result_response.raise_for_status()
-        results_data = result_response.json()
-    except Exception as e:
-        raise RuntimeError(f"Error al obtener los resultados: {e}")
-
-    uniprot_ids = [item["to"] for item in results_data.get("results", [])]
-
-    return uniprot_ids
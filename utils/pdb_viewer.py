@@ -1,77 +1,175 @@
+import base64
+import gzip
+import inspect
+import json
 import os
 import random
 import re
 import shutil
-import time
+import uuid
 import webbrowser
-from io import StringIO
+from functools import partial
+from io import BytesIO
 
 import pandas as pd
 import py3Dmol
-import requests
 from matplotlib.colors import CSS4_COLORS
 
+from data import cache_respuestas, cliente_http
+from data.cache_pdb import DIRECTORIO_CACHE, escribir_atomico
+from data.fetch_pdb import descargar_pdb
+from data.fetch_uniprot import PATRON_LINK_SIGUIENTE
+from utils import almacen_ca
+from utils.indice_features import IndiceFeatures
+from utils.opciones_cli import REPRESENTACIONES
+from utils import numeracion_sifts
 from utils import rmsd_analysis as rmsd
 
 URL_Uniprot = "https://rest.uniprot.org/uniprotkb/search"
 
+# 3Dmol.js de la versión que usa py3Dmol; se descarga una vez a la cache y se copia
+# a cada carpeta de reportes para que todos los HTML compartan el mismo archivo
+URL_3DMOL = inspect.signature(py3Dmol.view).parameters["js"].default
+NOMBRE_3DMOL = "3Dmol-min.js"
+
+# Sobre esta cantidad de átomos, la representación "auto" embebe sólo la traza de CA
+MAX_ATOMOS_COMPLETO = int(os.environ.get("BBDD_VISOR_MAX_ATOMOS", "150000"))
+
 
 class API_Uniprot_rest:
     """
     Cliente para la REST API moderna de UniProt u otras como UniRef.
-    Devuelve resultados en formato TSV como pandas.DataFrame.
+    Devuelve resultados en formato TSV como pandas.DataFrame, página a página
+    (generadores) o volcados por bloques a un archivo CSV/Parquet.
+    Las peticiones se espacian con una cubeta de tokens (cliente_http.LimitadorTasa).
     """
 
-    def __init__(self, parametros, base_url, timeout=30, cursor=None):
+    def __init__(
+        self,
+        parametros,
+        base_url,
+        timeout=30,
+        cursor=None,
+        tasa=1.0,
+        rafaga=1,
+        cache=None,
+    ):
         self.parametros = parametros
         self.base_url = base_url
         self.timeout = timeout
+        self.limitador = cliente_http.LimitadorTasa(tasa, rafaga)
+        # Fuente de data.cache_respuestas para guardar las páginas (None = sin cache)
+        self.cache = cache
 
     def _conseguir_pagina(self, url, parametros):
         """
         Realiza la petición HTTP a UniProt  y retorna el DataFrame de la página y el link next (o None).
         """
-        # Peticion:
-        response = requests.get(url, params=parametros, timeout=self.timeout)
+        # Peticion (espera sólo si se agotó la cubeta de tokens; la cache espera sólo
+        # antes de una petición real, no si la página sale de la copia local):
+        if self.cache:
+            response = cache_respuestas.get(
+                url,
+                self.cache,
+                params=parametros,
+                limitador=self.limitador,
+                timeout=self.timeout,
+            )
+        else:
+            self.limitador.esperar()
+            response = cliente_http.get(url, params=parametros, timeout=self.timeout)
         response.raise_for_status()
         # Leer TSV:
-        df = pd.read_csv(StringIO(response.content.decode("utf-8")), sep="\t", header=0)
+        if response.content.strip():
+            df = pd.read_csv(BytesIO(response.content), sep="\t", header=0)
+        else:
+            df = pd.DataFrame()
         # Extraer enlace "siguiente" de encabezado Link
-        siguiente_link = None
-        link_header = response.headers.get("Link", "")
-        # Updated regex pattern to extract the URL with the scheme
-        pattern = re.compile(r'<([^>]+)>;\s*rel="next"')
-        match = pattern.search(link_header)
-        if match:
-            siguiente_link = match.group(1)
+        match = PATRON_LINK_SIGUIENTE.search(response.headers.get("Link", ""))
+        siguiente_link = match.group(1) if match else None
 
         return df, siguiente_link
 
-    def data_de_paginacion_tsv(self, delay):
+    def paginas_tsv(self):
         """
-        Similar a response_data pero paginable, utilizando la funcion anterior.
-        Retorna un DataFrame con los datos obtenidos en batch de la paginacion.
+        Generador de páginas: entrega el DataFrame de cada página a medida que llega.
         Requiere que en parametros se solicite los datos en .tsv
         """
         # Preparar primera petición
         url_actual = self.base_url
         parametros = self.parametros.copy()
 
-        paginas = []  # Para guardar de cada pagina
-
-        while True:
-            time.sleep(delay)
+        while url_actual:
             df, siguiente_link = self._conseguir_pagina(url_actual, parametros)
             if df.empty:
-                break
-            paginas.append(df)  # Guardar la página
-            if siguiente_link is None:
-                break
-            # Preparar siguiente iteración: usar URL completa en next_link
+                return
+            yield df
+            # Siguiente iteración: la URL completa del link next ya trae los parámetros
             url_actual = siguiente_link
-            # Vaciar params para que requests use URL tal cual
             parametros = None
 
+    def filas_tsv(self):
+        """
+        Generador de filas (diccionarios columna -> valor) de todas las páginas.
+        """
+        for df in self.paginas_tsv():
+            yield from df.to_dict("records")
+
+    def guardar_paginacion(self, ruta, formato=None):
+        """
+        Vuelca todas las páginas a un archivo CSV o Parquet a medida que llegan,
+        con memoria constante (una página a la vez).
+        Parquet requiere pyarrow; el formato se deduce de la extensión si no se indica.
+        Retorna la ruta y la cantidad de filas escritas.
+        """
+        if formato is None:
+            formato = "parquet" if ruta.endswith(".parquet") else "csv"
+        if formato not in ("csv", "parquet"):
+            raise ValueError(f"Formato no válido: {formato} (csv o parquet)")
+
+        carpeta = os.path.dirname(ruta)
+        if carpeta:
+            os.makedirs(carpeta, exist_ok=True)
+
+        filas = 0
+        if formato == "csv":
+            with open(ruta, "w", encoding="utf-8", newline="") as f:
+                for df in self.paginas_tsv():
+                    df.to_csv(f, index=False, header=filas == 0)
+                    filas += len(df)
+            return ruta, filas
+
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("La salida Parquet requiere pyarrow (pip install pyarrow)")
+
+        escritor = None
+        try:
+            for df in self.paginas_tsv():
+                # Todas las columnas como texto: el esquema no cambia entre páginas
+                tabla = pa.Table.from_pandas(df.astype("string"), preserve_index=False)
+                if escritor is None:
+                    escritor = pq.ParquetWriter(ruta, tabla.schema, compression="zstd")
+                escritor.write_table(tabla)
+                filas += len(df)
+        finally:
+            if escritor is not None:
+                escritor.close()
+
+        return ruta, filas
+
+    def data_de_paginacion_tsv(self, delay=None):
+        """
+        Similar a response_data pero paginable, utilizando la funcion anterior.
+        Retorna un DataFrame con los datos obtenidos en batch de la paginacion.
+        delay (opcional) = segundos mínimos entre peticiones (tasa = 1 / delay).
+        Requiere que en parametros se solicite los datos en .tsv
+        """
+        if delay:
+            self.limitador = cliente_http.LimitadorTasa(1 / delay)
+        paginas = list(self.paginas_tsv())
         # Concatenamos todo en un solo DataFrame (si hubo al menos una página)
         return pd.concat(paginas, ignore_index=True) if paginas else pd.DataFrame()
 
@@ -82,11 +180,34 @@ class PDB_Viewer:
     Tiene métodos para gráficar a la proteína y sus features coloreandolos de forma particular.
     """
 
-    def __init__(self, codigo_pdb, dominios=None, regiones=None):
+    def __init__(
+        self,
+        codigo_pdb,
+        dominios=None,
+        regiones=None,
+        buscar_features=True,
+        representacion="auto",
+        comprimir=False,
+    ):
+        if representacion not in REPRESENTACIONES:
+            raise ValueError(
+                f"Representación no válida: {representacion} ({', '.join(REPRESENTACIONES)})"
+            )
         self.codigo_pdb = codigo_pdb
+        # Estructura embebida en el HTML desde el almacén local (ver agregar_estructura)
+        self.representacion = representacion
+        self.comprimir = comprimir
         self.features = None  # DataFrame con features
         self.dominios = dominios  # Diccionario con dominios
         self.regiones = regiones  # Diccionario con regiones
+        self.indice_features = None  # Índice de intervalos (construir_indice_features)
+        self.accession = None  # Accession de UniProt de las features
+        self._mapa = None  # Mapa UniProt <-> PDB por residuo (mapa_numeracion)
+        self._modelos_comprimidos = {}  # Marca -> PDB en gzip + base64 de la vista actual
+
+        # Sin búsqueda de features (p. ej. vistas simples en lote)
+        if not buscar_features:
+            return
 
         # Ejecución automática una vez inicializada la clase.
         # Intentar buscar features, y validar PDB
@@ -98,6 +219,7 @@ class PDB_Viewer:
         # Verificar que se obtuvieron features
         if self.features is None or self.features.empty:
             raise ValueError(f"No se encontraron datos para el PDB: {codigo_pdb}")
+        self.accession = self.features.iloc[0].get("Entry")
 
         # Obtener dominios y regiones, con mensajes si no existen
         try:
@@ -124,7 +246,7 @@ class PDB_Viewer:
             "format": "tsv",
             "fields": "accession,id,gene_primary,ft_domain,ft_region",
         }
-        busquedaUniprot = API_Uniprot_rest(parametros, URL_Uniprot)
+        busquedaUniprot = API_Uniprot_rest(parametros, URL_Uniprot, cache="uniprot")
         df_pdb = busquedaUniprot.data_de_paginacion_tsv(1)
         self.features = df_pdb
         return df_pdb
@@ -155,6 +277,61 @@ class PDB_Viewer:
         self.regiones = regiones
         return regiones
 
+    def mapa_numeracion(self):
+        """
+        Retorna el mapa por residuo UniProt <-> PDB de la estructura (utils.numeracion_sifts),
+        o None si no se pudo obtener: las features se pintan entonces con la numeración
+        de UniProt tal cual.
+        """
+        if self._mapa is None:
+            try:
+                self._mapa = numeracion_sifts.obtener_mapa(self.codigo_pdb)
+            except Exception as e:
+                print(
+                    f"Advertencia: sin mapeo SIFTS para {self.codigo_pdb} ({e}); "
+                    "se usa la numeración de UniProt."
+                )
+                self._mapa = False
+        return self._mapa or None
+
+    def cadenas_mapeadas(self):
+        """Retorna el mapa de numeración y las cadenas mapeadas al accession de las features."""
+        mapa = self.mapa_numeracion() if self.accession else None
+        if mapa is None:
+            return None, []
+        return mapa, mapa.cadenas(self.accession)
+
+    def construir_indice_features(self, feature=None):
+        """
+        Construye el índice de intervalos (utils.indice_features) con dominios, regiones y
+        la feature personalizada opcional (color, inicio, fin, nombre), asignando un color
+        aleatorio a las que no tienen. El orden de inserción define qué color prevalece.
+        """
+        indice = IndiceFeatures()
+        indice.agregar_lista(self.dominios, "dominio")
+        indice.agregar_lista(self.regiones, "region")
+        if feature:
+            color, inicio, fin, nombre = feature
+            indice.agregar(inicio, fin, nombre, "personal", color)
+        for f in indice.features:
+            if f["color"] is None:
+                f["color"] = self.random_color()
+        self.indice_features = indice
+        return indice
+
+    def leyenda_features(self, indice, tipo):
+        """Retorna la leyenda (nota, inicio, fin, color, colorNombre) de las features de un tipo."""
+        return [
+            (
+                f["note"],
+                f["inicio"],
+                f["final"],
+                f["color"],
+                self.nombre_color_masCercano(f["color"]),
+            )
+            for f in indice.seleccionar(tipos=(tipo,))
+        ]
+
     def nombre_color_masCercano(self, color_hex):
         """Devuelve el nombre del color CSS más cercano al color dado en formato #RRGGBB."""
 
@@ -182,15 +359,26 @@ class PDB_Viewer:
         if color == None:
             color = self.random_color()
 
-        residuo = list(range(inicio, fin + 1))
-        view3Dmol.addStyle({"resi": residuo}, {"cartoon": {"color": color}})
+        # Rango "inicio-fin" en lugar de la lista de todos los residuos, traducido a la
+        # numeración de cada cadena mapeada por SIFTS
+        mapa, cadenas = self.cadenas_mapeadas()
+        if cadenas:
+            for cadena in cadenas:
+                residuos = mapa.rangos_a_pdb(cadena, [inicio], [fin], self.accession)[0]
+                if residuos:
+                    view3Dmol.addStyle(
+                        {"chain": cadena, "resi": residuos}, {"cartoon": {"color": color}}
+                    )
+        else:
+            view3Dmol.addStyle({"resi": f"{inicio}-{fin}"}, {"cartoon": {"color": color}})
         colorNombre = self.nombre_color_masCercano(color)
         leyenda = (nota, inicio, fin, color, colorNombre)
 
         return leyenda
 
-    def mostrar_pdb_desde_id(self, cadena_id=None):
-        view = py3Dmol.view(query="pdb:" + self.codigo_pdb)
+    def mostrar_pdb_desde_id(self, cadena_id=None, carpeta="graficos", abrir=True):
+        view = self.crear_vista(carpeta)
+        self.agregar_estructura(view, cadena_id)
 
         if cadena_id:
             view.setStyle({"chain": cadena_id}, {"cartoon": {"color": "spectrum"}})
@@ -198,9 +386,7 @@ class PDB_Viewer:
             view.setStyle({"cartoon": {"color": "spectrum"}})
 
         view.zoomTo()
-        html = view._make_html()
-        match = re.search(r"<body>(.*?)</body>", html, flags=re.DOTALL)
-        cuerpo = match.group(1) if match else html
+        cuerpo = self.cuerpo_vista(view)
 
         if cadena_id:
             titulo = f"Estructura Simple de {self.codigo_pdb} - Cadena {cadena_id}"
@@ -211,52 +397,45 @@ class PDB_Viewer:
             titulo, cuerpo, None, None, None, None
         )
 
-        # Guardar y abrir
+        # Guardar y abrir (abrir=False en modo sin navegador)
         html_nombre = f"{titulo}-{cadena_id}-pdb.html"
-        carpeta = "graficos"
-        os.makedirs(carpeta, exist_ok=True)
-        ruta_completa = os.path.join(carpeta, html_nombre)
-        with open(ruta_completa, "w", encoding="utf-8") as f:
-            f.write(html_completo)
-        abrir_en_navegador(ruta_completa)
-        print(f"{html_nombre} guardado en '{ruta_completa}' y abierto exitosamente.")
-
-    def mostrar_pdb_domains_regiones(self, feature=None):
-        # Genera la vista
-        view = py3Dmol.view(query="pdb:" + self.codigo_pdb)
-        view.setStyle({"cartoon": {"color": "lightgrey"}})
-
-        leyenda_dominios, leyenda_regiones, leyenda_feature_personal = [], [], []
-        # Dominios
-        if self.dominios:
-            for dominio in self.dominios:
-                leyenda_dominios.append(
-                    self.pintar_feature(
-                        view, None, dominio["inicio"], dominio["final"], dominio["note"]
-                    )
-                )
+        return self.guardar_html(html_nombre, html_completo, carpeta, abrir)
 
-        # Regiones
-        if self.regiones:
-            for region in self.regiones:
-                leyenda_regiones.append(
-                    self.pintar_feature(
-                        view, None, region["inicio"], region["final"], region["note"]
-                    )
-                )
+    def mostrar_pdb_domains_regiones(
+        self, feature=None, carpeta="graficos", abrir=True, cadena_id=None
+    ):
+        # Genera la vista (sólo la cadena pedida si se indica una)
+        view = self.crear_vista(carpeta)
+        self.agregar_estructura(view, cadena_id)
+        if cadena_id:
+            view.setStyle({"chain": cadena_id}, {"cartoon": {"color": "lightgrey"}})
+        else:
+            view.setStyle({"cartoon": {"color": "lightgrey"}})
 
-        if feature:
-            color, inicio, fin, nombre = feature
-            leyenda_feature_personal.append(
-                self.pintar_feature(view, color, inicio, fin, nombre)
+        # Un solo addStyle por color, con los solapamientos ya resueltos por el índice
+        indice = self.construir_indice_features(feature)
+        # Las features están en numeración de UniProt: se traducen por cadena con SIFTS
+        mapa, cadenas = self.cadenas_mapeadas()
+        if cadena_id:
+            cadenas = [cadena for cadena in cadenas if cadena == cadena_id]
+        for cadena in cadenas:
+            indice.aplicar_estilos(
+                view,
+                {"chain": cadena},
+                traducir=partial(mapa.rangos_a_pdb, cadena, accession=self.accession),
             )
+        if not cadenas:
+            indice.aplicar_estilos(view, {"chain": cadena_id} if cadena_id else None)
+        leyenda_dominios = self.leyenda_features(indice, "dominio")
+        leyenda_regiones = self.leyenda_features(indice, "region")
+        leyenda_feature_personal = self.leyenda_features(indice, "personal")
 
         view.zoomTo()
-        html = view._make_html()
-        match = re.search(r"<body>(.*?)</body>", html, flags=re.DOTALL)
-        cuerpo = match.group(1) if match else html
+        cuerpo = self.cuerpo_vista(view)
 
         titulo = f"Estructura Con Features de {self.codigo_pdb}"
+        if cadena_id:
+            titulo += f" - Cadena {cadena_id}"
 
         html_completo = self.generar_html_completo(
             titulo,
@@ -267,22 +446,27 @@ class PDB_Viewer:
             None,
         )
 
-        # Guardar y abrir
+        # Guardar y abrir (abrir=False en modo sin navegador)
         html_nombre = f"{titulo}_pdb.html"
-        carpeta = "graficos"
-        os.makedirs(carpeta, exist_ok=True)
-        ruta_completa = os.path.join(carpeta, html_nombre)
-        with open(ruta_completa, "w", encoding="utf-8") as f:
-            f.write(html_completo)
-        abrir_en_navegador(ruta_completa)
-        print(f"{html_nombre} guardado en '{ruta_completa}' y abierto exitosamente.")
+        return self.guardar_html(html_nombre, html_completo, carpeta, abrir)
 
     def mostrar_alineamiento_pdb(
-        self, otro_codigo_pdb, cadena_id=None, colores=None, ventana=50
+        self,
+        otro_codigo_pdb,
+        cadena_id=None,
+        colores=None,
+        ventana=50,
+        carpeta="graficos",
+        abrir=True,
     ):
         # Generar el PDB de alineamiento
-        estructura_self = rmsd.cargar_estructura(rmsd.descargar_pdb(self.codigo_pdb))
-        estructura_otro = rmsd.cargar_estructura(rmsd.descargar_pdb(otro_codigo_pdb))
+        # Carga diferida: sólo se parsea la cadena alineada
+        estructura_self = rmsd.cargar_estructura(
+            rmsd.descargar_pdb(self.codigo_pdb), diferida=True
+        )
+        estructura_otro = rmsd.cargar_estructura(
+            rmsd.descargar_pdb(otro_codigo_pdb), diferida=True
+        )
 
         # Si no se especifica cadena se obtiene la primer cadena en comun
         if cadena_id is None:
@@ -290,14 +474,15 @@ class PDB_Viewer:
                 estructura_self, estructura_otro, cadena_id, cadena_id
             )[0]
 
-        ca = rmsd.conseguir_atomos_CA(estructura_self, cadena_id)
-        ca = rmsd.conseguir_atomos_CA(estructura_otro, cadena_id)
+        # Coordenadas CA desde el almacén binario (sin recorrer la estructura)
+        ca_self = almacen_ca.obtener_cadena(self.codigo_pdb, cadena_id)
+        ca_otro = almacen_ca.obtener_cadena(otro_codigo_pdb, cadena_id)
 
         alineamiento = rmsd.alinear_estructuras(
-            estructura_self, estructura_otro, cadena_id
+            estructura_self, estructura_otro, cadena_id, cadenas_ca=(ca_self, ca_otro)
         )
         posiciones_rmsd, rmsd_local = rmsd.calcular_rmsd_local(
-            estructura_self, estructura_otro, cadena_id, cadena_id, ventana
+            ca_self, ca_otro, cadena_id, cadena_id, ventana, (self.codigo_pdb, otro_codigo_pdb)
         )
         ruta_grafico = rmsd.generar_y_guardar_grafico(
             posiciones_rmsd,
@@ -307,6 +492,7 @@ class PDB_Viewer:
             cadena_id,
             cadena_id,
             ventana,
+            carpeta=carpeta,
         )
 
         estructura_self_str = rmsd.estructura_PDB_a_str(estructura_self, cadena_id)
@@ -319,16 +505,14 @@ class PDB_Viewer:
         color_ref = colores[0]
         color_otro = colores[1]
 
-        view = py3Dmol.view(width=800, height=600)
+        view = self.crear_vista(carpeta, width=800, height=600)
         view.addModel(estructura_self_str, "pdb")
         view.setStyle({"model": 0}, {"cartoon": {"color": f"{color_ref}"}})
         view.addModel(estructura_otro_str, "pdb")
         view.setStyle({"model": 1}, {"cartoon": {"color": f"{color_otro}"}})
         view.zoomTo()
 
-        html = view._make_html()
-        match = re.search(r"<body>(.*?)</body>", html, flags=re.DOTALL)
-        cuerpo = match.group(1) if match else html
+        cuerpo = self.cuerpo_vista(view)
 
         nombre_alineamiento = f"Alineamiento {self.codigo_pdb} - {otro_codigo_pdb} - Cadena: {cadena_id} - RMSD Global: {alineamiento:.2f} Å"
 
@@ -345,18 +529,74 @@ class PDB_Viewer:
             ruta_grafico,  # Porque alineamiento_grafico tiene la ruta, posiciones_values, rmsd_values
         )
 
-        # Guardar y abrir
+        # Guardar y abrir (abrir=False en modo sin navegador)
         nombre_archivo = (
             f"Alineamiento {self.codigo_pdb} - {otro_codigo_pdb} - Cadena: {cadena_id}"
         )
         html_nombre = f"{nombre_archivo}_pdb.html"
-        carpeta = "graficos"
+        return self.guardar_html(html_nombre, html_completo, carpeta, abrir)
+
+    def crear_vista(self, carpeta, **kwargs):
+        """
+        Crea la vista de py3Dmol cargando 3Dmol.js desde la copia compartida de la carpeta
+        de reportes (o desde el CDN si no se pudo obtener).
+        """
+        self._modelos_comprimidos = {}
+        return py3Dmol.view(js=preparar_3dmol(carpeta), **kwargs)
+
+    def cuerpo_vista(self, view3Dmol):
+        """
+        Retorna el HTML de la vista (contenido del <body>) para embeber en el reporte, con
+        los modelos comprimidos de agregar_estructura ya resueltos.
+        """
+        html = view3Dmol._make_html()
+        match = re.search(r"<body>(.*?)</body>", html, flags=re.DOTALL)
+        cuerpo = match.group(1) if match else html
+        return envolver_modelos_comprimidos(cuerpo, self._modelos_comprimidos)
+
+    def agregar_estructura(self, view3Dmol, cadena_id=None):
+        """
+        Embebe la estructura del almacén local (data.cache_pdb) en la vista, en lugar de
+        que el navegador la descargue de RCSB al abrir el reporte.
+        Representación: "completa", "cadena" (sólo la cadena pedida), "ca" (traza de CA)
+        o "auto" (completa, o traza de CA si supera MAX_ATOMOS_COMPLETO átomos).
+        Con comprimir=True el PDB va en gzip + base64 y se descomprime en el navegador.
+        """
+        ruta = descargar_pdb(self.codigo_pdb)
+        with open(ruta, "r", encoding="utf-8", errors="replace") as f:
+            texto = f.read()
+
+        representacion = self.representacion
+        if representacion == "auto":
+            atomos = texto.count("\nATOM  ") + texto.count("\nHETATM")
+            representacion = "ca" if atomos > MAX_ATOMOS_COMPLETO else "completa"
+        if representacion != "completa":
+            texto = recortar_pdb(
+                texto,
+                cadena_id if representacion == "cadena" else None,
+                solo_ca=representacion == "ca",
+            )
+
+        if self.comprimir:
+            marca, datos = agregar_modelo_comprimido(view3Dmol, texto)
+            self._modelos_comprimidos[marca] = datos
+        else:
+            view3Dmol.addModel(texto, "pdb")
+        return representacion
+
+    def guardar_html(self, html_nombre, html_completo, carpeta="graficos", abrir=True):
+        """
+        Guarda el HTML en la carpeta y, si abrir es True, lo abre en el navegador.
+        Retorna la ruta del archivo.
+        """
         os.makedirs(carpeta, exist_ok=True)
         ruta_completa = os.path.join(carpeta, html_nombre)
         with open(ruta_completa, "w", encoding="utf-8") as f:
             f.write(html_completo)
-        abrir_en_navegador(ruta_completa)
-        print(f"{html_nombre} guardado en '{ruta_completa}' y abierto exitosamente.")
+        if abrir:
+            abrir_en_navegador(ruta_completa)
+            print(f"{html_nombre} guardado en '{ruta_completa}' y abierto exitosamente.")
+        return ruta_completa
 
     def generar_html_completo(
         self,
@@ -467,7 +707,107 @@ class PDB_Viewer:
         return html
 
 
+# Deja una copia de 3Dmol.js en la carpeta de reportes (una sola por carpeta)
+# La primera vez se descarga a la cache local; sin conexión se usa la URL del CDN
+# Entrada = carpeta de reportes
+# Salida = ruta relativa del script (o URL del CDN)
+def preparar_3dmol(carpeta):
+    destino = os.path.join(carpeta, NOMBRE_3DMOL)
+    if os.path.exists(destino):
+        return NOMBRE_3DMOL
+
+    origen = os.path.join(DIRECTORIO_CACHE, "assets", NOMBRE_3DMOL)
+    try:
+        if not os.path.exists(origen):
+            response = cliente_http.get(URL_3DMOL, timeout=60)
+            response.raise_for_status()
+            escribir_atomico(origen, response.content)
+        with open(origen, "rb") as f:
+            escribir_atomico(destino, f.read())
+        return NOMBRE_3DMOL
+    except Exception as e:
+        print(f"Advertencia: no se pudo preparar 3Dmol.js local ({e}); se usará el CDN.")
+        return URL_3DMOL
+
+
+# Recorta un PDB en texto para embeberlo en un reporte
+# Se conserva sólo el primer modelo y, opcionalmente, una cadena y/o sólo los CA
+# Entrada = texto PDB, cadena (None = todas), solo_ca
+# Salida = texto PDB recortado
+def recortar_pdb(texto, cadena=None, solo_ca=False):
+    lineas = []
+    for linea in texto.splitlines():
+        registro = linea[:6]
+        if registro == "ENDMDL":
+            break
+        if registro not in ("ATOM  ", "HETATM"):
+            continue
+        if cadena and linea[21:22] != cadena:
+            continue
+        if solo_ca and (registro != "ATOM  " or linea[12:16] != " CA "):
+            continue
+        lineas.append(linea)
+    lineas.append("END")
+    return "\n".join(lineas) + "\n"
+
+
+# Agrega un modelo PDB comprimido (gzip + base64) a la vista
+# La vista recibe una marca en lugar del texto (addModel de la API pública de py3Dmol);
+# envolver_modelos_comprimidos() la cambia en el HTML por el texto descomprimido
+# Entrada = vista de py3Dmol, texto PDB
+# Salida = marca y PDB en gzip + base64
+def agregar_modelo_comprimido(view3Dmol, texto):
+    marca = f"modelo_comprimido_{uuid.uuid4().hex}"
+    view3Dmol.addModel(marca, "pdb")
+    datos = base64.b64encode(gzip.compress(texto.encode("utf-8"), 9)).decode("ascii")
+    return marca, datos
+
+
+# Resuelve los modelos comprimidos de una vista
+# La vista queda en un <template> (inerte) y un script propio la inserta en la página
+# recién cuando el navegador terminó de descomprimir los modelos con DecompressionStream;
+# cada marca pasa a leer el texto descomprimido de window.modelos_pdb
+# Entrada = cuerpo HTML de la vista, diccionario {marca: PDB en gzip + base64}
+# Salida = cuerpo HTML
+def envolver_modelos_comprimidos(cuerpo, modelos):
+    if not modelos:
+        return cuerpo
+    for marca in modelos:
+        if json.dumps(marca) not in cuerpo:
+            raise ValueError(f"La vista no contiene el modelo comprimido {marca}")
+        cuerpo = cuerpo.replace(json.dumps(marca), f"window.modelos_pdb[{json.dumps(marca)}]")
+    plantilla = f"vista_{uuid.uuid4().hex}"
+    descompresiones = ",\n".join(
+        f"    descomprimir({json.dumps(marca)}, {json.dumps(datos)})"
+        for marca, datos in modelos.items()
+    )
+    return f"""<template id="{plantilla}">{cuerpo}</template>
+<script>
+(function() {{
+  window.modelos_pdb = window.modelos_pdb || {{}};
+  function descomprimir(marca, datos) {{
+    var bytes = Uint8Array.from(atob(datos), function(c) {{ return c.charCodeAt(0); }});
+    var flujo = new Blob([bytes]).stream().pipeThrough(new DecompressionStream("gzip"));
+    return new Response(flujo).text().then(function(texto) {{
+      window.modelos_pdb[marca] = texto;
+    }});
+  }}
+  Promise.all([
+{descompresiones}
+  ]).then(function() {{
+    var plantilla = document.getElementById("{plantilla}");
+    plantilla.replaceWith(document.importNode(plantilla.content, true));
+  }});
+}})();
+</script>
+"""
+
+
 def abrir_en_navegador(html_file):
+    # Modo sin navegador (renderizado en lote o entornos sin pantalla)
+    if os.environ.get("BBDD_SIN_NAVEGADOR", "") not in ("", "0"):
+        return
+
     ruta_absoluta = os.path.abspath(html_file)
     url = f"file://{ruta_absoluta}"
 
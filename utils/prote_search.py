@@ -1,9 +1,11 @@
+import os
 import re  # re es una libreria para evaluar expreciones regulares
+import time
 
-import pandas as pd
-
+from data import indice_uniprot
 from data.fetch_ncbi import buscar_acn_ncbi
-from data.fetch_uniprot import buscar_id_uniprot, buscar_uniprot
+from data.fetch_uniprot import buscar_id_uniprot, buscar_uniprot, buscar_uniprot_stream
+from utils.salida_filas import escribir_filas
 
 
 # identifica si el texto es un id de uniprot utilizando re y las expresiones de los id de uniprot
@@ -25,6 +27,42 @@ def es_id_ncbi(texto):
     return bool(re.fullmatch(r"^(NP|XP|YP|WP|ZP|AP)_\d{6,9}(\.\d+)?$", texto))
 
 
+# Extrae los datos principales de un resultado de UniProt
+# Entrada = resultado de UniProt (diccionario JSON)
+# Salida = diccionario con accession, ID, nombre, organismo y longitud
+def extraer_datos_uniprot(result):
+    accession = result.get("primaryAccession", "N/A")
+    protein_id = result.get("uniProtkbId", "N/A")
+
+    # Extraer nombre de proteína
+    protein_name = "N/A"
+    protein_desc = result.get("proteinDescription", {})
+    if "recommendedName" in protein_desc:
+        protein_name = (
+            protein_desc["recommendedName"].get("fullName", {}).get("value", "N/A")
+        )
+    elif "submissionNames" in protein_desc and protein_desc["submissionNames"]:
+        protein_name = (
+            protein_desc["submissionNames"][0]
+            .get("fullName", {})
+            .get("value", "N/A")
+        )
+
+    # Extraer organismo
+    organism = result.get("organism", {}).get("scientificName", "N/A")
+
+    # Extraer longitud
+    length = result.get("sequence", {}).get("length", "N/A")
+
+    return {
+        "Accession": accession,
+        "ID": protein_id,
+        "Nombre de Proteína": protein_name,
+        "Organismo": organism,
+        "Longitud": length,
+    }
+
+
 # Formatea los resultados de UniProt en una tabla usando pandas
 # Entrada = datos de UniProt
 # Salida = tabla con información de la proteína
@@ -34,42 +72,13 @@ def formatear_resultados_uniprot(data):
         return "No se encontraron resultados"
 
     # Preparar datos
-    datos = []
+    datos = [
+        {"#": i, **extraer_datos_uniprot(result)}
+        for i, result in enumerate(data["results"][:10], 1)
+    ]
 
-    for i, result in enumerate(data["results"][:10], 1):
-        accession = result.get("primaryAccession", "N/A")
-        protein_id = result.get("uniProtkbId", "N/A")
-
-        # Extraer nombre de proteína
-        protein_name = "N/A"
-        protein_desc = result.get("proteinDescription", {})
-        if "recommendedName" in protein_desc:
-            protein_name = (
-                protein_desc["recommendedName"].get("fullName", {}).get("value", "N/A")
-            )
-        elif "submissionNames" in protein_desc and protein_desc["submissionNames"]:
-            protein_name = (
-                protein_desc["submissionNames"][0]
-                .get("fullName", {})
-                .get("value", "N/A")
-            )
-
-        # Extraer organismo
-        organism = result.get("organism", {}).get("scientificName", "N/A")
-
-        # Extraer longitud
-        length = result.get("sequence", {}).get("length", "N/A")
-
-        datos.append(
-            {
-                "#": i,
-                "Accession": accession,
-                "ID": protein_id,
-                "Nombre de Proteína": protein_name,
-                "Organismo": organism,
-                "Longitud": length,
-            }
-        )
+    # pandas se importa sólo al imprimir la tabla (no en las búsquedas masivas)
+    import pandas as pd
 
     # Crear DataFrame y formatear
     df = pd.DataFrame(datos)
@@ -136,6 +145,9 @@ def formatear_resultados_ncbi(data):
         }
     )
 
+    # pandas se importa sólo al imprimir la tabla (no en las búsquedas masivas)
+    import pandas as pd
+
     # Crear DataFrame y formatear
     df = pd.DataFrame(datos)
 
@@ -148,9 +160,23 @@ def formatear_resultados_ncbi(data):
 
 
 # Busca información de una proteína por su ID
-# Entrada = ID de UniProt, NCBI o texto descriptivo
+# Entrada = ID de UniProt, NCBI o texto descriptivo, fuente:
+#           "auto" (índice local primero, UniProt si no hay resultados), "local" o "remota"
 # Salida = tabla con información de la proteína
-def buscar(prompt):
+def buscar(prompt, fuente="auto"):
+    if fuente not in ("auto", "local", "remota"):
+        return f"Error: Fuente '{fuente}' no válida (auto, local o remota)"
+
+    # Los IDs de NCBI no están en el índice local de UniProt
+    if fuente != "remota" and not es_id_ncbi(prompt):
+        if indice_uniprot.existe():
+            resultado = indice_uniprot.buscar_local(prompt)
+            if resultado["results"]:
+                print(f"Resultados del índice local ({resultado['milisegundos']:.1f} ms)")
+                return formatear_resultados_uniprot(resultado)
+        if fuente == "local":
+            return "No se encontraron resultados en el índice local"
+
     if es_id_uniprot(prompt):
         resultado = buscar_id_uniprot(prompt)
         if isinstance(resultado, dict) and "error" not in resultado:
@@ -171,3 +197,62 @@ def buscar(prompt):
             return formatear_resultados_uniprot(resultado)
         else:
             return resultado
+
+
+# Columnas de los archivos de búsqueda masiva
+COLUMNAS_MASIVO = [
+    ("accession", "str"),
+    ("id", "str"),
+    ("nombre", "str"),
+    ("organismo", "str"),
+    ("organismo_id", "int"),
+    ("longitud", "int"),
+    ("secuencia", "str"),
+]
+
+
+# Convierte un resultado de UniProt en una fila plana para los archivos de búsqueda masiva
+def _fila_masiva(result):
+    datos = extraer_datos_uniprot(result)
+    organismo = result.get("organism", {})
+    secuencia = result.get("sequence", {})
+    return {
+        "accession": datos["Accession"],
+        "id": datos["ID"],
+        "nombre": datos["Nombre de Proteína"],
+        "organismo": datos["Organismo"],
+        "organismo_id": organismo.get("taxonId"),
+        "longitud": secuencia.get("length"),
+        "secuencia": secuencia.get("value"),
+    }
+
+
+# Búsqueda masiva: todos los resultados de una consulta de texto en UniProt
+# Los resultados se procesan en flujo y se escriben directo a disco
+# Entrada = consulta, ruta de salida (.jsonl.gz o .parquet; None = automática)
+# Salida = mensaje con la cantidad de resultados y el archivo generado
+def buscar_masivo(query, salida=None):
+    if salida is None:
+        nombre = re.sub(r"[^A-Za-z0-9]+", "_", query).strip("_")[:60] or "busqueda"
+        salida = os.path.join("resultados", f"busqueda_{nombre}.jsonl.gz")
+
+    inicio = time.perf_counter()
+    contador = {"n": 0}
+
+    def filas():
+        for result in buscar_uniprot_stream(query):
+            contador["n"] += 1
+            if contador["n"] % 1000 == 0:
+                print(f"\rResultados descargados: {contador['n']}", end="", flush=True)
+            yield _fila_masiva(result)
+
+    try:
+        escribir_filas(salida, filas(), COLUMNAS_MASIVO)
+    except Exception as error:
+        return f"Error en la búsqueda masiva: {error}"
+
+    print(f"\rResultados descargados: {contador['n']}")
+    return (
+        f"{contador['n']} resultados guardados en {salida} "
+        f"({time.perf_counter() - inicio:.1f} s)"
+    )
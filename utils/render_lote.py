@@ -0,0 +1,178 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# =============================================================================
+# RENDERIZADO EN LOTE DE REPORTES HTML DEL VISOR PDB (SIN NAVEGADOR)
+# =============================================================================
+#
+# Cada línea del archivo de entrada describe un reporte:
+#
+#   PDB [CADENA] [COLOR INICIO FIN NOMBRE]
+#
+#   1HHO                       -> vista simple (o con features, con_features=True)
+#   1HHO A                     -> vista simple de la cadena A
+#   1HHO - #FF0000 10 50 sitio -> vista con features más una feature personalizada
+#   1HHO A #FF0000 10 50 sitio -> lo mismo, sólo sobre la cadena A
+#
+# La estructura se embebe en cada HTML desde el almacén local y todos los
+# reportes de la carpeta comparten una copia de 3Dmol.js.
+#
+# Los reportes se generan en procesos del pool; ninguno abre el navegador
+# (BBDD_SIN_NAVEGADOR=1 en cada proceso y abrir=False). Las features de
+# UniProt salen de la cache de respuestas si ya se consultaron. Se informa el
+# tiempo y el error de cada elemento, y se escribe un resumen TSV.
+#
+# =============================================================================
+
+
+# Lee los elementos a renderizar de un archivo de texto
+# Entrada = ruta del archivo
+# Salida = lista de diccionarios {pdb, cadena, feature}
+def leer_elementos(ruta):
+    elementos = []
+    with open(ruta, encoding="utf-8") as f:
+        for numero, linea in enumerate(f, 1):
+            # Las líneas que empiezan con "#" son comentarios (los colores también usan "#",
+            # pero nunca en la primera columna)
+            campos = linea.split()
+            if not campos or campos[0].startswith("#"):
+                continue
+            cadena = campos[1] if len(campos) > 1 and campos[1] != "-" else None
+            feature = None
+            if len(campos) >= 6:
+                color, inicio, fin = campos[2], int(campos[3]), int(campos[4])
+                feature = (color, inicio, fin, " ".join(campos[5:]))
+            elif len(campos) > 2:
+                raise ValueError(f"Línea {numero} con formato inválido: {linea.strip()}")
+            elementos.append({"pdb": campos[0].upper(), "cadena": cadena, "feature": feature})
+    return elementos
+
+
+# Inicializa cada proceso del pool: nunca abrir el navegador
+def _inicializar_proceso():
+    os.environ["BBDD_SIN_NAVEGADOR"] = "1"
+
+
+# Genera el reporte HTML de un elemento (se ejecuta en un proceso del pool)
+# Entrada = elemento, carpeta de salida, con_features, representación y compresión de la estructura
+# Salida = diccionario con pdb, cadena, ruta, segundos y error (None si no falló)
+def renderizar_elemento(
+    elemento, carpeta, con_features=False, representacion="auto", comprimir=False
+):
+    # Import diferido: py3Dmol y el visor sólo se cargan en los procesos de trabajo
+    from utils.pdb_viewer import PDB_Viewer
+
+    inicio = time.perf_counter()
+    resultado = {
+        "pdb": elemento["pdb"],
+        "cadena": elemento["cadena"],
+        "ruta": None,
+        "error": None,
+    }
+    try:
+        if con_features or elemento["feature"]:
+            visor = PDB_Viewer(
+                elemento["pdb"], representacion=representacion, comprimir=comprimir
+            )
+            resultado["ruta"] = visor.mostrar_pdb_domains_regiones(
+                elemento["feature"],
+                carpeta=carpeta,
+                abrir=False,
+                cadena_id=elemento["cadena"],
+            )
+        else:
+            visor = PDB_Viewer(
+                elemento["pdb"],
+                buscar_features=False,
+                representacion=representacion,
+                comprimir=comprimir,
+            )
+            resultado["ruta"] = visor.mostrar_pdb_desde_id(
+                elemento["cadena"], carpeta=carpeta, abrir=False
+            )
+    except Exception as e:
+        resultado["error"] = f"{type(e).__name__}: {e}"
+    resultado["segundos"] = time.perf_counter() - inicio
+    return resultado
+
+
+# Escribe el resumen TSV del lote
+def guardar_resumen(ruta, resultados):
+    with open(ruta, "w", encoding="utf-8") as f:
+        f.write("pdb\tcadena\tsegundos\testado\truta_o_error\n")
+        for r in resultados:
+            estado = "error" if r["error"] else "ok"
+            detalle = r["error"] or r["ruta"]
+            f.write(
+                f"{r['pdb']}\t{r['cadena'] or '-'}\t{r['segundos']:.3f}\t{estado}\t{detalle}\n"
+            )
+    return ruta
+
+
+# Función principal: renderiza en paralelo todos los elementos sin abrir el navegador
+# Entrada = lista de elementos (o ruta de archivo), carpeta, procesos, con_features,
+#           representación y compresión de la estructura embebida
+# Salida = lista de resultados en el orden de entrada
+def renderizar_lote(
+    elementos,
+    carpeta="graficos",
+    procesos=None,
+    con_features=False,
+    representacion="auto",
+    comprimir=False,
+):
+    if isinstance(elementos, str):
+        elementos = leer_elementos(elementos)
+    if not elementos:
+        print("No hay elementos para renderizar.")
+        return []
+
+    os.makedirs(carpeta, exist_ok=True)
+    inicio = time.perf_counter()
+
+    # 3Dmol.js compartido: se copia a la carpeta una vez, antes de lanzar los procesos
+    from utils.pdb_viewer import preparar_3dmol
+
+    preparar_3dmol(carpeta)
+    resultados = [None] * len(elementos)
+
+    with ProcessPoolExecutor(max_workers=procesos, initializer=_inicializar_proceso) as pool:
+        futuros = {
+            pool.submit(
+                renderizar_elemento,
+                elemento,
+                carpeta,
+                con_features,
+                representacion,
+                comprimir,
+            ): i
+            for i, elemento in enumerate(elementos)
+        }
+        for hechos, futuro in enumerate(as_completed(futuros), 1):
+            i = futuros[futuro]
+            try:
+                resultado = futuro.result()
+            except Exception as e:
+                # Falla del proceso de trabajo (no del reporte)
+                resultado = {
+                    "pdb": elementos[i]["pdb"],
+                    "cadena": elementos[i]["cadena"],
+                    "ruta": None,
+                    "segundos": 0.0,
+                    "error": f"{type(e).__name__}: {e}",
+                }
+            resultados[i] = resultado
+            estado = f"ERROR {resultado['error']}" if resultado["error"] else resultado["ruta"]
+            print(
+                f"[{hechos}/{len(elementos)}] {resultado['pdb']} "
+                f"({resultado['segundos']:.2f} s): {estado}"
+            )
+
+    fallidos = sum(1 for r in resultados if r["error"])
+    resumen = guardar_resumen(os.path.join(carpeta, "resumen_render.tsv"), resultados)
+    print(
+        f"\n{len(resultados) - fallidos} reportes generados, {fallidos} con error "
+        f"en {time.perf_counter() - inicio:.1f} s. Resumen: {resumen}"
+    )
+    return resultados
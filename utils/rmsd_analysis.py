@@ -1,23 +1,30 @@
 import io
-import os
+import time
 import warnings
+from concurrent.futures import ThreadPoolExecutor
 
-import matplotlib.pyplot as plt
 import numpy as np
-import seaborn as sns
 from Bio.PDB.PDBIO import PDBIO, Select
 from Bio.PDB.PDBParser import PDBParser
-from Bio.PDB.Polypeptide import is_aa
-from Bio.PDB.Superimposer import Superimposer
-
 from data.fetch_pdb import descargar_pdb
 from data.fetch_uniprot import buscar_pdb_accessions
+from utils.almacen_ca import (
+    CadenaCA,
+    cadena_ca_desde_cadena,
+    cadenas_almacenadas,
+    extraer_cadenas_archivo,
+    obtener_cadenas,
+    seleccionar_residuos,
+)
+from utils import graficos_rmsd
+from utils.correspondencia import correspondencia
+from utils.estructura_diferida import EstructuraDiferida
+from utils.numeracion_sifts import correspondencia_uniprot, segmentos_sifts
+from utils.superposicion import aplicar_transformacion, kabsch, superponer
 
 warnings.filterwarnings("ignore")
 
-# Configurar estilo de gráficos
-plt.style.use("seaborn-v0_8")
-sns.set_palette("husl")
+# matplotlib y seaborn se cargan recién al graficar (utils.graficos_rmsd)
 
 
 # =============================================================================
@@ -35,58 +42,77 @@ sns.set_palette("husl")
 #
 # FUNCIONES DE MANEJO DE DATOS:
 # -----------------------------
-# cargar_estructura() - Carga una estructura PDB usando BioPython
-# cargar_estructuras_pdb() - Descarga y carga dos estructuras PDB
+# cargar_estructura() - Carga una estructura PDB (completa con BioPython u, opcional, diferida por cadena)
+# cargar_estructuras_pdb() - Descarga y carga en paralelo las cadenas CA de dos PDB
 # obtener_cadenas_comunes() - Encuentra cadenas comunes entre dos estructuras
-# extraer_coordenadas_ca() - Extrae coordenadas CA de aminoácidos estándar
-# preparar_coordenadas_para_analisis() - Prepara coordenadas para el análisis RMSD
+# extraer_coordenadas_ca() - Extrae la CadenaCA (coordenadas CA de aminoácidos estándar)
+# preparar_coordenadas_para_analisis() - Empareja residuos equivalentes para el análisis RMSD
 #
 # FUNCIONES DE CÁLCULO RMSD:
 # --------------------------
 # superponer_estructuras_globalmente() - Realiza superposición global de estructuras
 # calcular_rmsd_ventana() - Calcula RMSD para una ventana específica
+# calcular_rmsd_ventanas() - Calcula el RMSD de todas las ventanas con sumas acumuladas
 # calcular_rmsd_local() - Algoritmo principal para RMSD local con ventanas
+# calcular_rmsd_local_multiple() - RMSD local para varios tamaños de ventana a la vez
 #
 # FUNCIONES DE VISUALIZACIÓN:
 # ---------------------------
 # generar_grafico_rmsd() - Genera gráfico de RMSD local
-# generar_y_guardar_grafico() - Genera y guarda el gráfico en archivo
+# generar_y_guardar_grafico() - Guarda el gráfico (png, svg) o el perfil JSON
 # mostrar_estadisticas_rmsd() - Muestra estadísticas descriptivas del análisis
+# mostrar_tiempos_etapas() - Muestra la duración de cada etapa del análisis
 #
 # FUNCIONES AUXILIARES:
 # ---------------------
 # conseguir_atomos_CA() - Extrae átomos CA de una cadena
-# alinear_estructuras() - Alinea estructuras usando Superimposer
+# alinear_estructuras() - Alinea estructuras con Kabsch (utils.superposicion)
 # SeleccionarCadena() - Clase para seleccionar cadenas específicas
 # estructura_PDB_a_str() - Convierte estructura BioPython a string PDB
 #
 # =============================================================================
 
 
-# Carga una estructura PDB usando BioPython
-# Entrada = ruta del archivo PDB
-# Salida = objeto estructura de BioPython
-def cargar_estructura(archivo_pdb):
-    parser = PDBParser(QUIET=True)
+# Carga una estructura PDB
+# Con diferida=True la carga es diferida (utils.estructura_diferida): un solo recorrido
+# indexa los rangos de bytes de cada modelo y cadena, y cada cadena se parsea con BioPython
+# recién al usarla (estructura[0][cadena]), así que un ensamblado grande no se materializa
+# entero. Admite estructura[modelo][cadena], pero no get_chains() ni get_atoms()
+# Entrada = ruta del archivo PDB, diferida (True = EstructuraDiferida)
+# Salida = objeto estructura de BioPython o EstructuraDiferida
+def cargar_estructura(archivo_pdb, diferida=False):
     try:
+        if diferida:
+            return EstructuraDiferida(archivo_pdb)
+        parser = PDBParser(QUIET=True)
         estructura = parser.get_structure("protein", archivo_pdb)
         return estructura
     except Exception as e:
         raise Exception(f"Error al cargar estructura: {e}")
 
 
+# Devuelve los IDs de cadena de una estructura de BioPython, EstructuraDiferida o
+# diccionario de CadenaCA
+def ids_cadenas(estructura):
+    if isinstance(estructura, dict):
+        return list(estructura)
+    if isinstance(estructura, EstructuraDiferida):
+        return estructura.cadenas()
+    return [chain.id for chain in estructura.get_chains()]
+
+
 # Encuentra las cadenas que están presentes en ambas estructuras
-# Entrada = dos objetos estructura de BioPython
+# Entrada = dos estructuras (BioPython o diccionarios {cadena_id: CadenaCA})
 # Salida = lista de IDs de cadenas comunes
 def obtener_cadenas_comunes(estructura1, estructura2, cadena1_id=None, cadena2_id=None):
 
     if cadena1_id is None:
-        cadenas1 = set([chain.id for chain in estructura1.get_chains()])
+        cadenas1 = set(ids_cadenas(estructura1))
     else:
         cadenas1 = set([cadena1_id])
 
     if cadena2_id is None:
-        cadenas2 = set([chain.id for chain in estructura2.get_chains()])
+        cadenas2 = set(ids_cadenas(estructura2))
     else:
         cadenas2 = set([cadena2_id])
 
@@ -98,69 +124,75 @@ def obtener_cadenas_comunes(estructura1, estructura2, cadena1_id=None, cadena2_i
     return list(cadenas_comunes)
 
 
-# Calcula RMSD local usando una ventana
-# Entrada = Estructura, ID de cadena, tamaño de ventana (5 por default)
-# Salida = listas de posiciones y valores RMSD locales
+# Extrae las coordenadas CA de una cadena
+# Entrada = Estructura (BioPython, diccionario {cadena_id: CadenaCA} o ruta de un archivo
+#           PDB, que se lee con el parser por columnas sólo para esa cadena), ID de cadena
+# Salida = CadenaCA con coordenadas, números de residuo, códigos de inserción y secuencia
 def extraer_coordenadas_ca(estructura1, cadena_id):
 
-    # Extrae las coordenadas de los átomos C-alfa (CA) de ambas estructuras
+    # Extrae las coordenadas de los átomos C-alfa (CA) de la estructura
     try:
-        cadena1 = estructura1[0][cadena_id]
+        cadena1 = _buscar_cadena(estructura1, cadena_id)
     except Exception as e:
         print(
             f"No existe cadena {cadena_id} en los PDBs. Se utilizará por defecto el valor de cadena A."
         )
         cadena_id = "A"
-        cadena1 = estructura1[0][cadena_id]
+        cadena1 = _buscar_cadena(estructura1, cadena_id)
 
-    coords1, residuos1 = [], []
+    # Las cadenas del almacén binario ya vienen preprocesadas
+    if isinstance(cadena1, CadenaCA):
+        return cadena1
 
-    # Extraer coordenadas CA de la estructura
-    for residuo in cadena1:
-        if is_aa(residuo, standard=True) and "CA" in residuo:
-            coords1.append(residuo["CA"].get_coord())
-            residuos1.append(residuo)
+    return cadena_ca_desde_cadena(cadena1)
 
-    return np.array(coords1), residuos1
+
+def _buscar_cadena(estructura, cadena_id):
+    if isinstance(estructura, CadenaCA):
+        return estructura
+    if isinstance(estructura, dict):
+        return estructura[cadena_id]
+    if isinstance(estructura, str):
+        return extraer_cadenas_archivo(estructura, cadenas=[cadena_id])[cadena_id]
+    return estructura[0][cadena_id]
 
 
 # Prepara las coordenadas para el análisis RMSD
-# Entrada = arrays de coordenadas, listas de residuos, tamaño de ventana
-# Salida = coordenadas preparadas y longitud mínima
-def preparar_coordenadas_para_analisis(coords1, coords2, residuos1, residuos2, ventana):
+# Empareja los residuos equivalentes de ambas cadenas (misma numeración o alineamiento
+# de secuencias, ver utils.correspondencia) en lugar de cortar a la longitud mínima
+# Entrada = dos CadenaCA, tamaño de ventana, pares de índices ya emparejados (opcional,
+#           p. ej. por posición UniProt con utils.numeracion_sifts)
+# Salida = cadenas emparejadas (mismo largo) y cantidad de residuos emparejados
+def preparar_coordenadas_para_analisis(cadena1, cadena2, ventana, pares=None):
+
+    if pares is not None:
+        (indices1, indices2), metodo = pares, "posición UniProt (SIFTS)"
+    else:
+        indices1, indices2, metodo = correspondencia(cadena1, cadena2)
+    print(f"Residuos emparejados por {metodo}: {len(indices1)}")
 
     # Verificar que tenemos suficientes residuos para el análisis
-    if len(coords1) < ventana or len(coords2) < ventana:
+    if len(indices1) < ventana:
         raise Exception(f"Se necesitan al menos {ventana} residuos para el análisis")
 
-    # Cortar para que tengan igual longitud (algoritmo estándar)
-    min_len = min(len(coords1), len(coords2))
-    coords1 = coords1[:min_len]
-    coords2 = coords2[:min_len]
-    residuos1 = residuos1[:min_len]
-    residuos2 = residuos2[:min_len]
+    cadena1 = seleccionar_residuos(cadena1, indices1)
+    cadena2 = seleccionar_residuos(cadena2, indices2)
 
-    return coords1, coords2, residuos1, residuos2, min_len
+    return cadena1, cadena2, len(indices1)
 
 
 # Realiza la superposición global de las estructuras usando los átomos CA
-# Entrada = listas de residuos de ambas estructuras
+# Entrada = coordenadas CA de ambas estructuras (arrays N x 3)
 # Salida = coordenadas actualizadas de la segunda estructura
-def superponer_estructuras_globalmente(residuos1, residuos2):
+def superponer_estructuras_globalmente(coords1, coords2):
 
     print("Realizando superposición global...")
 
-    # Crear listas de átomos CA para la superposición
-    atomos_global1 = [residuo["CA"] for residuo in residuos1]
-    atomos_global2 = [residuo["CA"] for residuo in residuos2]
-
-    # Aplicar superposición usando BioPython
-    superimposer_global = Superimposer()
-    superimposer_global.set_atoms(atomos_global1, atomos_global2)
-    superimposer_global.apply(atomos_global2)
+    # Kabsch sobre las coordenadas y transformación del bloque completo
+    coords2_superpuestas, _ = superponer(coords1, coords2)
 
     # Retornar las coordenadas actualizadas de la segunda estructura
-    return np.array([atomo.get_coord() for atomo in atomos_global2])
+    return coords2_superpuestas
 
 
 # Calcula el RMSD para una ventana específica de residuos
@@ -172,89 +204,102 @@ def calcular_rmsd_ventana(ventana_coords1, ventana_coords2):
     return np.sqrt(np.mean(diff_squared))
 
 
-# Algoritmo científico estándar para RMSD local
-# Entrada = dos estructuras, ID de cadena, tamaño de ventana (5 por default)
-# Salida = listas de posiciones y valores RMSD locales
-def calcular_rmsd_local(estructura1, estructura2, cadena1_id, cadena2_id, ventana=5):
+# Calcula el RMSD de todas las ventanas a la vez usando sumas acumuladas
+# de las desviaciones cuadráticas (una sola pasada sobre las posiciones)
+# Entrada = coordenadas ya superpuestas (N x 3), lista de tamaños de ventana
+# Salida = matriz posiciones x ventanas; la fila i corresponde a la ventana centrada en
+#          el residuo i y vale NaN donde la ventana no entra en la cadena
+def calcular_rmsd_ventanas(coords1, coords2, ventanas):
+
+    diferencias = np.asarray(coords1, dtype=np.float64) - np.asarray(
+        coords2, dtype=np.float64
+    )
+    acumulada = np.concatenate(([0.0], np.cumsum(np.sum(diferencias**2, axis=1))))
+
+    n = len(diferencias)
+    matriz = np.full((n, len(ventanas)), np.nan)
+    for k, ventana in enumerate(ventanas):
+        if ventana > n:
+            continue
+        sumas = acumulada[ventana:] - acumulada[:-ventana]
+        inicio = ventana // 2
+        matriz[inicio : inicio + n - ventana + 1, k] = np.sqrt(
+            np.maximum(sumas, 0.0) / ventana
+        )
+
+    return matriz
+
+
+# RMSD local para varios tamaños de ventana con una sola superposición global
+# Entrada = dos estructuras (BioPython, diccionario de CadenaCA o CadenaCA), IDs de cadena,
+#           lista de tamaños de ventana, IDs de PDB (opcional: con ellos los residuos se
+#           emparejan por posición UniProt según SIFTS, si ambas cadenas están mapeadas)
+# Salida = posiciones (número de residuo de cada fila) y matriz posiciones x ventanas
+def calcular_rmsd_local_multiple(
+    estructura1, estructura2, cadena1_id, cadena2_id, ventanas=(5,), pdb_ids=None
+):
 
     # Extraer coordenadas CA de ambas estructuras
-    coords1, residuos1 = extraer_coordenadas_ca(estructura1, cadena1_id)
-    coords2, residuos2 = extraer_coordenadas_ca(estructura2, cadena2_id)
+    cadena1 = extraer_coordenadas_ca(estructura1, cadena1_id)
+    cadena2 = extraer_coordenadas_ca(estructura2, cadena2_id)
+
+    # Emparejar por posición UniProt cuando hay mapeo SIFTS de ambas cadenas
+    pares = None
+    if pdb_ids is not None:
+        pares = correspondencia_uniprot(
+            pdb_ids[0], cadena1_id, cadena1, pdb_ids[1], cadena2_id, cadena2
+        )
 
     # Preparar coordenadas para el análisis
-    coords1, coords2, residuos1, residuos2, min_len = (
-        preparar_coordenadas_para_analisis(
-            coords1, coords2, residuos1, residuos2, ventana
-        )
+    cadena1, cadena2, min_len = preparar_coordenadas_para_analisis(
+        cadena1, cadena2, min(ventanas), pares
     )
 
     # PASO 1: Superposición global (estándar científico)
-    coords2 = superponer_estructuras_globalmente(residuos1, residuos2)
+    coords2 = superponer_estructuras_globalmente(cadena1.coords, cadena2.coords)
 
-    # PASO 2: Calcular RMSD local en ventanas (sin superponer nuevamente)
-    rmsd_local, posiciones = [], []
+    # PASO 2: RMSD de todas las ventanas (sin superponer nuevamente)
+    matriz = calcular_rmsd_ventanas(cadena1.coords, coords2, ventanas)
 
-    for i in range(min_len - ventana + 1):
-        # Tomar ventana de coordenadas (ya superpuestas globalmente)
-        ventana_coords1 = coords1[i : i + ventana]
-        ventana_coords2 = coords2[i : i + ventana]
+    return np.asarray(cadena1.resnum, dtype=np.int64), matriz
 
-        # Calcular RMSD para esta ventana
-        rmsd = calcular_rmsd_ventana(ventana_coords1, ventana_coords2)
-        rmsd_local.append(rmsd)
 
-        # Posición central de la ventana (usar índice de residuo)
-        pos_central = residuos1[i + ventana // 2].id[1]
-        posiciones.append(pos_central)
+# Algoritmo científico estándar para RMSD local
+# Entrada = dos estructuras (BioPython, diccionario de CadenaCA o CadenaCA), IDs de cadena,
+#           tamaño de ventana (5 por default), IDs de PDB (opcional, ver
+#           calcular_rmsd_local_multiple)
+# Salida = listas de posiciones y valores RMSD locales
+def calcular_rmsd_local(
+    estructura1, estructura2, cadena1_id, cadena2_id, ventana=5, pdb_ids=None
+):
 
-    return posiciones, rmsd_local
+    posiciones, matriz = calcular_rmsd_local_multiple(
+        estructura1, estructura2, cadena1_id, cadena2_id, [ventana], pdb_ids
+    )
+
+    # Sólo las posiciones centrales de ventanas completas
+    validas = ~np.isnan(matriz[:, 0])
+    return posiciones[validas].tolist(), matriz[validas, 0].tolist()
 
 
 # Genera un gráfico de RMSD local
-# Entrada = posiciones, valores RMSD, IDs de PDB, cadena, ventana
-# Salida = objeto figura de matplotlib
+# Entrada = posiciones, valores RMSD (lista, o matriz posiciones x ventanas si se pasan
+#           varias ventanas), IDs de PDB, cadena, ventana (entero o lista de tamaños)
+# Salida = figura de matplotlib (fuera de pyplot, backend Agg)
 def generar_grafico_rmsd(
     posiciones, rmsd_values, pdb1_id, pdb2_id, cadena1_id, cadena2_id, ventana=5
 ):
-
-    fig, ax = plt.subplots(figsize=(12, 6))
-
-    # Crear gráfico
-    ax.plot(posiciones, rmsd_values, "o-", linewidth=2, markersize=4, alpha=0.7)
-
-    # Configurar gráfico
-    ax.set_xlabel("Posición del residuo", fontsize=12)
-    ax.set_ylabel("RMSD Local (Å)", fontsize=12)
-    ax.set_title(
-        f"RMSD Local entre {pdb1_id} y {pdb2_id} (Cadena {cadena1_id} y {cadena2_id}, Ventana={ventana})",
-        fontsize=14,
-        fontweight="bold",
+    return graficos_rmsd.dibujar_rmsd(
+        graficos_rmsd.nueva_figura(),
+        posiciones,
+        rmsd_values,
+        pdb1_id,
+        pdb2_id,
+        cadena1_id,
+        cadena2_id,
+        ventana,
     )
 
-    # Agregar grid
-    ax.grid(True, alpha=0.3)
-
-    # Agregar estadísticas
-    rmsd_mean = np.mean(rmsd_values)
-    rmsd_std = np.std(rmsd_values)
-    rmsd_max = np.max(rmsd_values)
-
-    stats_text = f"Promedio: {rmsd_mean:.3f} Å\nDesv. Est.: {rmsd_std:.3f} Å\nMáximo: {rmsd_max:.3f} Å"
-    ax.text(
-        0.02,
-        0.98,
-        stats_text,
-        transform=ax.transAxes,
-        fontsize=10,
-        verticalalignment="top",
-        bbox=dict(boxstyle="round", facecolor="wheat", alpha=0.8),
-    )
-
-    # Ajustar layout
-    plt.tight_layout()
-
-    return fig
-
 
 # Función principal para analizar RMSD local entre dos estructuras PDB
 # Entrada = IDs de PDB, cadena opcional, tamaño de ventana
@@ -292,49 +337,106 @@ def verificar_compatibilidad_uniprot(pdb1_id, pdb2_id, cadena1_id, cadena2_id):
     return True
 
 
-# Descarga y carga las estructuras PDB desde la base de datos
-# Entrada = dos IDs de PDB
-# Salida = archivos temporales y estructuras cargadas
-def cargar_estructuras_pdb(pdb1_id, pdb2_id):
-
-    print("Descargando estructuras PDB...")
-    archivo1 = descargar_pdb(pdb1_id)
-    archivo2 = descargar_pdb(pdb2_id)
+# Ejecuta una etapa del análisis y guarda su duración en segundos
+# Entrada = diccionario de tiempos (o None), nombre de la etapa, función y argumentos
+# Salida = resultado de la función
+def _cronometrar(tiempos, etapa, funcion, *args):
+    inicio = time.perf_counter()
+    try:
+        return funcion(*args)
+    finally:
+        if tiempos is not None:
+            tiempos[etapa] = time.perf_counter() - inicio
+
+
+# Descarga un PDB y lo parsea apenas llega el archivo (sin esperar al otro PDB)
+# Entrada = ID de PDB, diccionario de tiempos
+# Salida = diccionario {cadena_id: CadenaCA}
+def _descargar_y_parsear(pdb_id, tiempos):
+    archivo = None
+    if cadenas_almacenadas(pdb_id) is None:
+        archivo = _cronometrar(tiempos, f"descarga {pdb_id}", descargar_pdb, pdb_id)
+    return _cronometrar(tiempos, f"parseo {pdb_id}", obtener_cadenas, pdb_id, archivo)
+
+
+# Carga las cadenas CA de las estructuras PDB desde el almacén binario
+# Sólo se descarga y parsea un PDB la primera vez que se usa. Las dos descargas corren
+# en paralelo y cada PDB se parsea en cuanto termina su descarga
+# Entrada = dos IDs de PDB, diccionario de tiempos por etapa (opcional), pool de hilos
+#           compartido con otras etapas (opcional)
+# Salida = diccionarios {cadena_id: CadenaCA} de ambas estructuras
+def cargar_estructuras_pdb(pdb1_id, pdb2_id, tiempos=None, pool=None):
 
     print("Cargando estructuras...")
-    estructura1 = cargar_estructura(archivo1)
-    estructura2 = cargar_estructura(archivo2)
+    if pool is None:
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            return cargar_estructuras_pdb(pdb1_id, pdb2_id, tiempos, pool)
+
+    estructuras = [
+        pool.submit(_descargar_y_parsear, pdb_id, tiempos) for pdb_id in (pdb1_id, pdb2_id)
+    ]
+    cadenas1, cadenas2 = (futuro.result() for futuro in estructuras)
 
-    return archivo1, archivo2, estructura1, estructura2
+    return cadenas1, cadenas2
+
+
+# Consulta los segmentos de SIFTS de ambos PDB en paralelo con las descargas
+# Quedan en el índice local o en la cache de respuestas, así que la verificación UniProt
+# y el emparejamiento por posición UniProt no vuelven a esperar a la red
+# Entrada = dos IDs de PDB, diccionario de tiempos, pool de hilos
+# Salida = lista de futuros (uno por PDB)
+def _precargar_sifts(pdb1_id, pdb2_id, tiempos, pool):
+    return [
+        pool.submit(_cronometrar, tiempos, f"SIFTS {pdb_id}", segmentos_sifts, pdb_id)
+        for pdb_id in (pdb1_id, pdb2_id)
+    ]
 
 
 # Genera el gráfico de RMSD local y lo guarda en la carpeta 'graficos'
-# Entrada = posiciones, valores RMSD, IDs de PDB, cadena, ventana
+# Entrada = posiciones, valores RMSD, IDs de PDB, cadena, ventana, formato (png, svg o
+#           json), dpi del PNG, carpeta
 # Salida = ruta completa del archivo guardado
 def generar_y_guardar_grafico(
-    posiciones, rmsd_values, pdb1_id, pdb2_id, cadena1_id, cadena2_id, ventana
+    posiciones,
+    rmsd_values,
+    pdb1_id,
+    pdb2_id,
+    cadena1_id,
+    cadena2_id,
+    ventana,
+    formato="png",
+    dpi=graficos_rmsd.DPI_DEFAULT,
+    carpeta="graficos",
 ):
 
-    print("Generando gráfico...")
-    fig = generar_grafico_rmsd(
-        posiciones, rmsd_values, pdb1_id, pdb2_id, cadena1_id, cadena2_id, ventana
+    print("Generando gráfico..." if formato != "json" else "Guardando perfil JSON...")
+    ruta_completa = graficos_rmsd.guardar_grafico_rmsd(
+        posiciones,
+        rmsd_values,
+        pdb1_id,
+        pdb2_id,
+        cadena1_id,
+        cadena2_id,
+        ventana,
+        formato,
+        dpi,
+        carpeta,
     )
-
-    # Crear carpeta si no existe y guardar gráfico
-    nombre_archivo = f"rmsd_local_{pdb1_id}_{pdb2_id}_{cadena1_id}_{cadena2_id}.png"
-    carpeta = "graficos"
-    os.makedirs(carpeta, exist_ok=True)
-    ruta_completa = os.path.join("graficos", nombre_archivo)
-    fig.savefig(ruta_completa, dpi=300, bbox_inches="tight")
     print(f"Gráfico guardado como: {ruta_completa}")
 
     return ruta_completa
 
 
 # Muestra las estadísticas descriptivas del análisis RMSD
-# Entrada = lista de valores RMSD
+# Entrada = lista de valores RMSD (o matriz posiciones x ventanas y lista de ventanas)
 # Salida = impresión de estadísticas en consola
-def mostrar_estadisticas_rmsd(rmsd_values):
+def mostrar_estadisticas_rmsd(rmsd_values, ventanas=None):
+
+    if np.ndim(rmsd_values) == 2:
+        for k, tamano in enumerate(ventanas):
+            print(f"\n[Ventana={tamano}]", end="")
+            mostrar_estadisticas_rmsd(_valores_validos(rmsd_values[:, k]))
+        return
 
     print(f"\nEstadísticas RMSD Local:")
     print(f"Promedio: {np.mean(rmsd_values):.3f} Å")
@@ -343,18 +445,54 @@ def mostrar_estadisticas_rmsd(rmsd_values):
     print(f"Mínimo: {np.min(rmsd_values):.3f} Å")
 
 
+# Devuelve los valores RMSD definidos (sin NaN) de una lista o de la primera columna
+def _valores_validos(rmsd_values):
+    valores = np.asarray(rmsd_values, dtype=np.float64)
+    if valores.ndim == 2:
+        valores = valores[:, 0]
+    return valores[~np.isnan(valores)]
+
+
+# Muestra la duración de cada etapa del análisis y el tiempo total
+# Las descargas, parseos y consultas de SIFTS se solapan: el total se acerca a la etapa
+# más larga en lugar de a la suma
+# Entrada = diccionario {etapa: segundos}, tiempo total en segundos
+def mostrar_tiempos_etapas(tiempos, total):
+
+    print("\nTiempos por etapa:")
+    for etapa, segundos in tiempos.items():
+        print(f"  {etapa:<24}{segundos * 1000:>10.1f} ms")
+    print(f"  {'Suma de etapas':<24}{sum(tiempos.values()) * 1000:>10.1f} ms")
+    print(f"  {'Total':<24}{total * 1000:>10.1f} ms")
+
+
 # Función principal para analizar RMSD local entre dos estructuras PDB
-# Entrada = IDs de PDB, cadena opcional, tamaño de ventana
-# Salida = ruta del archivo guardado, posiciones, valores RMSD
-def analizar_rmsd_local(pdb1_id, pdb2_id, cadena1_id=None, cadena2_id=None, ventana=5):
+# Entrada = IDs de PDB, cadena opcional, tamaño de ventana (entero o lista de tamaños),
+#           formato de salida (png, svg o json) y dpi del PNG
+# Salida = ruta del archivo guardado, posiciones, valores RMSD (matriz posiciones x
+#          ventanas si se pidieron varias ventanas)
+def analizar_rmsd_local(
+    pdb1_id,
+    pdb2_id,
+    cadena1_id=None,
+    cadena2_id=None,
+    ventana=5,
+    formato="png",
+    dpi=graficos_rmsd.DPI_DEFAULT,
+):
 
     print(f"Analizando RMSD local entre {pdb1_id} y {pdb2_id}...")
+    tiempos = {}
+    inicio = time.perf_counter()
 
     try:
-        # PASO 1: Descargar y cargar estructuras PDB
-        archivo1, archivo2, estructura1, estructura2 = cargar_estructuras_pdb(
-            pdb1_id, pdb2_id
-        )
+        # PASO 1: Descargar y cargar estructuras PDB, con las consultas de SIFTS en paralelo
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            sifts = _precargar_sifts(pdb1_id, pdb2_id, tiempos, pool)
+            estructura1, estructura2 = cargar_estructuras_pdb(
+                pdb1_id, pdb2_id, tiempos, pool
+            )
+            errores_sifts = [futuro.exception() for futuro in sifts]
 
         # PASO 2: si cadena1_id o cadena2_id es None, obtener cadenas en común
         if cadena1_id is None or cadena2_id is None:
@@ -366,31 +504,66 @@ def analizar_rmsd_local(pdb1_id, pdb2_id, cadena1_id=None, cadena2_id=None, vent
             if cadena2_id is None:
                 cadena2_id = cadenas_comunes[0]
 
-        # PASO 3: Verificar compatibilidad UniProt antes de descargar estructuras
+        # PASO 3: Verificar compatibilidad UniProt (datos de SIFTS ya precargados)
         print("Verificando anotaciones UniProt...")
 
-        if not verificar_compatibilidad_uniprot(
-            pdb1_id, pdb2_id, cadena1_id, cadena2_id
+        error_sifts = next((e for e in errores_sifts if e is not None), None)
+        if error_sifts is not None:
+            # Sin SIFTS no se repiten las consultas: ni verificación ni emparejamiento UniProt
+            print(
+                f"⚠️  Advertencia: no se pudo consultar PDBe-SIFTS ({error_sifts}); "
+                "no se puede verificar si son la misma molécula."
+            )
+        elif not _cronometrar(
+            tiempos,
+            "verificación UniProt",
+            verificar_compatibilidad_uniprot,
+            pdb1_id,
+            pdb2_id,
+            cadena1_id,
+            cadena2_id,
         ):
             print("Análisis cancelado por el usuario.")
             return None, None, None
 
-        # PASO 5: Calcular RMSD local
+        # PASO 5: Calcular RMSD local (varias ventanas en una sola pasada)
         print(f"Calculando RMSD local...")
-        posiciones, rmsd_values = calcular_rmsd_local(
-            estructura1, estructura2, cadena1_id, cadena2_id, ventana
+        calcular = (
+            calcular_rmsd_local_multiple
+            if isinstance(ventana, (list, tuple))
+            else calcular_rmsd_local
+        )
+        posiciones, rmsd_values = _cronometrar(
+            tiempos,
+            "RMSD",
+            calcular,
+            estructura1,
+            estructura2,
+            cadena1_id,
+            cadena2_id,
+            ventana,
+            None if error_sifts is not None else (pdb1_id, pdb2_id),
         )
 
         # PASO 6: Generar gráfico y mostrar estadísticas
-        ruta_completa = generar_y_guardar_grafico(
-            posiciones, rmsd_values, pdb1_id, pdb2_id, cadena1_id, cadena2_id, ventana
+        ruta_completa = _cronometrar(
+            tiempos,
+            "gráfico",
+            generar_y_guardar_grafico,
+            posiciones,
+            rmsd_values,
+            pdb1_id,
+            pdb2_id,
+            cadena1_id,
+            cadena2_id,
+            ventana,
+            formato,
+            dpi,
         )
-        mostrar_estadisticas_rmsd(rmsd_values)
-
-        # PASO 7: Limpiar archivos temporales
-        os.unlink(archivo1)
-        os.unlink(archivo2)
+        mostrar_estadisticas_rmsd(rmsd_values, ventana)
+        mostrar_tiempos_etapas(tiempos, time.perf_counter() - inicio)
 
+        # Los archivos PDB quedan en la cache de estructuras para próximos análisis
         return ruta_completa, posiciones, rmsd_values
 
     except Exception as e:
@@ -407,29 +580,41 @@ def conseguir_atomos_CA(estructura, cadenaID=None):
     return {residuo.id: residuo["CA"] for residuo in cadena if "CA" in residuo}
 
 
-# Alinear estructuras usando Superimposer
-def alinear_estructuras(estructuraReferencia, estructuraOtra, cadenaID, tolerancia=3):
-    ca_ref = conseguir_atomos_CA(estructuraReferencia, cadenaID)
-    ca_otro = conseguir_atomos_CA(estructuraOtra, cadenaID)
+# Alinear estructuras usando Kabsch sobre arreglos de coordenadas
+# Si se pasan cadenas_ca (CadenaCA de referencia y de la otra estructura, p. ej. del
+# almacén binario) no se recorren los residuos de BioPython para obtener los CA
+def alinear_estructuras(
+    estructuraReferencia, estructuraOtra, cadenaID, tolerancia=3, cadenas_ca=None
+):
+    if cadenas_ca is None:
+        cadenas_ca = (
+            extraer_coordenadas_ca(estructuraReferencia, cadenaID),
+            extraer_coordenadas_ca(estructuraOtra, cadenaID),
+        )
+    ca_ref, ca_otro = cadenas_ca
 
     # Encontrar residuos comunes -> Para alineamiento con proteinas de diferente tamaño
-    residuos_comunes = set(ca_ref.keys()) & set(ca_otro.keys())
-    print(cadenaID, residuos_comunes)
-    if len(residuos_comunes) < tolerancia:
+    indices_ref, indices_otro, metodo = correspondencia(ca_ref, ca_otro)
+    print(f"Cadena {cadenaID}: {len(indices_ref)} residuos comunes ({metodo})")
+    if len(indices_ref) < tolerancia:
         raise ValueError("Muy pocos residuos comunes para alinear.")
 
-    atomos_referencia = [ca_ref[residuo] for residuo in sorted(residuos_comunes)]
-    atomos_comunes = [ca_otro[residuo] for residuo in sorted(residuos_comunes)]
-
-    if len(atomos_referencia) != len(atomos_comunes):
-        raise ValueError("Las listas de C-Alfa no tienen el mismo largo.")
+    rotacion, traslacion, rms = kabsch(
+        ca_ref.coords[indices_ref], ca_otro.coords[indices_otro]
+    )
 
-    si = Superimposer()
-    si.set_atoms(atomos_referencia, atomos_comunes)
-    si.apply(
-        [atom for atom in estructuraOtra.get_atoms()]
-    )  # Aplica la transformación sobre todos los átomos
-    return si.rms
+    # Aplica la transformación sobre todos los átomos con una sola multiplicación
+    # (con carga diferida se materializa y transforma sólo la cadena alineada)
+    if isinstance(estructuraOtra, EstructuraDiferida):
+        atomos = list(estructuraOtra[0][cadenaID].get_atoms())
+    else:
+        atomos = list(estructuraOtra.get_atoms())
+    coordenadas = aplicar_transformacion(
+        np.array([atomo.coord for atomo in atomos]), rotacion, traslacion
+    ).astype(np.float32)
+    for atomo, coordenada in zip(atomos, coordenadas):
+        atomo.coord = coordenada
+    return float(rms)
 
 
 # Convertir estructura Biopython a string PDB para py3Dmol
@@ -443,9 +628,14 @@ class SeleccionarCadena(Select):
 
 def estructura_PDB_a_str(estructura, cadenaID=None):
     io_pdb = PDBIO()
-    io_pdb.set_structure(estructura)
-    string_io = io.StringIO()
     if cadenaID is None:
         cadenaID = "A"
+    if isinstance(estructura, EstructuraDiferida):
+        # Sólo se materializa la cadena pedida
+        if cadenaID not in estructura[0]:
+            return ""
+        estructura = estructura[0][cadenaID]
+    io_pdb.set_structure(estructura)
+    string_io = io.StringIO()
     io_pdb.save(string_io, select=SeleccionarCadena(cadenaID))
     return string_io.getvalue()
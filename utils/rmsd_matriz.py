@@ -0,0 +1,263 @@
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from data import cliente_http
+from data.fetch_uniprot import buscar_pdb_uniprot
+from utils.almacen_ca import claves_residuos, obtener_cadena
+from utils.correspondencia import correspondencia_arreglos
+from utils.pdb_search import es_accession_uniprot, map_ncbi_to_uni
+from utils.superposicion import rmsd_lote
+
+# =============================================================================
+# MATRIZ DE RMSD GLOBAL TODOS CONTRA TODOS
+# =============================================================================
+#
+# 1. Resuelve las entradas PDB (y sus cadenas) asociadas a un accession.
+# 2. Descarga y preprocesa las cadenas en paralelo (almacén binario de CA).
+# 3. Copia coordenadas, claves de residuo y secuencias a memoria compartida una sola vez.
+# 4. Cada tarea del pool de procesos calcula una fila de la matriz: empareja residuos
+#    (utils.correspondencia) y superpone en lote (Kabsch) la cadena i contra las j > i.
+# 5. Guarda la matriz con sus etiquetas PDB:cadena en un .npz comprimido.
+#
+# =============================================================================
+
+# Estado de cada proceso del pool (vistas sobre la memoria compartida)
+_compartido = {}
+
+
+# Interpreta la propiedad "Chains" de UniProt, p. ej. "A/C=1-141, B/D=1-146"
+# Entrada = texto de cadenas
+# Salida = lista de IDs de cadena en orden de aparición
+def cadenas_desde_propiedad(texto):
+    cadenas = []
+    for segmento in str(texto).split(","):
+        ids = segmento.split("=")[0].strip()
+        for cadena_id in ids.split("/"):
+            cadena_id = cadena_id.strip()
+            if re.fullmatch(r"[A-Za-z0-9]", cadena_id) and cadena_id not in cadenas:
+                cadenas.append(cadena_id)
+    return cadenas
+
+
+# Resuelve las entradas PDB y la cadena a comparar de cada una
+# Entrada = accession de UniProt o ID de NCBI, todas_las_cadenas
+# Salida = lista de tuplas (pdb_id, cadena_id)
+def resolver_entradas(accession, todas_las_cadenas=False):
+    if es_accession_uniprot(accession):
+        uniprot_ids = [accession]
+    else:
+        uniprot_ids = map_ncbi_to_uni(accession)
+
+    entradas = []
+    for uid, pdbs, error in cliente_http.ejecutar_concurrente(
+        buscar_pdb_uniprot, uniprot_ids
+    ):
+        if error is not None:
+            print(f"Advertencia: no se pudieron buscar PDBs para {uid} ({error})")
+            continue
+        for pdb_info in pdbs or []:
+            cadenas = cadenas_desde_propiedad(pdb_info["chain"])
+            if not todas_las_cadenas:
+                cadenas = cadenas[:1]
+            for cadena_id in cadenas:
+                entrada = (pdb_info["identifier"].upper(), cadena_id)
+                if entrada not in entradas:
+                    entradas.append(entrada)
+    return entradas
+
+
+# Descarga y carga las cadenas en paralelo; descarta las que fallan
+# Entrada = lista de (pdb_id, cadena_id), cantidad de hilos
+# Salida = lista de (pdb_id, cadena_id) cargadas y lista de CadenaCA
+def cargar_cadenas_concurrente(entradas, hilos=8):
+    def cargar(entrada):
+        try:
+            return obtener_cadena(*entrada)
+        except Exception as e:
+            print(f"Advertencia: se omite {entrada[0]}:{entrada[1]} ({e})")
+            return None
+
+    with ThreadPoolExecutor(max_workers=hilos) as pool:
+        cadenas = list(pool.map(cargar, entradas))
+
+    cargadas = [
+        (entrada, cadena)
+        for entrada, cadena in zip(entradas, cadenas)
+        if cadena is not None and len(cadena.resnum)
+    ]
+    return [entrada for entrada, _ in cargadas], [cadena for _, cadena in cargadas]
+
+
+# Copia coordenadas, claves de residuo y secuencias de todas las cadenas a memoria compartida
+# Entrada = lista de CadenaCA
+# Salida = bloques de memoria compartida y descripción para adjuntarlos en los procesos
+def _crear_memoria_compartida(cadenas):
+    desplazamientos = np.zeros(len(cadenas) + 1, dtype=np.int64)
+    desplazamientos[1:] = np.cumsum([len(cadena.resnum) for cadena in cadenas])
+    total = int(desplazamientos[-1])
+
+    bloques, descripcion = [], {}
+    for nombre, forma, dtype in (
+        ("coords", (total, 3), np.float64),
+        ("claves", (total,), np.int64),
+        ("secuencias", (total,), np.uint8),
+    ):
+        tamano = max(1, int(np.prod(forma)) * np.dtype(dtype).itemsize)
+        bloque = shared_memory.SharedMemory(create=True, size=tamano)
+        bloques.append(bloque)
+        descripcion[nombre] = (bloque.name, forma, np.dtype(dtype).str)
+
+    coords = _vista(bloques[0], *descripcion["coords"][1:])
+    claves = _vista(bloques[1], *descripcion["claves"][1:])
+    secuencias = _vista(bloques[2], *descripcion["secuencias"][1:])
+    for i, cadena in enumerate(cadenas):
+        inicio, fin = desplazamientos[i], desplazamientos[i + 1]
+        coords[inicio:fin] = cadena.coords
+        claves[inicio:fin] = claves_residuos(cadena)
+        secuencias[inicio:fin] = np.frombuffer(
+            np.ascontiguousarray(cadena.aa).tobytes(), dtype=np.uint8
+        )
+
+    descripcion["desplazamientos"] = desplazamientos
+    return bloques, descripcion
+
+
+def _vista(bloque, forma, dtype):
+    return np.ndarray(forma, dtype=dtype, buffer=bloque.buf)
+
+
+# Inicializa cada proceso del pool adjuntando la memoria compartida
+def _inicializar_proceso(descripcion, min_comunes):
+    for nombre in ("coords", "claves", "secuencias"):
+        nombre_bloque, forma, dtype = descripcion[nombre]
+        bloque = shared_memory.SharedMemory(name=nombre_bloque)
+        _compartido[f"bloque_{nombre}"] = bloque
+        _compartido[nombre] = _vista(bloque, forma, dtype)
+    _compartido["desplazamientos"] = descripcion["desplazamientos"]
+    _compartido["min_comunes"] = min_comunes
+
+
+def _cadena_compartida(i):
+    inicio, fin = _compartido["desplazamientos"][i], _compartido["desplazamientos"][i + 1]
+    return (
+        _compartido["coords"][inicio:fin],
+        _compartido["claves"][inicio:fin],
+        _compartido["secuencias"][inicio:fin],
+    )
+
+
+# Calcula la fila i de la matriz (cadena i contra todas las cadenas j > i)
+# Los residuos se emparejan por numeración o por alineamiento de secuencias
+# Entrada = índice de fila
+# Salida = índice, RMSD y cantidad de residuos comunes para j > i
+def _calcular_fila(i):
+    n = len(_compartido["desplazamientos"]) - 1
+    coords_i, claves_i, secuencia_i = _cadena_compartida(i)
+
+    pares, columnas, comunes = [], [], np.zeros(n - i - 1, dtype=np.int32)
+    for k, j in enumerate(range(i + 1, n)):
+        coords_j, claves_j, secuencia_j = _cadena_compartida(j)
+        indices_i, indices_j, _ = correspondencia_arreglos(
+            claves_i, secuencia_i, claves_j, secuencia_j
+        )
+        comunes[k] = len(indices_i)
+        if comunes[k] >= _compartido["min_comunes"]:
+            pares.append((coords_i[indices_i], coords_j[indices_j]))
+            columnas.append(k)
+
+    rmsd = np.full(n - i - 1, np.nan)
+    rmsd[columnas] = rmsd_lote(pares)
+    return i, rmsd, comunes
+
+
+# Calcula la matriz de RMSD global de todos los pares de cadenas
+# Entrada = lista de CadenaCA, procesos, mínimo de residuos comunes por par
+# Salida = matriz de RMSD (n x n) y matriz de residuos comunes (n x n)
+def calcular_matriz_rmsd(cadenas, procesos=None, min_comunes=10):
+    n = len(cadenas)
+    matriz = np.zeros((n, n), dtype=np.float32)
+    comunes = np.zeros((n, n), dtype=np.int32)
+    for i, cadena in enumerate(cadenas):
+        comunes[i, i] = len(cadena.resnum)
+
+    bloques, descripcion = _crear_memoria_compartida(cadenas)
+    try:
+        with ProcessPoolExecutor(
+            max_workers=procesos,
+            initializer=_inicializar_proceso,
+            initargs=(descripcion, min_comunes),
+        ) as pool:
+            for i, rmsd, comunes_fila in pool.map(_calcular_fila, range(n - 1)):
+                matriz[i, i + 1 :] = matriz[i + 1 :, i] = rmsd
+                comunes[i, i + 1 :] = comunes[i + 1 :, i] = comunes_fila
+    finally:
+        for bloque in bloques:
+            bloque.close()
+            bloque.unlink()
+
+    return matriz, comunes
+
+
+# Guarda la matriz con sus etiquetas en un archivo .npz comprimido
+# Entrada = ruta, matriz de RMSD, matriz de residuos comunes, lista de (pdb_id, cadena_id)
+# Salida = ruta del archivo guardado
+def guardar_matriz(ruta, matriz, comunes, entradas):
+    carpeta = os.path.dirname(ruta)
+    if carpeta:
+        os.makedirs(carpeta, exist_ok=True)
+    np.savez_compressed(
+        ruta,
+        rmsd=matriz,
+        comunes=comunes,
+        pdb=np.array([pdb_id for pdb_id, _ in entradas]),
+        cadena=np.array([cadena_id for _, cadena_id in entradas]),
+    )
+    return ruta
+
+
+# Función principal: matriz de RMSD de todas las estructuras PDB de un accession
+# Entrada = accession de UniProt o ID de NCBI, opciones de paralelismo y salida
+# Salida = ruta del archivo .npz generado (o None si no hay suficientes estructuras)
+def analizar_matriz_rmsd(
+    accession,
+    salida=None,
+    procesos=None,
+    hilos=8,
+    min_comunes=10,
+    todas_las_cadenas=False,
+):
+    inicio = time.perf_counter()
+    print(f"Resolviendo estructuras PDB para {accession}...")
+    entradas = resolver_entradas(accession, todas_las_cadenas)
+    if len(entradas) < 2:
+        print(f"Se necesitan al menos 2 estructuras PDB (encontradas: {len(entradas)})")
+        return None
+
+    print(f"Descargando y cargando {len(entradas)} cadenas...")
+    entradas, cadenas = cargar_cadenas_concurrente(entradas, hilos)
+    if len(cadenas) < 2:
+        print("No se pudieron cargar suficientes cadenas para comparar.")
+        return None
+
+    print(f"Calculando {len(cadenas) * (len(cadenas) - 1) // 2} pares de RMSD...")
+    matriz, comunes = calcular_matriz_rmsd(cadenas, procesos, min_comunes)
+
+    if salida is None:
+        salida = os.path.join("resultados", f"rmsd_matriz_{accession}.npz")
+    ruta = guardar_matriz(salida, matriz, comunes, entradas)
+
+    valores = matriz[np.triu_indices(len(cadenas), k=1)]
+    valores = valores[~np.isnan(valores)]
+    print(f"Matriz guardada en: {ruta}")
+    if len(valores):
+        print(
+            f"RMSD promedio: {valores.mean():.3f} Å | mínimo: {valores.min():.3f} Å | "
+            f"máximo: {valores.max():.3f} Å"
+        )
+    print(f"Tiempo total: {time.perf_counter() - inicio:.1f} s")
+    return ruta
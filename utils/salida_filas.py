@@ -0,0 +1,66 @@
+import gzip
+import json
+import os
+
+# =============================================================================
+# ESCRITURA EN FLUJO DE FILAS A JSONL (COMPRIMIDO) O PARQUET
+# =============================================================================
+#
+# Las filas (diccionarios) se escriben a medida que llegan, sin acumular el
+# conjunto completo en memoria:
+#   .jsonl / .jsonl.gz -> una línea JSON por fila (gzip si termina en .gz)
+#   .parquet           -> bloques de filas con un esquema fijo (requiere pyarrow)
+#
+# =============================================================================
+
+# Tipos de columna admitidos en los esquemas: "str" o "int"
+_TIPOS_PARQUET = {"str": "string", "int": "int64"}
+
+
+# Crea la carpeta de un archivo de salida si no existe
+def preparar_carpeta(ruta):
+    carpeta = os.path.dirname(ruta)
+    if carpeta:
+        os.makedirs(carpeta, exist_ok=True)
+
+
+# Escribe filas en JSONL o Parquet según la extensión de la ruta
+# Entrada = ruta, iterable de filas, columnas [(nombre, tipo)], filas por bloque Parquet
+# Salida = cantidad de filas escritas
+def escribir_filas(ruta, filas, columnas, tamano_bloque=10000):
+    preparar_carpeta(ruta)
+    if ruta.endswith(".parquet"):
+        return _escribir_parquet(ruta, filas, columnas, tamano_bloque)
+
+    total = 0
+    abrir = gzip.open if ruta.endswith(".gz") else open
+    with abrir(ruta, "wt", encoding="utf-8") as f:
+        for fila in filas:
+            f.write(json.dumps(fila, ensure_ascii=False) + "\n")
+            total += 1
+    return total
+
+
+def _escribir_parquet(ruta, filas, columnas, tamano_bloque):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("La salida Parquet requiere pyarrow (pip install pyarrow)")
+
+    # Esquema fijo: una columna sin valores en el primer bloque no cambia de tipo después
+    esquema = pa.schema(
+        [(nombre, getattr(pa, _TIPOS_PARQUET[tipo])()) for nombre, tipo in columnas]
+    )
+    bloque, total = [], 0
+    with pq.ParquetWriter(ruta, esquema, compression="zstd") as escritor:
+        for fila in filas:
+            bloque.append(fila)
+            if len(bloque) == tamano_bloque:
+                escritor.write_table(pa.Table.from_pylist(bloque, schema=esquema))
+                total += len(bloque)
+                bloque = []
+        if bloque:
+            escritor.write_table(pa.Table.from_pylist(bloque, schema=esquema))
+            total += len(bloque)
+    return total
@@ -0,0 +1,93 @@
+import numpy as np
+
+# =============================================================================
+# SUPERPOSICIÓN DE COORDENADAS (ALGORITMO DE KABSCH)
+# =============================================================================
+#
+# Trabaja sobre arreglos de coordenadas en lugar de objetos Atom. Todas las
+# funciones aceptan dimensiones de lote al inicio: (L, 3) para un par de
+# estructuras o (N, L, 3) para N pares, que se resuelven con una sola SVD
+# apilada. Los pesos por átomo permiten superposiciones ponderadas y, con
+# peso 0, rellenar pares de distinto largo para procesarlos en el mismo lote.
+#
+# Convención (la misma que Bio.SVDSuperimposer.get_rotran):
+#   coordenadas_superpuestas = movil @ rotacion + traslacion
+#
+# =============================================================================
+
+
+# Calcula la rotación y traslación óptimas que superponen movil sobre referencia
+# Entrada = referencia y movil (..., L, 3), pesos opcionales (..., L)
+# Salida = rotación (..., 3, 3), traslación (..., 3) y RMSD ponderado (...)
+def kabsch(referencia, movil, pesos=None):
+    referencia = np.asarray(referencia, dtype=np.float64)
+    movil = np.asarray(movil, dtype=np.float64)
+    if referencia.shape != movil.shape:
+        raise ValueError(
+            f"Las coordenadas no tienen la misma forma: {referencia.shape} vs {movil.shape}"
+        )
+
+    if pesos is None:
+        pesos = np.ones(referencia.shape[:-1])
+    pesos = np.asarray(pesos, dtype=np.float64)
+    total = pesos.sum(axis=-1, keepdims=True)
+    pesos = pesos / np.where(total > 0, total, 1.0)
+
+    # Centrar ambas nubes de puntos en su centroide ponderado
+    centro_ref = np.einsum("...l,...li->...i", pesos, referencia)
+    centro_movil = np.einsum("...l,...li->...i", pesos, movil)
+    ref_centrada = referencia - centro_ref[..., None, :]
+    movil_centrada = movil - centro_movil[..., None, :]
+
+    # Matriz de covarianza y SVD apilada para todo el lote
+    covarianza = np.einsum("...li,...l,...lj->...ij", movil_centrada, pesos, ref_centrada)
+    u, _, vt = np.linalg.svd(covarianza)
+
+    # Corrección para evitar reflexiones (determinante -1)
+    signo = np.sign(np.linalg.det(u @ vt))
+    signo = np.where(signo == 0, 1.0, signo)
+    u[..., :, 2] *= signo[..., None]
+
+    rotacion = u @ vt
+    traslacion = centro_ref - np.einsum("...i,...ij->...j", centro_movil, rotacion)
+
+    residuos = movil_centrada @ rotacion - ref_centrada
+    rmsd = np.sqrt(np.einsum("...l,...li,...li->...", pesos, residuos, residuos))
+    return rotacion, traslacion, rmsd
+
+
+# Aplica una rotación y traslación a un bloque de coordenadas con una sola multiplicación
+# Entrada = coordenadas (..., N, 3), rotación (..., 3, 3), traslación (..., 3)
+# Salida = coordenadas transformadas (..., N, 3)
+def aplicar_transformacion(coordenadas, rotacion, traslacion):
+    coordenadas = np.asarray(coordenadas, dtype=np.float64)
+    return coordenadas @ rotacion + np.asarray(traslacion)[..., None, :]
+
+
+# Superpone movil sobre referencia
+# Entrada = referencia y movil (..., L, 3), pesos opcionales (..., L)
+# Salida = coordenadas de movil superpuestas y RMSD
+def superponer(referencia, movil, pesos=None):
+    rotacion, traslacion, rmsd = kabsch(referencia, movil, pesos)
+    return aplicar_transformacion(movil, rotacion, traslacion), rmsd
+
+
+# Calcula el RMSD tras superponer N pares de distinto largo en un solo lote
+# Los pares se rellenan hasta el largo máximo con peso 0
+# Entrada = lista de pares (referencia (L_i, 3), movil (L_i, 3))
+# Salida = arreglo con el RMSD de cada par
+def rmsd_lote(pares):
+    if not pares:
+        return np.empty(0)
+
+    largo = max(len(referencia) for referencia, _ in pares)
+    referencias = np.zeros((len(pares), largo, 3))
+    moviles = np.zeros((len(pares), largo, 3))
+    pesos = np.zeros((len(pares), largo))
+    for i, (referencia, movil) in enumerate(pares):
+        referencias[i, : len(referencia)] = referencia
+        moviles[i, : len(movil)] = movil
+        pesos[i, : len(referencia)] = 1.0
+
+    _, _, rmsd = kabsch(referencias, moviles, pesos)
+    return rmsd